@@ -5,9 +5,9 @@
 前后端一体化Web应用
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -31,6 +31,11 @@ from core.report_crawler import get_report_crawler
 from core.report_analyzer import ReportAnalyzer
 from core.scheduler import get_scheduler
 from core.config import config
+from core.conditional import Validators, file_validators
+from core.executor import BlockingExecutor
+from core.pagination import after_cursor, decode_cursor, encode_cursor, keyset_order
+from core.export import EXPORT_FORMATS, parse_columns
+from core.serialization import dumps
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -48,6 +53,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class FastJSONResponse(JSONResponse):
+    """JSON响应：结果DataFrame按列直接编码为字节，不经过逐行字典与标准库json"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
 # 全局变量
 data_manager = get_data_manager()
 crawler = get_crawler()
@@ -55,6 +66,27 @@ report_crawler = get_report_crawler()
 scheduler = get_scheduler()
 report_analyzer = ReportAnalyzer(data_manager)
 
+# 阻塞调用（数据查询、报告读取、导出编码、缓存校验值计算）在有界线程池中执行，事件循环保持响应
+blocking_executor = BlockingExecutor(max_workers=config.get('server.blocking_workers', 4))
+
+def report_validators() -> Validators:
+    """报告数据的缓存校验值（按报告文件的修改时间与大小）"""
+    return file_validators(data_manager.data_dir / "analysis_reports.csv")
+
+# 报告列表默认不返回的大字段（完整内容与原始JSON），查看详情时按报告ID读取
+REPORT_DETAIL_FIELDS = ['报告内容', '纯文本内容', 'JSON数据']
+
+# 报告列表排序、过滤与游标所需的列
+REPORT_KEY_FIELDS = ['报告ID', '报告类型', '爬取时间']
+
+def dashboard_validators() -> Validators:
+    """同时依赖价格数据与报告数据的响应的缓存校验值"""
+    return data_manager.get_validators().combine(report_validators())
+
+def not_modified_response(validators: Validators) -> Response:
+    """客户端缓存仍有效时的304应答"""
+    return Response(status_code=304, headers=validators.headers())
+
 # 数据模型
 class CrawlConfig(BaseModel):
     enabled: bool = True
@@ -68,6 +100,9 @@ class SearchQuery(BaseModel):
     date_from: Optional[str] = None
     date_to: Optional[str] = None
     limit: int = 100
+    cursor: Optional[str] = None
+    fields: Optional[str] = None
+    stream: bool = False
 
 # 静态文件服务
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -83,67 +118,132 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "2.0.0"
+        "version": "2.0.0",
+        "executor": {key: value for key, value in blocking_executor.get_stats().items() if key in ('queued', 'active')}
     }
 
 @app.get("/api/stats")
-async def get_stats():
-    """获取系统统计信息"""
+async def get_stats(request: Request, response: Response):
+    """获取系统统计信息
+
+    数据版本与爬虫、调度器状态不变时以304应答（缓存期间运行时长等计时字段不刷新）。
+    """
+    validators = (await blocking_executor.run(data_manager.get_validators)).combine(Validators((
+        'status', crawler.is_running, crawler.crawled_count, crawler.error_count, scheduler.is_running
+    )))
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
     try:
-        stats = data_manager.get_statistics()
+        stats = await blocking_executor.run(data_manager.get_statistics)
         crawler_status = crawler.get_status()
         scheduler_status = scheduler.get_status()
         
+        response.headers.update(validators.headers())
         return {
             "success": True,
             "data": {
                 "data_stats": stats,
                 "crawler_status": crawler_status,
-                "scheduler_status": scheduler_status
+                "scheduler_status": scheduler_status,
+                "executor_stats": blocking_executor.get_stats()
             }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/cache/search")
+async def get_search_cache_stats():
+    """获取搜索结果缓存的命中率与内存占用"""
+    try:
+        return {
+            "success": True,
+            "data": data_manager.get_search_cache_stats()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/search")
-async def search_data(query: SearchQuery):
-    """搜索数据"""
+async def search_data(query: SearchQuery, request: Request):
+    """搜索数据（按交易日期倒序，提供 next_cursor 时可继续翻页；fields 为逗号分隔的返回列）
+
+    stream 为真或 Accept 为 application/x-ndjson 时以NDJSON逐块流式返回（每行一条记录）。
+    """
+    if query.stream or 'application/x-ndjson' in request.headers.get('accept', ''):
+        try:
+            chunks = data_manager.stream_search(
+                province=query.province,
+                variety=query.variety,
+                market=query.market,
+                date_from=query.date_from,
+                date_to=query.date_to,
+                limit=query.limit,
+                cursor=query.cursor,
+                columns=parse_columns(query.fields, label='字段')
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return StreamingResponse(blocking_executor.iterate(chunks), media_type='application/x-ndjson')
+    
     try:
-        results = data_manager.search_data(
+        columns = parse_columns(query.fields, label='字段')
+        page = await blocking_executor.run(
+            data_manager.search_page,
             province=query.province,
             variety=query.variety,
             market=query.market,
             date_from=query.date_from,
             date_to=query.date_to,
-            limit=query.limit
+            limit=query.limit,
+            cursor=query.cursor,
+            columns=columns
         )
         
-        return {
+        return FastJSONResponse({
             "success": True,
-            "count": len(results),
-            "data": results
-        }
+            "count": len(page['data']),
+            "data": page['data'],
+            "next_cursor": page['next_cursor'],
+            "snapshot_version": page['version']
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/data/latest")
-async def get_latest_data(limit: int = 50):
-    """获取最新数据"""
+async def get_latest_data(request: Request, limit: int = 50, fields: Optional[str] = None):
+    """获取最新数据，fields 为逗号分隔的返回列（未指定时返回全部列）"""
     try:
-        results = data_manager.get_latest_data(limit)
-        return {
+        columns = parse_columns(fields, label='字段')
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    validators = await blocking_executor.run(data_manager.get_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
+    try:
+        results = await blocking_executor.run(data_manager.get_latest_frame, limit, columns)
+        return FastJSONResponse({
             "success": True,
             "count": len(results),
             "data": results
-        }
+        }, headers=validators.headers())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/data/provinces")
-async def get_provinces():
+async def get_provinces(request: Request, response: Response):
     """获取省份列表"""
+    validators = await blocking_executor.run(data_manager.get_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
     try:
-        provinces = data_manager.get_provinces()
+        provinces = await blocking_executor.run(data_manager.get_provinces)
+        response.headers.update(validators.headers())
         return {
             "success": True,
             "data": provinces
@@ -152,10 +252,15 @@ async def get_provinces():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/data/varieties")
-async def get_varieties():
+async def get_varieties(request: Request, response: Response):
     """获取品种列表"""
+    validators = await blocking_executor.run(data_manager.get_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
     try:
-        varieties = data_manager.get_varieties()
+        varieties = await blocking_executor.run(data_manager.get_varieties)
+        response.headers.update(validators.headers())
         return {
             "success": True,
             "data": varieties
@@ -164,10 +269,15 @@ async def get_varieties():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/data/markets")
-async def get_markets():
+async def get_markets(request: Request, response: Response):
     """获取市场列表"""
+    validators = await blocking_executor.run(data_manager.get_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
     try:
-        markets = data_manager.get_markets()
+        markets = await blocking_executor.run(data_manager.get_markets)
+        response.headers.update(validators.headers())
         return {
             "success": True,
             "data": markets
@@ -175,6 +285,83 @@ async def get_markets():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/data/catalog/{dimension}")
+async def get_dimension_catalog(dimension: str, request: Request, response: Response):
+    """获取维度目录：每个值的记录数与首末交易日期"""
+    columns = {
+        'provinces': '省份',
+        'varieties': '品种名称',
+        'markets': '市场名称'
+    }
+    
+    if dimension not in columns:
+        raise HTTPException(status_code=404, detail=f"未知维度: {dimension}")
+    
+    validators = await blocking_executor.run(data_manager.get_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
+    try:
+        entries = await blocking_executor.run(data_manager.get_dimension_catalog, columns[dimension])
+        response.headers.update(validators.headers())
+        return {
+            "success": True,
+            "count": len(entries),
+            "data": entries
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/series")
+async def get_series(
+    keys: Optional[str] = None,
+    market_id: Optional[str] = None,
+    variety_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    resample: str = 'day',
+    limit: int = 50
+):
+    """获取 (市场ID, 品种ID) 价格序列
+
+    keys: 逗号分隔的 市场ID:品种ID；或只给 market_id / variety_id 取该市场或品种的全部序列。
+    start/end: 交易日期范围（含），resample: day / week / month
+    """
+    try:
+        pairs = []
+        for item in (keys or '').split(','):
+            if not item.strip():
+                continue
+            market, _, variety = item.strip().partition(':')
+            if not market or not variety:
+                raise ValueError(f"序列键格式应为 市场ID:品种ID: {item}")
+            pairs.append((market, variety))
+
+        if not pairs and not market_id and not variety_id:
+            raise ValueError("需要指定 keys、market_id 或 variety_id")
+
+        result = await blocking_executor.run(
+            data_manager.get_series,
+            keys=pairs,
+            market_id=market_id,
+            variety_id=variety_id,
+            start=start,
+            end=end,
+            resample=resample,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return FastJSONResponse({
+        "success": True,
+        "count": len(result['series']),
+        "data": result['series'],
+        "missing": result['missing']
+    })
+
 @app.post("/api/crawler/start")
 async def start_crawler(background_tasks: BackgroundTasks):
     """启动爬虫"""
@@ -262,130 +449,192 @@ async def crawl_reports_once(background_tasks: BackgroundTasks, full_crawl: bool
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/reports/latest")
-async def get_latest_reports(limit: int = 20, page: int = 1, report_type: str = "all"):
+async def get_latest_reports(request: Request, response: Response, limit: int = 20, page: int = 1,
+                             report_type: str = "all", cursor: Optional[str] = None,
+                             fields: Optional[str] = None):
     """获取最新报告
 
     Args:
         limit: 每页数量
-        page: 页码
+        page: 页码（未提供游标时按页码偏移）
         report_type: 报告类型 (all, daily, monthly, yearly)
+        cursor: 上一页返回的 next_cursor，按游标取下一页
+        fields: 逗号分隔的返回列，all 为全部列；未指定时不含报告全文与JSON数据
     """
+    validators = await blocking_executor.run(report_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
     try:
-        reports_file = data_manager.data_dir / "analysis_reports.csv"
-
-        if not reports_file.exists():
-            return {
-                "success": True,
-                "count": 0,
-                "data": [],
-                "total": 0,
-                "page": page,
-                "total_pages": 0,
-                "report_type": report_type
-            }
-
-        import pandas as pd
-        df = pd.read_csv(reports_file, encoding='utf-8-sig')
+        result = await blocking_executor.run(
+            read_latest_reports, limit, page, report_type, cursor, fields
+        )
+        response.headers.update(validators.headers())
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if df.empty:
-            return {
-                "success": True,
-                "count": 0,
-                "data": [],
-                "total": 0,
-                "page": page,
-                "total_pages": 0,
-                "report_type": report_type
-            }
+def report_fields(header: List[str], fields: Optional[str]) -> List[str]:
+    """报告列表返回的列：未指定时为除大字段外的全部列，all 为全部列，否则为请求的列中文件里存在的列"""
+    if not fields:
+        return [col for col in header if col not in REPORT_DETAIL_FIELDS]
 
-        # 清理数据
-        df = df.fillna('')
+    if fields.strip() == 'all':
+        return header
 
-        # 根据报告类型过滤
-        if report_type != "all":
-            if report_type == "daily":
-                df = df[df['报告类型'] == '农产品批发市场价格日报']
-            elif report_type == "monthly":
-                df = df[df['报告类型'] == '农业分析报告']
-            elif report_type == "yearly":
-                # 目前没有年报，预留接口
-                df = df[df['报告类型'].str.contains('年报', na=False)]
+    requested = dict.fromkeys(col.strip() for col in fields.split(',') if col.strip())
+    return [col for col in requested if col in header]
 
-        # 按爬取时间排序
-        if '爬取时间' in df.columns:
-            df = df.sort_values('爬取时间', ascending=False)
+def read_latest_reports(limit: int, page: int, report_type: str, cursor: Optional[str] = None,
+                        fields: Optional[str] = None):
+    """读取并分页报告（阻塞，在线程池中执行）
 
-        # 计算分页
-        total_records = len(df)
-        total_pages = (total_records + limit - 1) // limit
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
+    按 (爬取时间, 报告ID) 倒序，只对当前页所需的行排序；带游标时从上一页最后一行之后继续，
+    爬虫在两页之间写入新报告也不会使页错位。报告文件没有按爬取时间的索引，每页仍需读取
+    并过滤整个文件（只读返回列与排序、过滤所需的列），游标只保证翻页稳定，并不降低深页的读取代价。
+    """
+    query = (report_type, limit)
+    after = decode_cursor(cursor, 'reports', query) if cursor else None
+    reports_file = data_manager.data_dir / "analysis_reports.csv"
 
-        # 获取当前页数据
-        page_df = df.iloc[start_idx:end_idx]
+    if not reports_file.exists():
+        return {
+            "success": True,
+            "count": 0,
+            "data": [],
+            "total": 0,
+            "page": page,
+            "total_pages": 0,
+            "next_cursor": None,
+            "report_type": report_type
+        }
 
-        # 转换为字典并清理数值
-        records = page_df.to_dict('records')
+    import pandas as pd
+    header = pd.read_csv(reports_file, encoding='utf-8-sig', nrows=0).columns.tolist()
+    columns = report_fields(header, fields)
+    df = pd.read_csv(
+        reports_file,
+        encoding='utf-8-sig',
+        usecols=[col for col in header if col in columns or col in REPORT_KEY_FIELDS],
+        dtype={'报告ID': str}
+    )
 
+    if df.empty:
         return {
             "success": True,
-            "count": len(records),
-            "data": records,
-            "total": total_records,
+            "count": 0,
+            "data": [],
+            "total": 0,
             "page": page,
-            "total_pages": total_pages,
-            "limit": limit,
+            "total_pages": 0,
+            "next_cursor": None,
             "report_type": report_type
         }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # 清理数据
+    df = df.fillna('')
+
+    # 根据报告类型过滤
+    if report_type != "all":
+        if report_type == "daily":
+            df = df[df['报告类型'] == '农产品批发市场价格日报']
+        elif report_type == "monthly":
+            df = df[df['报告类型'] == '农业分析报告']
+        elif report_type == "yearly":
+            # 目前没有年报，预留接口
+            df = df[df['报告类型'].str.contains('年报', na=False)]
+
+    # 计算分页
+    total_records = len(df)
+    total_pages = (total_records + limit - 1) // limit
+    start_idx = 0 if after is not None else (page - 1) * limit
+    end_idx = start_idx + limit
+
+    # 按 (爬取时间, 报告ID) 倒序取当前页，多取一条判断是否还有下一页
+    next_cursor = None
+    if {'爬取时间', '报告ID'} <= set(df.columns):
+        df['报告ID'] = df['报告ID'].astype(str)
+        if after is not None:
+            df = after_cursor(df, '爬取时间', ['报告ID'], after['k'], after['id'])
+        ordered = keyset_order(df, '爬取时间', ['报告ID'], end_idx + 1)
+        page_df = ordered.iloc[start_idx:end_idx]
+        if len(ordered) > end_idx and not page_df.empty:
+            last = page_df.iloc[-1]
+            next_cursor = encode_cursor('reports', query, str(last['爬取时间']), last['报告ID'])
+    else:
+        page_df = df.iloc[start_idx:end_idx]
+
+    # 转换为字典并清理数值
+    records = page_df[columns].to_dict('records')
+
+    return {
+        "success": True,
+        "count": len(records),
+        "data": records,
+        "total": total_records,
+        "page": page,
+        "total_pages": total_pages,
+        "next_cursor": next_cursor,
+        "limit": limit,
+        "report_type": report_type
+    }
 
 @app.get("/api/reports/stats")
-async def get_report_stats():
+async def get_report_stats(request: Request, response: Response):
     """获取报告统计信息"""
+    validators = await blocking_executor.run(report_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
     try:
-        reports_file = data_manager.data_dir / "analysis_reports.csv"
-
-        if not reports_file.exists():
-            return {
-                "total": 0,
-                "daily_count": 0,
-                "monthly_count": 0,
-                "yearly_count": 0,
-                "types": []
-            }
-
-        import pandas as pd
-        df = pd.read_csv(reports_file, encoding='utf-8-sig')
+        result = await blocking_executor.run(read_report_stats)
+        response.headers.update(validators.headers())
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if df.empty:
-            return {
-                "total": 0,
-                "daily_count": 0,
-                "monthly_count": 0,
-                "yearly_count": 0,
-                "types": []
-            }
+def read_report_stats():
+    """统计各类型报告数量（阻塞，在线程池中执行）"""
+    reports_file = data_manager.data_dir / "analysis_reports.csv"
 
-        # 统计各类型报告数量
-        daily_count = len(df[df['报告类型'] == '农产品批发市场价格日报'])
-        monthly_count = len(df[df['报告类型'] == '农业分析报告'])
-        yearly_count = len(df[df['报告类型'].str.contains('年报', na=False)])
+    if not reports_file.exists():
+        return {
+            "total": 0,
+            "daily_count": 0,
+            "monthly_count": 0,
+            "yearly_count": 0,
+            "types": []
+        }
 
-        # 获取所有报告类型
-        types = df['报告类型'].value_counts().to_dict()
+    import pandas as pd
+    df = pd.read_csv(reports_file, encoding='utf-8-sig')
 
+    if df.empty:
         return {
-            "total": len(df),
-            "daily_count": daily_count,
-            "monthly_count": monthly_count,
-            "yearly_count": yearly_count,
-            "types": types
+            "total": 0,
+            "daily_count": 0,
+            "monthly_count": 0,
+            "yearly_count": 0,
+            "types": []
         }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # 统计各类型报告数量
+    daily_count = len(df[df['报告类型'] == '农产品批发市场价格日报'])
+    monthly_count = len(df[df['报告类型'] == '农业分析报告'])
+    yearly_count = len(df[df['报告类型'].str.contains('年报', na=False)])
+
+    # 获取所有报告类型
+    types = df['报告类型'].value_counts().to_dict()
+
+    return {
+        "total": len(df),
+        "daily_count": daily_count,
+        "monthly_count": monthly_count,
+        "yearly_count": yearly_count,
+        "types": types
+    }
 
 @app.get("/api/reports/export")
 async def export_reports():
@@ -404,44 +653,99 @@ async def export_reports():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/reports/{report_id}")
+async def get_report_detail(request: Request, response: Response, report_id: str):
+    """获取单个报告的全部字段（含报告全文与JSON数据）"""
+    validators = await blocking_executor.run(report_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
+    try:
+        report = await blocking_executor.run(read_report, report_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if report is None:
+        raise HTTPException(status_code=404, detail="报告不存在")
+    
+    response.headers.update(validators.headers())
+    return {"success": True, "data": report}
+
+def read_report(report_id: str) -> Optional[Dict[str, Any]]:
+    """按报告ID读取一条报告（阻塞，在线程池中执行），不存在时返回None"""
+    reports_file = data_manager.data_dir / "analysis_reports.csv"
+
+    if not reports_file.exists():
+        return None
+
+    import pandas as pd
+    df = pd.read_csv(reports_file, encoding='utf-8-sig', dtype={'报告ID': str})
+
+    if '报告ID' not in df.columns:
+        return None
+
+    df = df[df['报告ID'] == report_id]
+    if df.empty:
+        return None
+
+    return df.fillna('').iloc[-1].to_dict()
+
 @app.get("/api/export/csv")
 async def export_csv(
     province: Optional[str] = None,
     variety: Optional[str] = None,
     market: Optional[str] = None,
     date_from: Optional[str] = None,
-    date_to: Optional[str] = None
+    date_to: Optional[str] = None,
+    format: str = 'csv',
+    columns: Optional[str] = None
 ):
-    """导出CSV文件"""
+    """导出数据（分块流式输出，不限制行数）
+
+    format: csv / csv.gz / parquet / arrow（Arrow IPC 流），columns: 逗号分隔的列名
+    """
     try:
-        file_path = data_manager.export_csv(
+        chunks = data_manager.export_data(
+            format=format,
             province=province,
             variety=variety,
             market=market,
             date_from=date_from,
-            date_to=date_to
+            date_to=date_to,
+            columns=parse_columns(columns)
         )
-        
-        return FileResponse(
-            file_path,
-            media_type='application/octet-stream',
-            filename=f"market_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        media_type, suffix = EXPORT_FORMATS[format]
+        filename = f"market_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
+        return StreamingResponse(
+            blocking_executor.iterate(chunks),
+            media_type=media_type,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/dashboard/trends")
-async def get_dashboard_trends(days: int = 30):
+async def get_dashboard_trends(request: Request, response: Response, days: int = 30):
     """获取仪表板趋势数据"""
+    validators = await blocking_executor.run(dashboard_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+    
     try:
         # 获取价格数据趋势
-        price_trends = await get_price_trends(days)
+        price_trends = await blocking_executor.run(get_price_trends, days)
 
         # 获取报告数据趋势
-        report_trends = await get_report_trends()
+        report_trends = await blocking_executor.run(get_report_trends)
 
         # 获取关键指标
-        key_metrics = await get_key_metrics()
+        key_metrics = await blocking_executor.run(get_key_metrics)
+
+        response.headers.update(validators.headers())
 
         return {
             "success": True,
@@ -456,51 +760,16 @@ async def get_dashboard_trends(days: int = 30):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def get_price_trends(days: int = 30):
-    """获取价格趋势数据"""
+def get_price_trends(days: int = 30):
+    """获取价格趋势数据（读日汇总表，平均价为空的记录不计入）"""
     try:
-        # 从CSV文件获取指定天数的价格数据
-        csv_file = data_manager.data_dir / "market_prices.csv"
-
-        import pandas as pd
-
-        real_data = []
-        if csv_file.exists():
-            df = pd.read_csv(csv_file, encoding='utf-8-sig')
-
-            if not df.empty:
-                # 清理数据
-                df = df.fillna(0)
-
-                # 按日期分组计算平均价格
-                if '交易日期' in df.columns and '平均价' in df.columns:
-                    df['交易日期'] = pd.to_datetime(df['交易日期'], errors='coerce')
-                    df = df.dropna(subset=['交易日期'])
-
-                    # 获取指定天数的数据
-                    recent_date = df['交易日期'].max()
-                    start_date = recent_date - pd.Timedelta(days=days)
-                    recent_df = df[df['交易日期'] >= start_date]
-
-                    # 按日期分组计算平均价格
-                    daily_avg = recent_df.groupby('交易日期')['平均价'].mean().reset_index()
-                    daily_avg = daily_avg.sort_values('交易日期')
-
-                    for _, row in daily_avg.iterrows():
-                        real_data.append({
-                            '交易日期': row['交易日期'].strftime('%Y-%m-%d'),
-                            '平均价': float(row['平均价'])
-                        })
-
-        # 只返回真实数据，不生成模拟数据
-
-        return real_data
+        return data_manager.get_price_trends(days)
 
     except Exception as e:
         logger.error(f"获取价格趋势失败: {e}")
         return []
 
-async def get_report_trends():
+def get_report_trends():
     """获取报告趋势数据"""
     try:
         # 从CSV文件获取报告数据
@@ -536,38 +805,13 @@ async def get_report_trends():
         logger.error(f"获取报告趋势失败: {e}")
         return {}
 
-async def get_key_metrics():
+def get_key_metrics():
     """获取关键指标"""
     try:
         metrics = {}
 
-        # 价格指标
-        csv_file = data_manager.data_dir / "market_prices.csv"
-        if csv_file.exists():
-            import pandas as pd
-            df = pd.read_csv(csv_file, encoding='utf-8-sig')
-
-            if not df.empty:
-                df = df.fillna(0)
-
-                # 计算价格指标
-                if '平均价' in df.columns:
-                    metrics['avg_price'] = float(df['平均价'].mean())
-                    metrics['max_price'] = float(df['平均价'].max())
-                    metrics['min_price'] = float(df['平均价'].min())
-
-                # 计算价格变化趋势
-                if '交易日期' in df.columns and '平均价' in df.columns:
-                    df['交易日期'] = pd.to_datetime(df['交易日期'], errors='coerce')
-                    df = df.dropna(subset=['交易日期'])
-                    df = df.sort_values('交易日期')
-
-                    if len(df) >= 2:
-                        recent_price = df.iloc[-1]['平均价']
-                        previous_price = df.iloc[-2]['平均价']
-                        if previous_price > 0:
-                            price_change = ((recent_price - previous_price) / previous_price) * 100
-                            metrics['price_change_percent'] = round(price_change, 2)
+        # 价格指标（读日汇总表）：均值、最高、最低，及最新两个交易日日均价的变化
+        metrics.update(data_manager.get_price_metrics())
 
         # 报告指标
         reports_file = data_manager.data_dir / "analysis_reports.csv"
@@ -585,10 +829,15 @@ async def get_key_metrics():
         return {}
 
 @app.get("/api/dashboard/data")
-async def get_dashboard_data():
+async def get_dashboard_data(request: Request, response: Response):
     """获取仪表盘数据"""
+    validators = await blocking_executor.run(report_validators)
+    if validators.not_modified(request.headers):
+        return not_modified_response(validators)
+
     try:
-        dashboard_data = report_analyzer.get_dashboard_data()
+        dashboard_data = await blocking_executor.run(report_analyzer.get_dashboard_data)
+        response.headers.update(validators.headers())
         return dashboard_data
     except Exception as e:
         logger.error(f"获取仪表盘数据失败: {e}")
@@ -602,7 +851,7 @@ async def get_trends_data(category: str = "all"):
         category: 数据类别 (all, price_index, vegetables, fruits, meat, aquatic)
     """
     try:
-        dashboard_data = report_analyzer.get_dashboard_data()
+        dashboard_data = await blocking_executor.run(report_analyzer.get_dashboard_data)
 
         if not dashboard_data.get("success"):
             return dashboard_data
@@ -649,6 +898,12 @@ async def shutdown_event():
     # 停止调度器
     scheduler.stop()
     
+    # 写出写入缓冲中的剩余数据
+    data_manager.close()
+    
+    # 等待线程池中的任务结束
+    blocking_executor.shutdown()
+    
     print("✅ 平台已安全关闭")
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+“最新N条”查询的性能基准
+对比全量排序、部分选择（argpartition）和常驻表排序索引（有序行号切片）
+在不同数据量下的延迟，数据为随机生成的价格表，不读写 data 目录。
+
+用法:
+    python benchmark_topk.py
+    python benchmark_topk.py --sizes 10000 100000 1000000 --limit 50 --repeat 20
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.ordering import OrderIndex
+from core.storage import apply_predicates, encode_categories, sort_and_limit
+
+def build_table(size: int, seed: int = 0) -> pd.DataFrame:
+    """生成与价格表结构一致的随机数据"""
+    rng = np.random.default_rng(seed)
+    provinces = ['北京', '天津', '河北', '山西', '内蒙古', '山东', '河南', '江苏']
+    varieties = [f'品种{i}' for i in range(60)]
+    markets = [f'{p}批发市场{i}' for p in provinces for i in range(5)]
+
+    start = datetime(2024, 1, 1)
+    trade_dates = [(start + timedelta(days=int(d))).strftime('%Y-%m-%d') for d in rng.integers(0, 540, size)]
+    saved_times = [(start + timedelta(minutes=int(m))).strftime('%Y-%m-%d %H:%M:%S') for m in rng.integers(0, 540 * 1440, size)]
+
+    df = pd.DataFrame({
+        '省份': rng.choice(provinces, size),
+        '市场名称': rng.choice(markets, size),
+        '品种名称': rng.choice(varieties, size),
+        '平均价': rng.uniform(0.5, 20, size).round(2),
+        '交易日期': trade_dates,
+        '保存时间': saved_times
+    })
+
+    return encode_categories(df)
+
+def measure(func, repeat: int) -> float:
+    """返回多次执行的中位耗时（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="最新N条查询性能基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help="数据量")
+    parser.add_argument('--limit', type=int, default=50, help="返回条数")
+    parser.add_argument('--repeat', type=int, default=10, help="每项重复次数")
+    args = parser.parse_args()
+
+    header = f"{'行数':>10} {'查询':<10} {'全量排序':>10} {'部分选择':>10} {'排序索引':>10} {'索引构建':>10}"
+    print(header)
+    print('-' * len(header))
+
+    for size in args.sizes:
+        table = build_table(size)
+        order_index = OrderIndex()
+
+        # 构建一次排序索引（每个价格表版本只需一次）
+        start = time.perf_counter()
+        order_index.sort_and_limit(table, table, '保存时间', True, args.limit)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        filtered = apply_predicates(table, [('省份', '==', '北京')])
+        order_index.sort_and_limit(table, filtered, '交易日期', True, args.limit)
+
+        cases = [
+            ('最新', table, '保存时间'),
+            ('省份过滤', filtered, '交易日期')
+        ]
+
+        for name, df, column in cases:
+            full_sort = measure(lambda: df.sort_values(column, ascending=False).head(args.limit), args.repeat)
+            partial = measure(lambda: sort_and_limit(df, column, True, args.limit), args.repeat)
+            indexed = measure(lambda: order_index.sort_and_limit(table, df, column, True, args.limit), args.repeat)
+
+            print(f"{size:>10} {name:<10} {full_sort:>9.2f}ms {partial:>9.2f}ms {indexed:>9.2f}ms {build_ms:>9.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+价格数据存储格式转换脚本
+把现有的 data/market_prices.csv（含未压缩的增量段）和 data/backups/*.csv
+一次性转换为其他存储引擎的格式，例如 Parquet 列式存储。
+
+用法:
+    python convert_storage.py --engine parquet
+    python convert_storage.py --engine parquet --data-dir data --skip-backups
+
+转换完成后在 config.json 中设置 data.storage_engine 即可切换引擎，
+目标引擎的参数取自 config.json 中的 data.storage_options。
+"""
+
+import argparse
+import logging
+import sys
+
+from core.config import config
+from core.storage import STORAGE_ENGINES, convert_storage
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="转换价格数据存储格式")
+    parser.add_argument('--engine', required=True, choices=[e for e in STORAGE_ENGINES if e != 'csv'],
+                        help="目标存储引擎")
+    parser.add_argument('--data-dir', default='data', help="数据目录")
+    parser.add_argument('--skip-backups', action='store_true', help="不转换备份文件")
+    args = parser.parse_args()
+
+    try:
+        result = convert_storage(
+            args.data_dir,
+            args.engine,
+            include_backups=not args.skip_backups,
+            target_options=config.get('data.storage_options', {})
+        )
+    except Exception as e:
+        logger.error(f"转换失败: {e}")
+        return 1
+
+    logger.info("=== 转换完成 ===")
+    logger.info(f"主数据记录数: {result['records']}")
+    logger.info(f"目标文件: {result['target']}")
+    logger.info(f"转换备份数: {len(result['backups'])}")
+    logger.info(f"请在 config.json 中设置 data.storage_engine = \"{args.engine}\"")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
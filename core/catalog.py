@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+维度目录 - 省份、品种、市场的去重值、记录数与首末交易日期，以及总量计数器，随写入增量维护并持久化
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .journal import Journal, new_generation
+from .storage import DATE_PATTERN, KEY_COLUMNS, decode_categories
+from .upsert import ROW_NEW, ROW_UNCHANGED, ROW_UPDATED, content_hashes, key_hashes
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 目录文件格式版本，格式不同时重新构建
+CATALOG_FORMAT = 3
+
+# 目录维护的维度列
+DIMENSION_COLUMNS = ['省份', '品种名称', '市场名称']
+
+# 变化日志中的关键字段达到该数量，或日志大于检查点目录文件时写出检查点
+CHECKPOINT_KEYS = 20000
+
+# 按保存日期统计写入行数时保留的天数
+INGEST_HISTORY_DAYS = 7
+
+class DimensionCatalog:
+    """维度目录
+
+    每个维度列保存 值 -> {记录数, 首个交易日期, 最后交易日期}。
+    写入时只统计关键字段（市场、品种、交易日期）首次出现的记录，
+    已存在的关键字段被覆盖时记录数不变；覆盖改变了非关键字段的维度值（如省份）时，
+    记录数从旧值移到新值。关键字段哈希 -> 内容哈希 与目录一起持久化，
+    用于把新批次的每行分为新增、更新、未变化；冷启动时若存储版本与目录记录的一致
+    则直接加载，无需全表扫描。
+
+    持久化分为检查点（目录文件与关键字段哈希文件）和变化日志：每个批次只追加
+    变化的关键字段和被改动的维度条目，加载时在检查点上重放。
+
+    另维护总记录数、最后保存时间和按保存日期的写入行数，统计信息直接由目录读出。
+    """
+
+    def __init__(self, data_dir: Path, columns: Optional[List[str]] = None):
+        self.data_dir = Path(data_dir)
+        self.catalog_file = self.data_dir / "catalog.json"
+        self.keys_file = self.data_dir / "catalog_keys.npy"
+        self.journal = Journal(self.data_dir / "catalog.log")
+        self.columns = list(columns or DIMENSION_COLUMNS)
+
+        self._dimensions = {col: {} for col in self.columns}
+        self._keys = {}
+        self._changes = 0
+        self._generation = None
+        self._checkpoint_bytes = 0
+        self._sorted = {}
+        self._last_update = None
+        self._ingested = {}
+        self.signature = None
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def load(self, signature: Optional[tuple]) -> bool:
+        """从磁盘加载目录（检查点加变化日志），仅当其记录的存储版本与当前一致时有效"""
+        with self._lock:
+            try:
+                if not self.catalog_file.exists():
+                    return False
+
+                with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+
+                if (data.get('format') != CATALOG_FORMAT or data.get('columns') != self.columns
+                        or not self.keys_file.exists()):
+                    return False
+
+                pairs = np.load(self.keys_file)
+                keys = dict(zip(pairs[:, 0].tolist(), pairs[:, 1].tolist()))
+                dimensions = {col: data['dimensions'].get(col, {}) for col in self.columns}
+                last_update = data.get('last_update')
+                ingested = data.get('ingested', {})
+                stored_signature = data.get('signature')
+                changes = 0
+
+                for record in self.journal.read(data.get('generation')):
+                    keys.update(map(tuple, record['keys']))
+                    for col, entries in record['dimensions'].items():
+                        if col not in dimensions:
+                            continue
+                        for value, entry in entries.items():
+                            if entry is None:
+                                dimensions[col].pop(value, None)
+                            else:
+                                dimensions[col][value] = entry
+                    last_update = record['last_update']
+                    ingested = record['ingested']
+                    stored_signature = record['signature']
+                    changes += len(record['keys'])
+
+                if stored_signature != repr(signature):
+                    return False
+
+                self._keys = keys
+                self._changes = changes
+                self._dimensions = dimensions
+                self._sorted = {}
+                self._last_update = last_update
+                self._ingested = ingested
+                self._generation = data.get('generation')
+                self._checkpoint_bytes = self.catalog_file.stat().st_size
+                self.signature = signature
+                self.loaded = True
+                return True
+
+            except Exception as e:
+                logger.warning(f"维度目录加载失败，将重新构建: {e}")
+                return False
+
+    def rebuild(self, df: pd.DataFrame, signature: Optional[tuple]):
+        """按完整价格表重建目录并写出"""
+        with self._lock:
+            self._dimensions = {col: {} for col in self.columns}
+            self._keys = {}
+            self._changes = 0
+            self._sorted = {}
+            self._last_update = None
+            self._ingested = {}
+
+            if not df.empty:
+                df = df.drop_duplicates(subset=[col for col in KEY_COLUMNS if col in df.columns], keep='last')
+                self._keys = dict(zip(key_hashes(df).tolist(), content_hashes(df).tolist()))
+                self._accumulate(df)
+
+                # 重建时按保存时间还原最后保存时间与近几日的写入行数
+                if '保存时间' in df.columns:
+                    saved = df['保存时间'].dropna().astype(str)
+                    if not saved.empty:
+                        self._last_update = saved.max()
+                        self._ingested = {
+                            day: int(count) for day, count in saved.str[:10].value_counts().items()
+                        }
+                        self._prune_ingested()
+
+            self.signature = signature
+            self.loaded = True
+            self.checkpoint()
+
+    def classify(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """把批次（关键字段已去重）的每行分为新增、更新、未变化
+
+        返回 (关键字段哈希, 内容哈希, 状态)，状态取值见 ROW_NEW / ROW_UPDATED / ROW_UNCHANGED。
+        """
+        keys = key_hashes(df)
+        contents = content_hashes(df)
+        status = np.empty(len(df), dtype=np.int8)
+
+        with self._lock:
+            for i, (key, content) in enumerate(zip(keys.tolist(), contents.tolist())):
+                previous = self._keys.get(key)
+                if previous is None:
+                    status[i] = ROW_NEW
+                elif previous == content:
+                    status[i] = ROW_UNCHANGED
+                else:
+                    status[i] = ROW_UPDATED
+
+        return keys, contents, status
+
+    def update(self, df: pd.DataFrame, keys: np.ndarray, contents: np.ndarray,
+               status: np.ndarray, signature: Optional[tuple], previous: Optional[pd.DataFrame] = None,
+               value_dates: Optional[Callable[[str, List[str]], Dict[str, Tuple[Optional[str], Optional[str]]]]] = None):
+        """写入一个批次（只含新增和更新的行）后增量更新目录，并把变化追加到变化日志
+
+        previous 为更新的行被覆盖前的维度值（与 df 行对齐），value_dates(列, 值) 返回写入后
+        这些值的首末交易日期，用于记录被移走的旧值重新确定日期范围。
+        """
+        with self._lock:
+            changes = list(zip(keys.tolist(), contents.tolist()))
+            self._keys.update(changes)
+            self._changes += len(changes)
+            touched = self._accumulate(df, counted=status == ROW_NEW)
+            for col, values in self._move(df, status, previous, value_dates).items():
+                touched[col] = list(dict.fromkeys(touched.get(col, []) + values))
+            self._record_ingest(df)
+            self.signature = signature
+
+            if self._changes >= CHECKPOINT_KEYS or self.journal.size > self._checkpoint_bytes:
+                self.checkpoint()
+                return
+
+            self.journal.append(self._generation, {
+                'signature': repr(self.signature),
+                'keys': [[key, content] for key, content in changes],
+                'dimensions': {
+                    col: {value: self._dimensions[col].get(value) for value in values}
+                    for col, values in touched.items()
+                },
+                'last_update': self._last_update,
+                'ingested': self._ingested
+            })
+
+    def mark(self, signature: Optional[tuple]):
+        """存储内容不变而版本变化（如压缩）时，更新目录记录的存储版本"""
+        with self._lock:
+            self.signature = signature
+            self.checkpoint()
+
+    def _record_ingest(self, df: pd.DataFrame):
+        """记录批次的保存时间与写入行数（覆盖写入也计入）"""
+        if '保存时间' in df.columns:
+            saved = df['保存时间'].dropna().astype(str)
+            if not saved.empty and (self._last_update is None or saved.max() > self._last_update):
+                self._last_update = saved.max()
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        self._ingested[today] = self._ingested.get(today, 0) + len(df)
+        self._prune_ingested()
+
+    def _prune_ingested(self):
+        """只保留最近几天的写入行数"""
+        for day in sorted(self._ingested)[:-INGEST_HISTORY_DAYS]:
+            del self._ingested[day]
+
+    def _accumulate(self, df: pd.DataFrame, counted: Optional[np.ndarray] = None) -> Dict[str, List[str]]:
+        """把记录计入各维度值：counted 为需要计数的行，首末日期取全部行
+
+        返回各维度列中被改动的值。
+        """
+        dates = df['交易日期'].astype(str).str[:10] if '交易日期' in df.columns else pd.Series('', index=df.index)
+        dates = dates.where(dates.str.match(DATE_PATTERN.pattern))
+        counted = np.ones(len(df), dtype=bool) if counted is None else counted
+        touched = {}
+
+        for col in self.columns:
+            if col not in df.columns:
+                continue
+
+            frame = pd.DataFrame({
+                'value': decode_categories(df[[col]])[col].to_numpy(),
+                'date': dates.to_numpy(),
+                'counted': counted
+            }).dropna(subset=['value'])
+
+            if frame.empty:
+                continue
+
+            grouped = frame.groupby('value', sort=False).agg(
+                count=('counted', 'sum'),
+                first_date=('date', 'min'),
+                last_date=('date', 'max')
+            )
+
+            entries = self._dimensions[col]
+            touched[col] = grouped.index.tolist()
+            for value, row in grouped.iterrows():
+                first_date = row['first_date'] if isinstance(row['first_date'], str) else None
+                last_date = row['last_date'] if isinstance(row['last_date'], str) else None
+                entry = entries.get(value)
+
+                if entry is None:
+                    entries[value] = {
+                        'count': int(row['count']),
+                        'first_date': first_date,
+                        'last_date': last_date
+                    }
+                    self._sorted.pop(col, None)
+                    continue
+
+                entry['count'] += int(row['count'])
+                if first_date and (entry['first_date'] is None or first_date < entry['first_date']):
+                    entry['first_date'] = first_date
+                if last_date and (entry['last_date'] is None or last_date > entry['last_date']):
+                    entry['last_date'] = last_date
+
+        return touched
+
+    def _move(self, df: pd.DataFrame, status: np.ndarray, previous: Optional[pd.DataFrame],
+              value_dates) -> Dict[str, List[str]]:
+        """更新的行改变了非关键字段的维度值时，把记录数从旧值移到新值，返回被改动的值
+
+        旧值不再有记录时删除；仍有记录时按 value_dates 重新确定首末交易日期。
+        """
+        updated = status == ROW_UPDATED
+        if previous is None or not updated.any():
+            return {}
+
+        touched = {}
+        for col in self.columns:
+            if col in KEY_COLUMNS or col not in df.columns or col not in previous.columns:
+                continue
+
+            old = decode_categories(previous[[col]])[col].to_numpy(dtype=object)[updated]
+            new = decode_categories(df[[col]])[col].to_numpy(dtype=object)[updated]
+            old_missing = pd.isna(old)
+            new_missing = pd.isna(new)
+            moved = (old_missing != new_missing) | (~old_missing & ~new_missing & (old != new))
+            if not moved.any():
+                continue
+
+            entries = self._dimensions[col]
+            removed = pd.Series(old[moved & ~old_missing]).value_counts()
+            added = pd.Series(new[moved & ~new_missing]).value_counts()
+
+            for value, count in added.items():
+                entries[value]['count'] += int(count)
+
+            remaining = []
+            for value, count in removed.items():
+                entry = entries.get(value)
+                if entry is None:
+                    continue
+                entry['count'] -= int(count)
+                if entry['count'] <= 0:
+                    del entries[value]
+                    self._sorted.pop(col, None)
+                else:
+                    remaining.append(value)
+
+            if remaining and value_dates is not None:
+                for value, (first_date, last_date) in value_dates(col, remaining).items():
+                    if value in entries:
+                        entries[value]['first_date'] = first_date
+                        entries[value]['last_date'] = last_date
+
+            touched[col] = list(dict.fromkeys(added.index.tolist() + removed.index.tolist()))
+
+        return touched
+
+    def values(self, column: str) -> List[str]:
+        """已排序的去重值"""
+        with self._lock:
+            if column not in self._sorted:
+                self._sorted[column] = sorted(self._dimensions.get(column, {}))
+            return list(self._sorted[column])
+
+    def entries(self, column: str) -> List[Dict[str, Any]]:
+        """按值排序的目录条目：值、记录数、首末交易日期"""
+        with self._lock:
+            dimension = self._dimensions.get(column, {})
+            return [dict(dimension[value], value=value) for value in self.values(column)]
+
+    def checkpoint(self):
+        """写出关键字段哈希文件（关键字段哈希, 内容哈希 两列）和目录文件，并清空变化日志
+
+        哈希文件先于目录文件写出：中断时旧目录文件加上未清空的变化日志仍得到同样的关键字段。
+        """
+        with self._lock:
+            pairs = np.empty((len(self._keys), 2), dtype=np.uint64)
+            pairs[:, 0] = np.fromiter(self._keys.keys(), dtype=np.uint64, count=len(self._keys))
+            pairs[:, 1] = np.fromiter(self._keys.values(), dtype=np.uint64, count=len(self._keys))
+            temp_file = self.keys_file.with_suffix('.tmp')
+            with open(temp_file, 'wb') as f:
+                np.save(f, pairs)
+            os.replace(temp_file, self.keys_file)
+
+            generation = new_generation()
+            data = {
+                'format': CATALOG_FORMAT,
+                'generation': generation,
+                'signature': repr(self.signature),
+                'columns': self.columns,
+                'updated': datetime.now().isoformat(),
+                'total_keys': len(self._keys),
+                'last_update': self._last_update,
+                'ingested': self._ingested,
+                'dimensions': self._dimensions
+            }
+
+            temp_file = self.catalog_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_file, self.catalog_file)
+            self.journal.reset()
+
+            self._generation = generation
+            self._checkpoint_bytes = self.catalog_file.stat().st_size
+            self._changes = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """由计数器直接得出的数据统计"""
+        with self._lock:
+            provinces = self._dimensions.get('省份', {})
+            return {
+                'total_records': len(self._keys),
+                'total_markets': len(self._dimensions.get('市场名称', {})),
+                'total_varieties': len(self._dimensions.get('品种名称', {})),
+                'total_provinces': len(provinces),
+                'last_update': self._last_update,
+                'ingested_today': self._ingested.get(datetime.now().strftime('%Y-%m-%d'), 0),
+                'province_records': {value: entry['count'] for value, entry in provinces.items()},
+                'province_latest_dates': {value: entry['last_date'] for value, entry in provinces.items()}
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """目录规模统计"""
+        with self._lock:
+            return {
+                'loaded': self.loaded,
+                'total_keys': len(self._keys),
+                'uncheckpointed_keys': self._changes,
+                'journal_bytes': self.journal.size,
+                'dimensions': {col: len(values) for col, values in self._dimensions.items()}
+            }
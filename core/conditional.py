@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条件请求 - 由数据版本生成 ETag 与 Last-Modified，客户端缓存的版本未变化时以304应答而不读取数据
+"""
+
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+class Validators:
+    """一个响应的缓存校验值
+
+    parts: 决定响应内容的版本信息（数据版本、存储版本、文件修改时间等），任一变化则 ETag 变化
+    modified: 内容最后变化的时间戳，用于 Last-Modified
+    """
+
+    def __init__(self, parts: Tuple[Any, ...], modified: Optional[float] = None):
+        self.parts = parts
+        self.modified = modified
+        self.etag = '"' + hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=8).hexdigest() + '"'
+
+    def combine(self, other: 'Validators') -> 'Validators':
+        """同时依赖两份数据的响应：版本信息合并，修改时间取较晚者"""
+        times = [value for value in (self.modified, other.modified) if value is not None]
+        return Validators(self.parts + other.parts, max(times) if times else None)
+
+    def headers(self) -> Dict[str, str]:
+        """响应头：ETag、Last-Modified，并要求客户端每次使用缓存前重新校验"""
+        headers = {'ETag': self.etag, 'Cache-Control': 'no-cache'}
+        if self.modified is not None:
+            headers['Last-Modified'] = formatdate(self.modified, usegmt=True)
+        return headers
+
+    def not_modified(self, request_headers: Mapping[str, str]) -> bool:
+        """请求携带的校验值是否与当前一致；有 If-None-Match 时忽略 If-Modified-Since"""
+        if_none_match = request_headers.get('if-none-match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or any(tag.removeprefix('W/') == self.etag for tag in tags)
+
+        if_modified_since = request_headers.get('if-modified-since')
+        if if_modified_since and self.modified is not None:
+            try:
+                return int(self.modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+
+        return False
+
+def file_validators(path: Path) -> Validators:
+    """按文件修改时间与大小生成校验值，文件不存在时也有固定的校验值"""
+    try:
+        stat = Path(path).stat()
+        return Validators((str(path), stat.st_mtime_ns, stat.st_size), stat.st_mtime)
+    except FileNotFoundError:
+        return Validators((str(path), None))
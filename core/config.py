@@ -27,13 +27,24 @@ class Config:
             "server": {
                 "host": "0.0.0.0",
                 "port": 8000,
-                "workers": 1
+                "workers": 1,
+                "blocking_workers": 4  # 执行数据查询、报告读取、导出等阻塞调用的线程数
             },
             "data": {
                 "csv_dir": "data",
                 "backup_dir": "backups",
-                "max_records": 100000,
-                "cleanup_days": 30
+                "max_records": 100000,  # 超出时清理任务按整天删除最早的记录
+                "cleanup_days": 30,  # 交易日期早于该天数的记录降采样为每个 (市场, 品种, 交易日) 一条
+                "retention_batch_days": 31,  # 每次清理任务最多降采样的天数，逐次推进
+                "storage_engine": "csv",  # csv / parquet / sqlite / partitioned
+                "storage_options": {},  # 传给存储引擎的参数，如 partitioned: {"granularity": "month", "file_format": "parquet"}
+                "resident_table": True,  # 价格表常驻内存；关闭时查询由存储引擎按条件扫描
+                "ingest_mode": "append",  # append: 追加增量段并后台压缩; rewrite: 每次写入后立即压缩
+                "compaction_segments": 8,  # 增量段达到该数量时触发后台压缩
+                "write_buffer_rows": 5000,  # 写入缓冲达到该记录数时合并写入，0 表示不缓冲
+                "write_buffer_seconds": 10,  # 缓冲中最早的记录等待超过该秒数时合并写入
+                "search_cache_mb": 64,  # 搜索结果缓存的内存上限（MB），0 表示不缓存
+                "search_cache_ttl_seconds": 300  # 搜索结果缓存条目的过期时间
             },
             "crawler": {
                 "enabled": True,
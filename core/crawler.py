@@ -139,11 +139,11 @@ class MarketCrawler:
                 all_data = self._crawl_all_provinces()
                 
                 if all_data:
-                    # 保存数据
-                    saved_count = self.data_manager.save_data(all_data)
-                    self.crawled_count += saved_count
+                    # 提交到写入缓冲，由数据管理器合并后写入存储
+                    depth = self.data_manager.buffer_data(all_data)
+                    self.crawled_count += len(all_data)
                     
-                    logger.info(f"本轮爬取完成，获取 {len(all_data)} 条数据，已保存 {saved_count} 条")
+                    logger.info(f"本轮爬取完成，获取 {len(all_data)} 条数据，已提交写入缓冲（待写入 {depth} 条）")
                 else:
                     logger.warning("本轮爬取未获取到数据")
                 
@@ -363,6 +363,9 @@ class MarketCrawler:
             'running_time': str(datetime.now() - self.start_time) if self.start_time else None,
             'crawled_count': self.crawled_count,
             'error_count': self.error_count,
+            'last_ingest': self.data_manager.last_ingest,
+            'ingest_totals': {key: self.data_manager.ingest_stats[key] for key in ('new', 'updated', 'unchanged')},
+            'write_buffer': self.data_manager.get_write_buffer_stats(),
             'config': self.config
         }
         
@@ -394,8 +397,8 @@ class MarketCrawler:
             all_data = self._crawl_all_provinces()
             
             if all_data:
-                saved_count = self.data_manager.save_data(all_data)
-                logger.info(f"单次爬取完成，获取 {len(all_data)} 条数据，已保存 {saved_count} 条")
+                depth = self.data_manager.buffer_data(all_data)
+                logger.info(f"单次爬取完成，获取 {len(all_data)} 条数据，已提交写入缓冲（待写入 {depth} 条）")
             else:
                 logger.warning("单次爬取未获取到数据")
             
@@ -1,60 +1,621 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-数据管理器 - 负责CSV数据的存储、查询和管理
+数据管理器 - 负责价格数据的存储、查询和管理
 """
 
-import os
+import sys
+import time
+import threading
+import numpy as np
 import pandas as pd
-import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Any
 from pathlib import Path
 import logging
 
+from .config import config
+from .storage import (
+    CATEGORICAL_COLUMNS, DATE_PATTERN, KEY_COLUMNS, Predicate, apply_predicates, coerce_types, create_storage,
+    date_mask, decode_categories, encode_categories, is_categorical, merge_frames,
+    project_columns, valid_date_range
+)
+from .catalog import DimensionCatalog
+from .conditional import Validators
+from .export import COLUMNAR_FORMATS, check_format, encode_export
+from .journal import new_generation
+from .ordering import OrderIndex
+from .pagination import decode_cursor, encode_cursor, keyset_order, row_ids
+from .result_cache import ResultCache
+from .retention import RetentionPolicy, downsample_daily, expiry_boundary, next_day
+from .rollup import ROLLUP_SOURCE_COLUMNS, DailyRollup
+from .serialization import frame_ndjson, sanitize_frame
+from .series import RESAMPLE_RULES, SERIES_SOURCE_COLUMNS, SeriesStore
+from .snapshot import Snapshot, WriterQueue
+from .text_index import SubstringIndex
+from .upsert import ROW_NEW, ROW_UNCHANGED, ROW_UPDATED, UpsertIndex
+from .write_buffer import WriteBuffer
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 删除最早记录时的范围起点，小于任何有效交易日期
+EARLIEST_DATE = '0000-01-01'
+
+# 流式导出时每块的记录数
+EXPORT_CHUNK_ROWS = 20000
+
+# 流式搜索（NDJSON）时首块的记录数，之后每块翻倍直至上限：首字节快，续取次数少
+SEARCH_STREAM_CHUNK_ROWS = 2000
+SEARCH_STREAM_MAX_CHUNK_ROWS = 20000
+
+# 搜索结果的游标分页：按交易日期倒序，同一日期内按 (市场名称, 品种名称) 倒序
+SEARCH_SORT_COLUMN = '交易日期'
+SEARCH_ID_COLUMNS = ['市场名称', '品种名称']
+
+# 进程启动标识：数据版本号每次启动从1开始，ETag 带上该标识，重启后旧的校验值不会与新版本号重合
+PROCESS_TOKEN = new_generation()
+
 class DataManager:
-    """数据管理器 - 专注于CSV文件操作"""
+    """数据管理器 - 价格数据的存储、查询和管理"""
     
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
-        self.csv_file = self.data_dir / "market_prices.csv"
         self.backup_dir = self.data_dir / "backups"
+        
+        data_config = config.get_data_config()
+        
+        # 存储引擎：csv / parquet / sqlite / partitioned
+        self.storage_engine = data_config.get('storage_engine', 'csv')
+        self.storage = create_storage(
+            self.storage_engine,
+            self.data_dir,
+            **data_config.get('storage_options', {})
+        )
+        
+        # 写入模式：append 追加增量段并后台压缩，rewrite 每次写入后立即压缩
+        self.ingest_mode = data_config.get('ingest_mode', 'append')
+        self.compaction_threshold = data_config.get('compaction_segments', 8)
+        
+        # 是否常驻内存：关闭时查询直接由存储后端按条件扫描
+        self.resident_table = data_config.get('resident_table', True)
+        
+        # 数据以不可变快照发布：写操作经单写者队列依次执行，读取方无锁获取当前快照；
+        # 常驻内存时快照包含合并后的价格表，存储版本变化时重新加载
+        self._snapshot = None
+        self._writer = WriterQueue()
+        self._refresh_requested = False
+        # 进行中的压缩与按日期重写数，两者可能同时进行，最后一个结束时才恢复版本检查
+        self._rewrites = 0
+        self._rewrites_lock = threading.Lock()
+        self.cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'reloads': 0,
+            'merges': 0,
+            'last_reload_ms': 0.0,
+            'total_reload_ms': 0.0
+        }
+        
+        # 省份、品种、市场的子串索引（仅常驻内存时使用）
+        self.text_index = SubstringIndex()
+        
+        # 按保存时间、交易日期维护的排序索引（仅常驻内存时使用）
+        self.order_index = OrderIndex()
+        
+        # 维度目录：省份、品种、市场的去重值、记录数与首末交易日期
+        self.catalog = DimensionCatalog(self.data_dir)
+        
+        # 日汇总：(交易日, 省份, 品种类型, 品种名称) 的平均价 count/sum/min/max，趋势与指标直接读取
+        self.rollup = DailyRollup(self.data_dir)
+        
+        # 时间序列：(市场ID, 品种ID) -> 按交易日排序的价格数组，历史走势直接按序列读取
+        self.series = SeriesStore()
+        
+        # 写入增量统计：按关键字段哈希区分新增、更新、未变化
+        self.upsert_index = UpsertIndex()
+        self.last_ingest = None
+        self.ingest_stats = {
+            'batches': 0,
+            'received': 0,
+            'new': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'last_batch': None
+        }
+        
+        # 写入缓冲：爬虫提交的批次先进入内存，按记录数或时间间隔合并后再调用 save_data
+        buffer_rows = data_config.get('write_buffer_rows', 5000)
+        self.write_buffer = None
+        if buffer_rows:
+            self.write_buffer = WriteBuffer(
+                self.save_data,
+                max_rows=buffer_rows,
+                interval_seconds=data_config.get('write_buffer_seconds', 10)
+            )
+        
+        # 分层保留：cleanup_days 之前的数据降采样为日聚合，总记录数不超过 max_records
+        self.retention = RetentionPolicy(
+            self.data_dir,
+            cleanup_days=data_config.get('cleanup_days', 30),
+            max_records=data_config.get('max_records', 100000),
+            batch_days=data_config.get('retention_batch_days', 31)
+        )
+        
+        # 搜索结果缓存：按规范化的查询条件与数据版本缓存，发布新版本时失效
+        self.search_cache = ResultCache(
+            max_bytes=int(data_config.get('search_cache_mb', 64) * 1024 * 1024),
+            ttl_seconds=data_config.get('search_cache_ttl_seconds', 300)
+        )
+        
+        # 字典编码内存统计（按数据版本缓存）
+        self._memory_stats = None
+        
+        # 增量段压缩
+        self._compaction_thread = None
+        self.compaction_stats = {
+            'compactions': 0,
+            'compacted_segments': 0,
+            'last_compaction': None,
+            'last_compaction_ms': 0.0
+        }
+        
         self.initialize()
     
     def initialize(self):
-        """初始化数据目录和文件"""
+        """初始化数据目录和存储"""
         try:
             # 创建数据目录
             self.data_dir.mkdir(exist_ok=True)
             self.backup_dir.mkdir(exist_ok=True)
             
-            # 如果CSV文件不存在，创建空文件
-            if not self.csv_file.exists():
-                self.create_empty_csv()
+            # 初始化存储（不存在时创建空表）
+            self.storage.initialize()
                 
-            logger.info(f"数据管理器初始化完成，数据目录: {self.data_dir}")
+            logger.info(f"数据管理器初始化完成，数据目录: {self.data_dir}，存储引擎: {self.storage_engine}")
             
         except Exception as e:
             logger.error(f"数据管理器初始化失败: {e}")
             raise
     
-    def create_empty_csv(self):
-        """创建空的CSV文件"""
-        columns = [
-            '省份', '市场名称', '品种名称', '最低价', '平均价', '最高价', 
-            '单位', '交易日期', '更新时间', '保存时间'
-        ]
+    @property
+    def data_version(self) -> int:
+        """当前数据版本号，内容每变化一次加一，可作为缓存键"""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else 0
+    
+    @property
+    def _compacting(self) -> bool:
+        """是否有压缩或按日期重写正在进行（存储版本变化但内容不变）"""
+        with self._rewrites_lock:
+            return self._rewrites > 0
+    
+    def _begin_rewrite(self):
+        """开始一次压缩或按日期重写"""
+        with self._rewrites_lock:
+            self._rewrites += 1
+    
+    def _end_rewrite(self):
+        """结束一次压缩或按日期重写"""
+        with self._rewrites_lock:
+            self._rewrites -= 1
+    
+    def _publish(self, table: Optional[pd.DataFrame], signature: Optional[tuple]) -> Snapshot:
+        """发布新快照（仅在写线程中调用）"""
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        self._snapshot = Snapshot(version, signature, table if self.resident_table else None)
+        self.search_cache.invalidate(version)
+        return self._snapshot
+    
+    def _refresh(self) -> Snapshot:
+        """确保快照与存储版本一致，必要时重新加载（仅在写线程中调用）"""
+        self._refresh_requested = False
+        snapshot = self._snapshot
+        
+        # 压缩期间存储版本变化但内容不变，由压缩完成后沿用快照
+        if snapshot is not None and self._compacting:
+            return snapshot
+        
+        signature = self.storage.signature()
+        
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+        
+        return self._load(signature)
+    
+    def _load(self, signature: Optional[tuple]) -> Snapshot:
+        """按存储当前内容发布新快照（仅在写线程中调用）"""
+        if not self.resident_table:
+            return self._publish(None, signature)
+        
+        start = time.perf_counter()
+        df = encode_categories(self.storage.load())
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        self.cache_stats['reloads'] += 1
+        self.cache_stats['last_reload_ms'] = round(elapsed_ms, 3)
+        self.cache_stats['total_reload_ms'] = round(self.cache_stats['total_reload_ms'] + elapsed_ms, 3)
+        
+        self.text_index.rebuild(df)
+        snapshot = self._publish(df, signature)
+        logger.info(f"重新加载价格表: {len(df)} 条记录，耗时 {elapsed_ms:.1f} ms，数据版本 {snapshot.version}")
+        
+        return snapshot
+    
+    def get_snapshot(self) -> Snapshot:
+        """获取当前快照，不阻塞写入
+
+        存储被外部修改时请求写线程重新加载，本次仍返回当前快照；
+        尚未加载过时等待首次加载完成。返回的快照及其价格表不可修改。
+        """
+        snapshot = self._snapshot
+        
+        if snapshot is None:
+            self.cache_stats['misses'] += 1
+            return self._writer.call(self._refresh)
+        
+        if snapshot.signature != self.storage.signature() and not self._compacting:
+            self.cache_stats['misses'] += 1
+            if not self._refresh_requested:
+                self._refresh_requested = True
+                self._writer.submit(self._refresh)
+        else:
+            self.cache_stats['hits'] += 1
+        
+        return snapshot
+    
+    def get_validators(self) -> Validators:
+        """价格数据的缓存校验值：数据版本与进程启动标识，修改时间为快照发布时间（不读取数据）
+
+        数据版本只在内容变化时递增，压缩等只改变存储版本的操作不会使客户端缓存失效。
+        """
+        snapshot = self.get_snapshot()
+        modified = datetime.fromisoformat(snapshot.created).timestamp()
+        return Validators(('prices', snapshot.version, PROCESS_TOKEN), modified)
+    
+    def _get_table(self) -> pd.DataFrame:
+        """获取当前快照中的价格表（共享对象，调用方不得原地修改）"""
+        return self.get_snapshot().table
+    
+    def get_dataframe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """获取完整的价格数据（只读，调用方不得原地修改）
+
+        省份、市场、品种等列为类别类型，需要填充空值时先用 decode_categories 还原。
+        """
+        if self.resident_table:
+            return project_columns(self._get_table(), columns)
+        
+        return self.storage.load(columns=columns)
+    
+    def _query(self, predicates: Optional[List[Predicate]] = None,
+               columns: Optional[List[str]] = None, order_by: Optional[str] = None,
+               descending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+        """按条件查询：常驻内存时过滤内存表，否则由存储后端扫描（排序与截取一并下推）"""
+        if self.resident_table:
+            table = self._get_table()
+            df, predicates = self.text_index.filter(table, predicates)
+            df = apply_predicates(df, predicates)
+            df = self.order_index.sort_and_limit(table, df, order_by, descending, limit)
+            return project_columns(df, columns)
+        
+        return self.storage.scan(
+            predicates=predicates,
+            columns=columns,
+            order_by=order_by,
+            descending=descending,
+            limit=limit
+        )
+    
+    def _ensure_catalog(self):
+        """确保维度目录与存储版本一致"""
+        if self.catalog.loaded and self.catalog.signature == self.storage.signature():
+            return
+        
+        self._writer.call(self._sync_catalog)
+    
+    def _sync_catalog(self):
+        """优先加载持久化的目录，失败时按全表重建（仅在写线程中调用）"""
+        signature = self.storage.signature()
         
-        df = pd.DataFrame(columns=columns)
-        df.to_csv(self.csv_file, index=False, encoding='utf-8-sig')
-        logger.info(f"创建空CSV文件: {self.csv_file}")
+        if self.catalog.loaded and self.catalog.signature == signature:
+            return
+        
+        if self.catalog.load(signature):
+            logger.info("已加载持久化的维度目录")
+            return
+        
+        snapshot = self._refresh()
+        df = snapshot.table if self.resident_table else self.storage.load()
+        
+        self.catalog.rebuild(df, snapshot.signature)
+        logger.info(f"重建维度目录: {len(df)} 条记录")
+    
+    def _ensure_rollup(self):
+        """确保日汇总与存储版本一致"""
+        if self.rollup.loaded and self.rollup.signature == self.storage.signature():
+            return
+        
+        self._writer.call(self._sync_rollup)
+    
+    def _sync_rollup(self):
+        """优先加载持久化的日汇总，失败时按全表重建（仅在写线程中调用）"""
+        signature = self.storage.signature()
+        
+        if self.rollup.loaded and self.rollup.signature == signature:
+            return
+        
+        if self.rollup.load(signature):
+            logger.info("已加载持久化的日汇总")
+            return
+        
+        snapshot = self._refresh()
+        df = snapshot.table if self.resident_table else self.storage.scan(columns=ROLLUP_SOURCE_COLUMNS)
+        
+        self.rollup.rebuild(df, snapshot.signature)
+        logger.info(f"重建日汇总: {len(df)} 条记录")
+    
+    def _previous_dimensions(self, snapshot: Snapshot, df: pd.DataFrame, status: np.ndarray) -> Optional[pd.DataFrame]:
+        """批次中更新的行被覆盖前的非关键字段维度值（与 df 行对齐，其余行为空），供维度目录移动记录数"""
+        columns = [col for col in self.catalog.columns if col not in KEY_COLUMNS and col in df.columns]
+        updated = status == ROW_UPDATED
+        if not columns or not updated.any():
+            return None
+        
+        previous = pd.DataFrame({col: np.full(len(df), None, dtype=object) for col in columns})
+        
+        if self.resident_table:
+            table = snapshot.table
+            positions = self.upsert_index.lookup(table, df[updated])
+            found = positions >= 0
+            rows = np.flatnonzero(updated)[found]
+            for col in columns:
+                if col in table.columns:
+                    previous.loc[rows, col] = decode_categories(table[[col]])[col].to_numpy(dtype=object)[positions[found]]
+            return previous
+        
+        keys = decode_categories(df.loc[updated, KEY_COLUMNS])
+        stored = self.storage.scan(
+            predicates=[(col, 'in', keys[col].astype(str).unique().tolist()) for col in KEY_COLUMNS],
+            columns=KEY_COLUMNS + columns
+        )
+        if stored.empty:
+            return previous
+        
+        stored = decode_categories(stored).set_index(KEY_COLUMNS)
+        stored = stored[~stored.index.duplicated(keep='last')]
+        positions = stored.index.get_indexer(pd.MultiIndex.from_frame(keys.astype(str)))
+        found = positions >= 0
+        rows = np.flatnonzero(updated)[found]
+        for col in columns:
+            if col in stored.columns:
+                previous.loc[rows, col] = stored[col].to_numpy(dtype=object)[positions[found]]
+        return previous
+    
+    def _value_dates(self, table: Optional[pd.DataFrame], column: str,
+                     values: List[str]) -> Dict[str, tuple]:
+        """写入后各维度值的首末交易日期（只含仍有记录的值）"""
+        if table is not None:
+            rows = decode_categories(table[table[column].isin(values)][[column, '交易日期']])
+        else:
+            rows = decode_categories(self.storage.scan(
+                predicates=[(column, 'in', list(values))], columns=[column, '交易日期']
+            ))
+        
+        if rows.empty:
+            return {}
+        
+        dates = rows['交易日期'].astype(str).str[:10]
+        dates = dates.where(dates.str.match(DATE_PATTERN.pattern))
+        grouped = pd.DataFrame({'value': rows[column], 'date': dates}).groupby('value')['date']
+        first, last = grouped.min(), grouped.max()
+        return {
+            value: (first[value] if isinstance(first[value], str) else None,
+                    last[value] if isinstance(last[value], str) else None)
+            for value in first.index
+        }
+    
+    def _day_rows(self, table: Optional[pd.DataFrame], days: List[str]) -> pd.DataFrame:
+        """写入后覆盖 days 的全部记录（可能多出范围内的其他交易日），供日汇总重算"""
+        start, end = min(days), next_day(max(days))
+        
+        if table is not None:
+            return table[date_mask(table, start, end)]
+        
+        return self.storage.scan(
+            predicates=[('交易日期', '>=', start), ('交易日期', '<', end)],
+            columns=ROLLUP_SOURCE_COLUMNS
+        )
+    
+    def get_price_trends(self, days: int = 30, province: Optional[str] = None,
+                         variety: Optional[str] = None, variety_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """最新交易日之前 days 天内每个交易日的平均价（读日汇总，平均价为空的记录不计入）"""
+        try:
+            self._ensure_rollup()
+            return self.rollup.daily(days, province=province, variety=variety, variety_type=variety_type)
+            
+        except Exception as e:
+            logger.error(f"获取价格趋势失败: {e}")
+            return []
+    
+    def get_price_metrics(self) -> Dict[str, Any]:
+        """全部数据的平均价均值、最高、最低及最新交易日日均价的环比（读日汇总）"""
+        try:
+            self._ensure_rollup()
+            return self.rollup.metrics()
+            
+        except Exception as e:
+            logger.error(f"获取价格指标失败: {e}")
+            return {}
+    
+    def _ensure_series(self):
+        """确保时间序列与存储版本一致"""
+        if self.series.loaded and self.series.signature == self.storage.signature():
+            return
+        
+        self._writer.call(self._sync_series)
+    
+    def _sync_series(self):
+        """按全表构建时间序列（仅在写线程中调用）"""
+        signature = self.storage.signature()
+        
+        if self.series.loaded and self.series.signature == signature:
+            return
+        
+        snapshot = self._refresh()
+        df = snapshot.table if self.resident_table else self.storage.scan(columns=SERIES_SOURCE_COLUMNS)
+        
+        self.series.rebuild(df, snapshot.signature)
+        logger.info(f"构建时间序列: {self.series.get_stats()['series']} 条序列，{len(df)} 条记录")
+    
+    def get_series(self, keys: Optional[List[tuple]] = None, market_id: Optional[str] = None,
+                   variety_id: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                   resample: str = 'day', limit: int = 50) -> Dict[str, Any]:
+        """读取一条或多条 (市场ID, 品种ID) 价格序列
+
+        keys 指定序列；也可只给 market_id 或 variety_id 取该市场或该品种的全部序列（最多 limit 条）。
+        resample 为 day/week/month；不存在的序列列在 missing 中。
+        """
+        if resample not in RESAMPLE_RULES:
+            raise ValueError(f"不支持的重采样粒度: {resample}，可选: {', '.join(RESAMPLE_RULES)}")
+        
+        self._ensure_series()
+        
+        keys = list(keys or []) or self.series.find(market_id, variety_id)
+        keys = keys[:max(1, limit)]
+        
+        series = []
+        missing = []
+        for key in keys:
+            result = self.series.read(key, start, end, resample)
+            if result is None:
+                missing.append(f"{key[0]}:{key[1]}")
+            else:
+                series.append(result)
+        
+        return {'series': series, 'missing': missing}
+    
+    def get_dimension_catalog(self, column: str) -> List[Dict[str, Any]]:
+        """维度目录条目：值、记录数、首末交易日期（按值排序）"""
+        try:
+            self._ensure_catalog()
+            return self.catalog.entries(column)
+            
+        except Exception as e:
+            logger.error(f"获取维度目录失败: {e}")
+            return []
+    
+    def _date_range(self) -> tuple:
+        """获取交易日期的最小值与最大值"""
+        if not self.resident_table:
+            return self.storage.date_range()
+        
+        df = self._get_table()
+        
+        if df.empty or '交易日期' not in df.columns:
+            return None, None
+        
+        return valid_date_range(df['交易日期'])
+    
+    def get_recent_data(self, days: int = 30, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """获取最新交易日期之前 days 天内的价格数据（只读）
+
+        分区存储只打开与时间窗口重叠的分区。
+        """
+        _, latest_date = self._date_range()
+        
+        if latest_date is None:
+            return pd.DataFrame()
+        
+        start_date = (pd.Timestamp(latest_date[:10]) - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+        
+        return self._query([('交易日期', '>=', start_date)], columns=columns)
+    
+    def get_memory_stats(self) -> Optional[Dict[str, Any]]:
+        """字典编码列的内存占用，与按普通文本列存储时的估算占用对比"""
+        if not self.resident_table:
+            return None
+        
+        snapshot = self.get_snapshot()
+        df = snapshot.table
+        version = snapshot.version
+        
+        cached = self._memory_stats
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        encoded_bytes = 0
+        object_bytes = 0
+        columns = []
+        
+        for col in CATEGORICAL_COLUMNS:
+            if col not in df.columns or not is_categorical(df[col]):
+                continue
+            
+            series = df[col]
+            codes = series.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+            sizes = np.array([sys.getsizeof(value) for value in series.cat.categories], dtype=np.int64)
+            
+            # object列：每行一个指针，外加每个元素的字符串对象（空值为float NaN）
+            column_object_bytes = (
+                8 * len(series)
+                + int((counts * sizes).sum())
+                + int((codes < 0).sum()) * sys.getsizeof(np.nan)
+            )
+            
+            encoded_bytes += int(series.memory_usage(deep=True, index=False))
+            object_bytes += column_object_bytes
+            columns.append(col)
+        
+        saved_bytes = object_bytes - encoded_bytes
+        stats = {
+            'categorical_columns': columns,
+            'table_bytes': int(df.memory_usage(deep=True, index=False).sum()) if not df.empty else 0,
+            'encoded_bytes': encoded_bytes,
+            'object_bytes': object_bytes,
+            'saved_bytes': saved_bytes,
+            'reduction_percent': round(saved_bytes / object_bytes * 100, 2) if object_bytes else 0.0
+        }
+        
+        self._memory_stats = (version, stats)
+        
+        return stats
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取内存表缓存统计"""
+        snapshot = self._snapshot
+        stats = dict(self.cache_stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['data_version'] = snapshot.version if snapshot is not None else 0
+        stats['snapshot_created'] = snapshot.created if snapshot is not None else None
+        stats['resident_table'] = self.resident_table
+        stats['cached_records'] = snapshot.records if snapshot is not None else 0
+        stats['writer'] = self._writer.get_stats()
+        stats['text_index'] = self.text_index.get_stats()
+        stats['order_index'] = self.order_index.get_stats()
+        stats['catalog'] = self.catalog.get_stats()
+        stats['rollup'] = self.rollup.get_stats()
+        stats['series'] = self.series.get_stats()
+        stats['upsert_index'] = self.upsert_index.get_stats()
+        stats['search_cache'] = self.search_cache.get_stats()
+        return stats
+    
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """获取存储引擎、写入模式与压缩统计"""
+        stats = self.storage.storage_stats()
+        stats.update(self.compaction_stats)
+        stats['ingest_mode'] = self.ingest_mode
+        stats['compaction_running'] = bool(self._compaction_thread and self._compaction_thread.is_alive())
+        return stats
     
     def save_data(self, data_list: List[Dict]) -> int:
-        """保存数据到CSV文件"""
+        """保存数据
+
+        追加模式下新批次只写入一个增量段，写入代价与历史数据量无关；
+        重写模式下写入后立即把增量段压缩进主文件。
+        """
         if not data_list:
             logger.warning("没有数据需要保存")
             return 0
@@ -68,37 +629,325 @@ class DataManager:
             
             # 标准化列名
             df = self._standardize_columns(df)
+            df = coerce_types(df)
             
-            # 如果CSV文件已存在，合并数据
-            if self.csv_file.exists() and self.csv_file.stat().st_size > 0:
-                existing_df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
-                
-                # 合并数据
-                combined_df = pd.concat([existing_df, df], ignore_index=True)
-                
-                # 去重（基于关键字段）
-                if self._has_key_columns(combined_df):
-                    combined_df = combined_df.drop_duplicates(
-                        subset=['市场名称', '品种名称', '交易日期'], 
-                        keep='last'
-                    )
+            # 批次内关键字段重复时保留最后一条
+            df = df.drop_duplicates(subset=KEY_COLUMNS, keep='last').reset_index(drop=True)
+            
+            # 交给写线程执行，多个线程同时保存时依次写入
+            delta, df, result = self._writer.call(self._apply_batch, df, len(data_list))
+            
+            if df is None:
+                logger.info(f"收到 {len(data_list)} 条数据，均与已有记录相同，无需写入")
+            elif self.ingest_mode == 'rewrite':
+                compact_result = self.compact()
+                logger.info(f"成功保存 {len(df)} 条数据（新增 {delta['new']}，更新 {delta['updated']}，"
+                            f"未变化 {delta['unchanged']}），总记录数: {compact_result.get('total_records')}")
+            else:
+                logger.info(f"成功追加 {len(df)} 条数据到增量段 {result.get('segment')}（新增 {delta['new']}，"
+                            f"更新 {delta['updated']}，未变化 {delta['unchanged']}）")
+                self._maybe_start_compaction()
+            
+            return delta['new'] + delta['updated']
+            
+        except Exception as e:
+            logger.error(f"保存数据失败: {e}")
+            raise
+    
+    def buffer_data(self, data_list: List[Dict]) -> int:
+        """提交一批数据到写入缓冲，立即返回当前缓冲的记录数
+
+        缓冲按记录数阈值或时间间隔合并写入，应用关闭时由 close 写出剩余记录，
+        关闭后提交的批次直接保存；未启用缓冲时直接保存并返回0。
+        """
+        if not data_list:
+            return self.write_buffer.depth() if self.write_buffer else 0
+        
+        if self.write_buffer is None:
+            self.save_data(data_list)
+            return 0
+        
+        return self.write_buffer.add(data_list)
+    
+    def flush(self) -> Dict[str, Any]:
+        """立即写出写入缓冲中的全部记录"""
+        if self.write_buffer is None:
+            return {'rows': 0, 'elapsed_ms': 0.0}
+        
+        return self.write_buffer.flush()
+    
+    def get_write_buffer_stats(self) -> Dict[str, Any]:
+        """写入缓冲深度与刷新延迟"""
+        if self.write_buffer is None:
+            return {'enabled': False}
+        
+        stats = self.write_buffer.get_stats()
+        stats['enabled'] = True
+        return stats
+    
+    def close(self):
+        """关闭数据管理器：写出缓冲中的剩余记录并等待后台压缩结束"""
+        try:
+            if self.write_buffer is not None:
+                result = self.write_buffer.close()
+                logger.info(f"写入缓冲已关闭，写出剩余 {result['rows']} 条记录")
+            
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                self._compaction_thread.join()
+            
+        except Exception as e:
+            logger.error(f"关闭数据管理器失败: {e}")
+            raise
+    
+    def _apply_batch(self, df: pd.DataFrame, received: int) -> tuple:
+        """写入一个批次并发布新快照（仅在写线程中调用）
+
+        返回 (写入增量, 实际写入的行, 存储写入结果)，没有需要写入的行时后两项为None。
+        """
+        snapshot = self._refresh()
+        self._sync_catalog()
+        
+        # 按关键字段哈希把每行分为新增、更新、未变化，未变化的行不再写入
+        keys, contents, status = self.catalog.classify(df)
+        delta = self._record_ingest(received, status)
+        changed = status != ROW_UNCHANGED
+        
+        if not changed.any():
+            return delta, None, None
+        
+        df = df[changed].reset_index(drop=True)
+        previous = self._previous_dimensions(snapshot, df, status[changed])
+        before = self.storage.signature()
+        rollup_current = self.rollup.loaded and self.rollup.signature == before
+        series_current = self.series.loaded and self.series.signature == before
+        result = self.storage.save(df)
+        signature = self.storage.signature()
+        self.retention.note_written(df['交易日期'])
+        
+        table = None
+        if self.resident_table:
+            table = self.upsert_index.merge(snapshot.table, [df])
+            self.text_index.add(df)
+            self.cache_stats['merges'] += 1
+        
+        self.catalog.update(
+            df, keys[changed], contents[changed], status[changed], signature, previous,
+            lambda column, values: self._value_dates(table, column, values)
+        )
+        
+        # 日汇总未加载或已过期时不增量维护，下次查询时按存储重建
+        if rollup_current:
+            try:
+                self.rollup.update(df, status[changed], lambda days: self._day_rows(table, days), signature)
+            except Exception as e:
+                logger.error(f"日汇总增量更新失败，将在下次查询时重建: {e}")
+                self.rollup.loaded = False
+        
+        if series_current:
+            self.series.update(df, signature)
+        
+        self._publish(table, signature)
+        
+        return delta, df, result
+    
+    def _record_ingest(self, received: int, status) -> Dict[str, Any]:
+        """记录一个批次的写入增量：新增、更新、未变化的行数"""
+        delta = {
+            'received': received,
+            'new': int((status == ROW_NEW).sum()),
+            'updated': int((status == ROW_UPDATED).sum()),
+            'unchanged': int((status == ROW_UNCHANGED).sum()),
+            'time': datetime.now().isoformat()
+        }
+        
+        self.ingest_stats['batches'] += 1
+        for key in ('received', 'new', 'updated', 'unchanged'):
+            self.ingest_stats[key] += delta[key]
+        self.ingest_stats['last_batch'] = delta
+        self.last_ingest = delta
+        
+        return delta
+    
+    def _maybe_start_compaction(self):
+        """增量段数量达到阈值时在后台启动压缩"""
+        if self.storage.storage_stats().get('pending_segments', 0) < self.compaction_threshold:
+            return
+        
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        
+        self._compaction_thread = threading.Thread(target=self.compact, name="price-compaction", daemon=True)
+        self._compaction_thread.start()
+    
+    def compact(self) -> Dict[str, Any]:
+        """压缩存储：合并增量段，关键字段相同时后写覆盖
+
+        写出期间不占用写线程，读写请求照常进行。压缩不改变数据内容，
+        完成后若期间没有新的写入，当前快照直接沿用而无需重新加载。
+        """
+        try:
+            snapshot = self.get_snapshot()
+            before = self.storage.signature()
+            
+            start = time.perf_counter()
+            self._begin_rewrite()
+            try:
+                if self.resident_table:
+                    result = self.storage.compact(merged=snapshot.table, signature=snapshot.signature)
+                else:
+                    result = self.storage.compact()
                 
-                df = combined_df
+                if result.get('compacted_segments'):
+                    self._writer.call(self._adopt_compaction, snapshot, before)
+            finally:
+                self._end_rewrite()
             
-            # 保存到CSV
-            df.to_csv(self.csv_file, index=False, encoding='utf-8-sig')
+            if not result.get('compacted_segments'):
+                return result
             
-            logger.info(f"成功保存 {len(data_list)} 条数据，CSV文件总记录数: {len(df)}")
+            self.compaction_stats['compactions'] += 1
+            self.compaction_stats['compacted_segments'] += result['compacted_segments']
+            self.compaction_stats['last_compaction'] = datetime.now().isoformat()
+            self.compaction_stats['last_compaction_ms'] = round((time.perf_counter() - start) * 1000, 3)
             
-            # 创建备份
+            # 压缩后主文件包含全部已合并数据，此时创建备份
             self._create_backup()
             
-            return len(data_list)
+            return result
             
         except Exception as e:
-            logger.error(f"保存数据失败: {e}")
+            logger.error(f"存储压缩失败: {e}")
+            raise
+    
+    def apply_retention(self) -> Dict[str, Any]:
+        """执行分层保留：较早的数据降采样、超出的记录按整天删除，最后压缩存储
+
+        每次最多降采样 retention_batch_days 天，进度持久化，多次执行逐步推进；
+        此后写入的、落在已降采样日期内的带时间记录，其交易日在下次执行时重新降采样。
+        替换写出期间读取方继续使用当前快照，新的写入照常进行。
+        """
+        try:
+            start = time.perf_counter()
+            result = {'downsampled': None, 'late': None, 'expired': None}
+            
+            # 1. cleanup_days 之前的交易日按 (市场, 品种, 交易日) 聚合为每天一条
+            first_date, _ = self._date_range()
+            window = self.retention.next_window(first_date)
+            if window is not None:
+                result['downsampled'] = self._rewrite_dates(window[0], window[1], downsample_daily)
+                result['downsampled'].update(start=window[0], end=window[1])
+                self.retention.advance(window[1])
+            
+            # 晚到的带时间记录落在已降采样的日期内时，重新降采样这些交易日
+            late = self.retention.late_windows()
+            if late:
+                result['late'] = {'removed': 0, 'written': 0, 'windows': late}
+                for late_start, late_end in late:
+                    rewritten = self._rewrite_dates(late_start, late_end, downsample_daily)
+                    result['late']['removed'] += rewritten.get('removed', 0)
+                    result['late']['written'] += rewritten.get('written', 0)
+                self.retention.clear_late(late)
+            
+            # 2. 总记录数超过 max_records 时删除最早的若干交易日
+            expire_end = expiry_boundary(self._trade_dates(), self.retention.max_records)
+            if expire_end is not None:
+                result['expired'] = self._rewrite_dates(EARLIEST_DATE, expire_end, None)
+                result['expired'].update(end=expire_end)
+            
+            # 3. 合并增量段
+            result['compaction'] = self.compact()
+            result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            
+            self.retention.record_run(result)
+            
+            logger.info(f"分层保留完成: 降采样 {result['downsampled']}，过期删除 {result['expired']}，"
+                        f"耗时 {result['elapsed_ms']:.1f} ms")
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"分层保留失败: {e}")
             raise
     
+    def _trade_dates(self) -> pd.Series:
+        """全部记录的交易日期"""
+        if self.resident_table:
+            df = self._get_table()
+        else:
+            df = self.storage.scan(columns=['交易日期'])
+        
+        if df.empty or '交易日期' not in df.columns:
+            return pd.Series(dtype=object)
+        
+        return df['交易日期']
+    
+    def _rewrite_dates(self, start: str, end: str, transform) -> Dict[str, Any]:
+        """把交易日期在 [start, end) 内的记录替换为 transform(原记录)，transform 为None时删除
+
+        与压缩相同：存储写出在调用线程中进行，完成后由写线程发布新快照。
+        """
+        snapshot = self.get_snapshot()
+        
+        if self.resident_table:
+            table = snapshot.table
+            mask = date_mask(table, start, end)
+            rows = table[mask]
+        else:
+            rows = self.storage.scan(predicates=[('交易日期', '>=', start), ('交易日期', '<', end)])
+        
+        if rows.empty:
+            return {'removed': 0, 'written': 0}
+        
+        replacement = transform(rows) if transform is not None else rows.iloc[0:0]
+        
+        # 已是目标粒度，无需重写
+        if transform is not None and len(replacement) == len(rows):
+            return {'removed': 0, 'written': 0, 'unchanged': len(rows)}
+        
+        merged = None
+        if self.resident_table:
+            merged = merge_frames([table[~mask], encode_categories(replacement)])
+            merged = encode_categories(merged.reset_index(drop=True))
+        
+        self._begin_rewrite()
+        try:
+            if self.resident_table:
+                result = self.storage.replace_dates(start, end, replacement, merged=merged, signature=snapshot.signature)
+            else:
+                result = self.storage.replace_dates(start, end, replacement)
+            
+            self._writer.call(self._adopt_rewrite, snapshot, merged)
+        finally:
+            self._end_rewrite()
+        
+        result['removed'] = len(rows)
+        return result
+    
+    def _adopt_rewrite(self, snapshot: Snapshot, table: Optional[pd.DataFrame]):
+        """发布替换后的快照；替换期间有新的写入时按存储重新加载（仅在写线程中调用）"""
+        signature = self.storage.signature()
+        
+        if self.resident_table and self._snapshot is not snapshot:
+            self._load(signature)
+        else:
+            self._publish(table, signature)
+    
+    def _adopt_compaction(self, snapshot: Snapshot, before: Optional[tuple]):
+        """压缩不改变内容：期间没有新写入时快照与目录沿用，只更新存储版本（仅在写线程中调用）"""
+        signature = self.storage.signature()
+        
+        if self._snapshot is snapshot and snapshot.signature == before:
+            self._snapshot = snapshot.with_signature(signature)
+        
+        if self.catalog.loaded and self.catalog.signature == before:
+            self.catalog.mark(signature)
+        
+        if self.rollup.loaded and self.rollup.signature == before:
+            self.rollup.mark(signature)
+        
+        if self.series.loaded and self.series.signature == before:
+            self.series.mark(signature)
+    
     def _standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """标准化列名"""
         column_mapping = {
@@ -124,143 +973,240 @@ class DataManager:
         
         return df
     
-    def _has_key_columns(self, df: pd.DataFrame) -> bool:
-        """检查是否有关键列用于去重"""
-        key_columns = ['市场名称', '品种名称', '交易日期']
-        return all(col in df.columns for col in key_columns)
+    def _build_predicates(self, province: Optional[str] = None, variety: Optional[str] = None,
+                          market: Optional[str] = None, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None) -> List[Predicate]:
+        """把搜索参数转换为存储过滤条件"""
+        predicates = []
+        
+        if province:
+            predicates.append(('省份', 'contains', province))
+        
+        if variety:
+            predicates.append(('品种名称', 'contains', variety))
+        
+        if market:
+            predicates.append(('市场名称', 'contains', market))
+        
+        if date_from:
+            predicates.append(('交易日期', '>=', date_from))
+        
+        if date_to:
+            predicates.append(('交易日期', '<=', date_to))
+        
+        return predicates
     
-    def search_data(self, province: Optional[str] = None, variety: Optional[str] = None, 
-                   market: Optional[str] = None, date_from: Optional[str] = None,
-                   date_to: Optional[str] = None, limit: int = 100) -> List[Dict]:
-        """搜索数据"""
+    @staticmethod
+    def _search_key(province: Optional[str], variety: Optional[str], market: Optional[str],
+                    date_from: Optional[str], date_to: Optional[str], limit: int) -> tuple:
+        """规范化的搜索条件：去除首尾空白，空字符串视为未指定"""
+        def normalize(value: Optional[str]) -> Optional[str]:
+            value = value.strip() if isinstance(value, str) else value
+            return value or None
+        
+        return (normalize(province), normalize(variety), normalize(market),
+                normalize(date_from), normalize(date_to), int(limit))
+    
+    def _keyset_page(self, predicates: List[Predicate], after: Optional[Dict[str, Any]],
+                     limit: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """取 (交易日期, 行ID) 倒序排在游标之后的 limit 条记录
+
+        游标所在日期只读取该日期的记录；其后的日期由存储按日期倒序截取，
+        截取边界所在日期补读完整，保证同一日期内按行ID排序不遗漏。
+        """
+        frames = []
+        need = limit
+        
+        if after is not None:
+            key, row_id = after['k'], after['id']
+            same_day = self._query(predicates + [(SEARCH_SORT_COLUMN, '==', key)], columns)
+            if not same_day.empty:
+                same_day = same_day[(row_ids(same_day, SEARCH_ID_COLUMNS) < row_id).to_numpy()]
+                frames.append(same_day)
+                need -= len(same_day)
+            predicates = predicates + [(SEARCH_SORT_COLUMN, '<', key)]
+        
+        if need > 0:
+            older = self._query(predicates, columns, order_by=SEARCH_SORT_COLUMN, limit=need)
+            if not older.empty:
+                older = older[older[SEARCH_SORT_COLUMN].notna().to_numpy()]
+            
+            if len(older) >= need:
+                # 截取边界上的日期可能只取到一部分
+                boundary = str(older[SEARCH_SORT_COLUMN].iloc[-1])
+                older = older[(older[SEARCH_SORT_COLUMN] != boundary).to_numpy()]
+                frames.append(older)
+                frames.append(self._query(predicates + [(SEARCH_SORT_COLUMN, '==', boundary)], columns))
+            else:
+                frames.append(older)
+        
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        
+        df = frames[0] if len(frames) == 1 else pd.concat(
+            [decode_categories(frame) for frame in frames], ignore_index=True
+        )
+        return keyset_order(df, SEARCH_SORT_COLUMN, SEARCH_ID_COLUMNS, limit)
+    
+    @staticmethod
+    def _keyset_anchor(df: pd.DataFrame) -> Dict[str, Any]:
+        """一页最后一行的 (交易日期, 行ID)，下一页从其后开始"""
+        last = decode_categories(df.tail(1))
+        return {'k': str(last[SEARCH_SORT_COLUMN].iloc[0]), 'id': row_ids(last, SEARCH_ID_COLUMNS).iloc[0]}
+    
+    @staticmethod
+    def _search_read_columns(columns: Optional[List[str]]) -> Optional[List[str]]:
+        """搜索时从存储读取的列：返回列加上排序与行ID所需的列"""
+        if not columns:
+            return None
+        return list(dict.fromkeys(list(columns) + [SEARCH_SORT_COLUMN] + SEARCH_ID_COLUMNS))
+    
+    def search_page(self, province: Optional[str] = None, variety: Optional[str] = None,
+                    market: Optional[str] = None, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, limit: int = 100,
+                    cursor: Optional[str] = None, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """按游标分页搜索，返回 {'data': 已清理的DataFrame, 'next_cursor': 下一页游标或None, 'version': 数据版本}
+
+        按 (交易日期, 市场名称+品种名称) 倒序，游标记录上一页最后一行，
+        翻到任意深度的代价都与第一页相同，新写入的记录不会使已翻过的页错位。
+        游标不绑定数据版本，version 为本页所读快照的版本。
+        columns 指定返回的列，只从存储读取这些列与排序所需的列。
+        游标无效或与查询条件不一致时抛出 ValueError。
+        相同条件在同一数据版本内的重复请求直接返回缓存的结果（只读，不得原地修改）。
+        """
+        key = self._search_key(province, variety, market, date_from, date_to, limit)
+        after = decode_cursor(cursor, 'search', key) if cursor else None
+        
         try:
-            if not self.csv_file.exists():
-                return []
+            version = self.get_snapshot().version
+            cache_key = key + (cursor or None, tuple(columns) if columns else None)
             
-            df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
+            cached = self.search_cache.get(cache_key, version)
+            if cached is not None:
+                return cached
             
-            if df.empty:
-                return []
+            # 应用过滤条件，多取一条判断是否还有下一页
+            predicates = self._build_predicates(*key[:5])
+            df = self._keyset_page(predicates, after, limit + 1, self._search_read_columns(columns))
             
-            # 应用过滤条件
-            if province:
-                df = df[df['省份'].str.contains(province, na=False)]
+            next_cursor = None
+            if len(df) > limit:
+                df = df.head(limit)
+                anchor = self._keyset_anchor(df)
+                next_cursor = encode_cursor('search', key, anchor['k'], anchor['id'])
             
-            if variety:
-                df = df[df['品种名称'].str.contains(variety, na=False)]
+            df = project_columns(df.reset_index(drop=True), columns)
+            page = {'data': sanitize_frame(df), 'next_cursor': next_cursor, 'version': version}
             
-            if market:
-                df = df[df['市场名称'].str.contains(market, na=False)]
+            # 搜索期间发布了新版本时结果可能来自新版本，不缓存
+            if self.data_version == version:
+                self.search_cache.put(cache_key, version, page)
             
-            if date_from:
-                df = df[df['交易日期'] >= date_from]
+            return page
             
-            if date_to:
-                df = df[df['交易日期'] <= date_to]
+        except Exception as e:
+            logger.error(f"搜索数据失败: {e}")
+            return {'data': pd.DataFrame(), 'next_cursor': None, 'version': self.data_version}
+    
+    def search_frame(self, province: Optional[str] = None, variety: Optional[str] = None,
+                     market: Optional[str] = None, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None, limit: int = 100,
+                     columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """搜索数据（第一页），返回已清理（可直接JSON序列化）的DataFrame"""
+        return self.search_page(province, variety, market, date_from, date_to, limit, columns=columns)['data']
+    
+    def stream_search(self, province: Optional[str] = None, variety: Optional[str] = None,
+                      market: Optional[str] = None, date_from: Optional[str] = None,
+                      date_to: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None,
+                      columns: Optional[List[str]] = None,
+                      chunk_rows: int = SEARCH_STREAM_CHUNK_ROWS) -> Iterator[bytes]:
+        """流式搜索：结果与 search_page 逐页翻完相同，编码为NDJSON逐块输出
+
+        每块是一次按游标续取的查询，首块 chunk_rows 条、之后逐块翻倍（不超过 SEARCH_STREAM_MAX_CHUNK_ROWS），
+        取到即编码输出，内存占用与块大小有关而与 limit 无关。游标无效时立即抛出 ValueError。
+        """
+        key = self._search_key(province, variety, market, date_from, date_to, limit)
+        after = decode_cursor(cursor, 'search', key) if cursor else None
+        predicates = self._build_predicates(*key[:5])
+        
+        return self._iter_search(predicates, after, key[5], columns, max(1, int(chunk_rows)))
+    
+    def _iter_search(self, predicates: List[Predicate], after: Optional[Dict[str, Any]], limit: int,
+                     columns: Optional[List[str]], chunk_rows: int) -> Iterator[bytes]:
+        """按 (交易日期, 行ID) 倒序逐块续取，直到取满 limit 条或没有更多记录"""
+        max_chunk_rows = max(chunk_rows, SEARCH_STREAM_MAX_CHUNK_ROWS)
+        read_columns = self._search_read_columns(columns)
+        remaining = limit
+        total = 0
+        
+        try:
+            while remaining > 0:
+                size = min(chunk_rows, remaining)
+                df = self._keyset_page(predicates, after, size, read_columns)
+                if df.empty:
+                    break
+                
+                after = self._keyset_anchor(df)
+                remaining -= len(df)
+                total += len(df)
+                yield frame_ndjson(sanitize_frame(project_columns(df.reset_index(drop=True), columns)))
+                
+                if len(df) < size:
+                    break
+                
+                chunk_rows = min(chunk_rows * 2, max_chunk_rows)
             
-            # 排序和限制数量
-            if '交易日期' in df.columns:
-                df = df.sort_values('交易日期', ascending=False)
+            logger.info(f"流式搜索完成: {total} 条记录")
             
-            df = df.head(limit)
+        except Exception as e:
+            logger.error(f"流式搜索失败: {e}")
+            raise
+    
+    def search_data(self, province: Optional[str] = None, variety: Optional[str] = None, 
+                   market: Optional[str] = None, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """搜索数据"""
+        return self.search_frame(province, variety, market, date_from, date_to, limit).to_dict('records')
+    
+    def get_search_cache_stats(self) -> Dict[str, Any]:
+        """搜索结果缓存的命中率与内存占用"""
+        stats = self.search_cache.get_stats()
+        stats['data_version'] = self.data_version
+        return stats
+    
+    def get_latest_frame(self, limit: int = 50, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """获取最新数据，返回已清理（可直接JSON序列化）的DataFrame，columns 指定只读取与返回的列"""
+        try:
+            # 按保存时间倒序
+            df = self._query(columns=columns, order_by='保存时间', limit=limit)
             
-            # 清理数据并转换为字典列表
-            df = df.fillna('')  # 将NaN替换为空字符串
-            records = df.to_dict('records')
-
-            # 进一步清理数据，确保JSON序列化兼容
-            cleaned_records = []
-            for record in records:
-                cleaned_record = {}
-                for key, value in record.items():
-                    if pd.isna(value):
-                        cleaned_record[key] = ''
-                    elif isinstance(value, float) and (pd.isna(value) or value == float('inf') or value == float('-inf')):
-                        cleaned_record[key] = 0
-                    else:
-                        cleaned_record[key] = value
-                cleaned_records.append(cleaned_record)
-
-            return cleaned_records
+            return sanitize_frame(df)
             
         except Exception as e:
-            logger.error(f"搜索数据失败: {e}")
-            return []
+            logger.error(f"获取最新数据失败: {e}")
+            return pd.DataFrame()
     
     def get_latest_data(self, limit: int = 50) -> List[Dict]:
         """获取最新数据"""
-        try:
-            if not self.csv_file.exists():
-                return []
-
-            df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
-
-            if df.empty:
-                return []
-
-            # 清理数据：处理NaN值
-            df = df.fillna('')  # 将NaN替换为空字符串
-
-            # 按保存时间排序
-            if '保存时间' in df.columns:
-                df = df.sort_values('保存时间', ascending=False)
-            elif '交易日期' in df.columns:
-                df = df.sort_values('交易日期', ascending=False)
-
-            df = df.head(limit)
-
-            # 转换为字典并清理数值
-            records = df.to_dict('records')
-
-            # 进一步清理数据，确保JSON序列化兼容
-            cleaned_records = []
-            for record in records:
-                cleaned_record = {}
-                for key, value in record.items():
-                    if pd.isna(value):
-                        cleaned_record[key] = ''
-                    elif isinstance(value, float) and (pd.isna(value) or value == float('inf') or value == float('-inf')):
-                        cleaned_record[key] = 0
-                    else:
-                        cleaned_record[key] = value
-                cleaned_records.append(cleaned_record)
-
-            return cleaned_records
-
-        except Exception as e:
-            logger.error(f"获取最新数据失败: {e}")
-            return []
+        return self.get_latest_frame(limit).to_dict('records')
     
     def get_statistics(self) -> Dict[str, Any]:
-        """获取数据统计信息"""
+        """获取数据统计信息
+
+        计数器由写入路径增量维护（见维度目录），读取代价与数据量无关。
+        """
         try:
-            if not self.csv_file.exists():
-                return {
-                    'total_records': 0,
-                    'total_markets': 0,
-                    'total_varieties': 0,
-                    'total_provinces': 0,
-                    'last_update': None
-                }
-            
-            df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
-            
-            if df.empty:
-                return {
-                    'total_records': 0,
-                    'total_markets': 0,
-                    'total_varieties': 0,
-                    'total_provinces': 0,
-                    'last_update': None
-                }
-            
-            stats = {
-                'total_records': len(df),
-                'total_markets': df['市场名称'].nunique() if '市场名称' in df.columns else 0,
-                'total_varieties': df['品种名称'].nunique() if '品种名称' in df.columns else 0,
-                'total_provinces': df['省份'].nunique() if '省份' in df.columns else 0,
-                'last_update': df['保存时间'].max() if '保存时间' in df.columns else None
-            }
+            self._ensure_catalog()
+            
+            stats = self.catalog.summary()
+            stats['cache'] = self.get_cache_stats()
+            stats['storage'] = self.get_storage_stats()
+            stats['memory'] = self.get_memory_stats()
+            stats['ingest'] = dict(self.ingest_stats)
+            stats['write_buffer'] = self.get_write_buffer_stats()
+            stats['retention'] = self.retention.get_stats()
+            stats['data_version'] = self.data_version
             
             return stats
             
@@ -277,16 +1223,8 @@ class DataManager:
     def get_provinces(self) -> List[str]:
         """获取省份列表"""
         try:
-            if not self.csv_file.exists():
-                return []
-            
-            df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
-            
-            if df.empty or '省份' not in df.columns:
-                return []
-            
-            provinces = df['省份'].dropna().unique().tolist()
-            return sorted(provinces)
+            self._ensure_catalog()
+            return self.catalog.values('省份')
             
         except Exception as e:
             logger.error(f"获取省份列表失败: {e}")
@@ -295,16 +1233,8 @@ class DataManager:
     def get_varieties(self) -> List[str]:
         """获取品种列表"""
         try:
-            if not self.csv_file.exists():
-                return []
-            
-            df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
-            
-            if df.empty or '品种名称' not in df.columns:
-                return []
-            
-            varieties = df['品种名称'].dropna().unique().tolist()
-            return sorted(varieties)
+            self._ensure_catalog()
+            return self.catalog.values('品种名称')
             
         except Exception as e:
             logger.error(f"获取品种列表失败: {e}")
@@ -313,48 +1243,62 @@ class DataManager:
     def get_markets(self) -> List[str]:
         """获取市场列表"""
         try:
-            if not self.csv_file.exists():
-                return []
-            
-            df = pd.read_csv(self.csv_file, encoding='utf-8-sig')
-            
-            if df.empty or '市场名称' not in df.columns:
-                return []
-            
-            markets = df['市场名称'].dropna().unique().tolist()
-            return sorted(markets)
+            self._ensure_catalog()
+            return self.catalog.values('市场名称')
             
         except Exception as e:
             logger.error(f"获取市场列表失败: {e}")
             return []
     
-    def export_csv(self, province: Optional[str] = None, variety: Optional[str] = None,
-                   market: Optional[str] = None, date_from: Optional[str] = None,
-                   date_to: Optional[str] = None) -> str:
-        """导出CSV文件"""
-        try:
-            # 搜索数据
-            data = self.search_data(
-                province=province,
-                variety=variety,
-                market=market,
-                date_from=date_from,
-                date_to=date_to,
-                limit=10000  # 导出时不限制数量
-            )
-            
-            if not data:
-                raise ValueError("没有数据可导出")
-            
-            # 创建导出文件
-            export_file = self.data_dir / f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    def iter_export(self, predicates: Optional[List[Predicate]] = None, columns: Optional[List[str]] = None,
+                    sanitize: bool = True, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """按条件逐块读取导出数据，不限制行数
+
+        常驻内存时在当前快照上过滤并按交易日期倒序分块返回；否则由存储后端分块扫描，
+        按存储顺序返回，内存占用与块大小有关而与结果行数无关。
+        sanitize 为真时每块经过JSON安全清理，否则只把类别列还原为文本。
+        """
+        clean = sanitize_frame if sanitize else decode_categories
+        if self.resident_table:
+            table = self._get_table()
+            df, remaining = self.text_index.filter(table, predicates)
+            positions = apply_predicates(df, remaining).index.to_numpy()
+            del df
             
-            df = pd.DataFrame(data)
-            df.to_csv(export_file, index=False, encoding='utf-8-sig')
+            positions = self.order_index.sorted_positions(table, positions, '交易日期', True)
             
-            logger.info(f"数据导出成功: {export_file}")
+            for start in range(0, len(positions), chunk_rows):
+                chunk = table.iloc[positions[start:start + chunk_rows]]
+                yield clean(project_columns(chunk, columns))
+            return
+        
+        for chunk in self.storage.iter_scan(predicates=predicates, columns=columns, chunk_rows=chunk_rows):
+            yield clean(chunk)
+    
+    def export_data(self, format: str = 'csv', province: Optional[str] = None, variety: Optional[str] = None,
+                    market: Optional[str] = None, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, columns: Optional[List[str]] = None) -> Iterator[bytes]:
+        """流式导出：按格式（csv / csv.gz / parquet / arrow）边扫描边编码，不写临时文件、不限制行数
+
+        格式不可用时立即抛出 ValueError；返回的字节块迭代器在消费时才读取数据。
+        """
+        check_format(format)
+        predicates = self._build_predicates(province, variety, market, date_from, date_to)
+        
+        # 文本格式输出清理后的值，列式格式保留数值类型与空值
+        frames = self.iter_export(predicates, columns, sanitize=format not in COLUMNAR_FORMATS)
+        
+        return self._log_export(format, encode_export(format, frames, columns))
+    
+    def _log_export(self, format: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """转发导出的字节块并记录导出结果"""
+        try:
+            total = 0
+            for chunk in chunks:
+                total += len(chunk)
+                yield chunk
             
-            return str(export_file)
+            logger.info(f"数据导出完成: 格式 {format}，{total} 字节")
             
         except Exception as e:
             logger.error(f"导出数据失败: {e}")
@@ -363,15 +1307,10 @@ class DataManager:
     def _create_backup(self):
         """创建数据备份"""
         try:
-            if not self.csv_file.exists():
+            backup_file = self.storage.backup(self.backup_dir)
+            if backup_file is None:
                 return
             
-            backup_file = self.backup_dir / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
-            # 复制文件
-            import shutil
-            shutil.copy2(self.csv_file, backup_file)
-            
             # 清理旧备份（保留最近10个）
             self._cleanup_old_backups()
             
@@ -381,7 +1320,7 @@ class DataManager:
     def _cleanup_old_backups(self, keep_count: int = 10):
         """清理旧备份文件"""
         try:
-            backup_files = list(self.backup_dir.glob("backup_*.csv"))
+            backup_files = list(self.backup_dir.glob(f"backup_*{self.storage.suffix}"))
             
             if len(backup_files) > keep_count:
                 # 按修改时间排序
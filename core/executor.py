@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阻塞任务执行器 - 把 pandas 计算、文件读取等同步调用放到有界线程池中执行，事件循环只负责等待结果
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 标记迭代结束（StopIteration 不能穿过 Future 传递）
+_EXHAUSTED = object()
+
+class BlockingExecutor:
+    """有界线程池
+
+    同时执行的阻塞任务不超过 max_workers，其余任务在队列中等待，等待期间不占用事件循环；
+    统计排队深度、执行中任务数以及排队与执行耗时。
+    """
+
+    def __init__(self, max_workers: int = 4, name: str = "blocking"):
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'max_queued': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'total_run_ms': 0.0,
+            'max_run_ms': 0.0
+        }
+
+    def _execute(self, submitted: float, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """在线程池中执行任务并记录排队与执行耗时"""
+        start = time.perf_counter()
+        wait_ms = (start - submitted) * 1000
+
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self.stats['total_wait_ms'] += wait_ms
+            self.stats['max_wait_ms'] = max(self.stats['max_wait_ms'], wait_ms)
+
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            run_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._active -= 1
+                self.stats['failed' if failed else 'completed'] += 1
+                self.stats['total_run_ms'] += run_ms
+                self.stats['max_run_ms'] = max(self.stats['max_run_ms'], run_ms)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在线程池中执行同步调用并等待结果"""
+        with self._lock:
+            self._queued += 1
+            self.stats['submitted'] += 1
+            self.stats['max_queued'] = max(self.stats['max_queued'], self._queued)
+
+        loop = asyncio.get_running_loop()
+        task = partial(self._execute, time.perf_counter(), func, args, kwargs)
+        return await loop.run_in_executor(self._pool, task)
+
+    async def iterate(self, iterator: Iterator) -> AsyncIterator:
+        """逐项在线程池中推进同步迭代器（如流式导出），结束或中断时关闭迭代器"""
+        try:
+            while True:
+                item = await self.run(next, iterator, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                try:
+                    close()
+                except ValueError as e:
+                    # 客户端断开时迭代器可能仍在线程池中执行
+                    logger.warning(f"关闭迭代器失败: {e}")
+
+    def shutdown(self):
+        """停止接受新任务，等待已提交的任务完成"""
+        self._pool.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """排队深度、执行中任务数与耗时统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['queued'] = self._queued
+            stats['active'] = self._active
+
+        finished = stats['completed'] + stats['failed']
+        stats['max_workers'] = self.max_workers
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / finished, 3) if finished else 0.0
+        stats['avg_run_ms'] = round(stats['total_run_ms'] / finished, 3) if finished else 0.0
+        for key in ('total_wait_ms', 'max_wait_ms', 'total_run_ms', 'max_run_ms'):
+            stats[key] = round(stats[key], 3)
+        return stats
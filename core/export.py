@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据导出 - 把分块读取的价格数据流式编码为 CSV、gzip 压缩的 CSV、Parquet 或 Arrow IPC 流
+"""
+
+import io
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from .storage import EXTRA_COLUMNS, NUMERIC_COLUMNS, PRICE_COLUMNS, decode_categories
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，仅Parquet与Arrow导出需要
+    pa = None
+    pq = None
+
+# 导出格式 -> (媒体类型, 文件扩展名)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    'csv': ('text/csv; charset=utf-8', '.csv'),
+    'csv.gz': ('application/gzip', '.csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows')
+}
+
+# 需要pyarrow的格式
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+# 可导出的列
+EXPORT_COLUMNS = PRICE_COLUMNS + EXTRA_COLUMNS
+
+def parse_columns(value: Optional[str], label: str = '导出列') -> Optional[List[str]]:
+    """解析逗号分隔的列名，未指定时返回None（全部列）"""
+    if not value:
+        return None
+
+    columns = list(dict.fromkeys(col.strip() for col in value.split(',') if col.strip()))
+    unknown = [col for col in columns if col not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"未知的{label}: {', '.join(unknown)}，可选: {', '.join(EXPORT_COLUMNS)}")
+
+    return columns or None
+
+def check_format(format: str):
+    """检查导出格式是否可用"""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {format}，可选: {', '.join(EXPORT_FORMATS)}")
+
+    if format in COLUMNAR_FORMATS and pa is None:
+        raise ValueError(f"{format} 导出需要安装pyarrow: pip install pyarrow")
+
+def iter_csv(frames: Iterable[pd.DataFrame], columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """CSV（UTF-8 BOM）：先输出表头，各块按表头的列输出
+
+    表头取请求的列，未指定时为全部可导出列，在读取数据前确定；
+    只在后面的块中出现的列也能输出，某块缺少的列输出为空。
+    """
+    header = columns or EXPORT_COLUMNS
+    yield '\ufeff'.encode('utf-8') + pd.DataFrame(columns=header).to_csv(index=False).encode('utf-8')
+
+    for frame in frames:
+        if not frame.empty:
+            yield frame.reindex(columns=header).to_csv(index=False, header=False).encode('utf-8')
+
+def iter_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """把字节块流式压缩为gzip"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+def export_schema(columns: List[str]) -> 'pa.Schema':
+    """导出列的Arrow类型：数值列为float64，其余为字符串"""
+    return pa.schema([(col, pa.float64() if col in NUMERIC_COLUMNS else pa.string()) for col in columns])
+
+def typed_table(frame: pd.DataFrame, schema: 'pa.Schema') -> 'pa.Table':
+    """把一块数据按导出类型转换为Arrow表（缺失的列为空值）"""
+    frame = decode_categories(frame).reindex(columns=schema.names)
+
+    arrays = []
+    for field in schema:
+        values = frame[field.name]
+        if pa.types.is_floating(field.type):
+            values = pd.to_numeric(values, errors='coerce')
+        else:
+            values = values.where(values.isna(), values.astype(str))
+        arrays.append(pa.array(values, type=field.type, from_pandas=True))
+
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+class ChunkSink(io.RawIOBase):
+    """收集写入字节的输出流，按块取出；位置按累计写入字节计算，供Parquet记录偏移"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        """取出并清空已写入的字节"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _iter_arrow_writer(frames: Iterable[pd.DataFrame], columns: Optional[List[str]], open_writer) -> Iterator[bytes]:
+    """用给定的Arrow写入器逐块编码：每块写出后立即返回已编码的字节
+
+    模式取请求的列，未指定时为全部可导出列，在读取数据前确定，与 CSV 表头一致。
+    """
+    sink = ChunkSink()
+    schema = export_schema(columns or EXPORT_COLUMNS)
+    writer = open_writer(pa.PythonFile(sink, mode='w'), schema)
+
+    for frame in frames:
+        if not frame.empty:
+            writer.write_table(typed_table(frame, schema))
+
+        data = sink.take()
+        if data:
+            yield data
+
+    writer.close()
+    yield sink.take()
+
+def iter_parquet(frames: Iterable[pd.DataFrame], columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """Parquet：每块写为一个行组"""
+    return _iter_arrow_writer(
+        frames, columns,
+        lambda sink, schema: pq.ParquetWriter(sink, schema, compression='snappy')
+    )
+
+def iter_arrow(frames: Iterable[pd.DataFrame], columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """Arrow IPC 流格式：每块写为一个记录批"""
+    return _iter_arrow_writer(frames, columns, pa.ipc.new_stream)
+
+def encode_export(format: str, frames: Iterable[pd.DataFrame], columns: Optional[List[str]] = None) -> Iterator[bytes]:
+    """按格式把分块数据编码为字节流"""
+    if format == 'csv':
+        return iter_csv(frames, columns)
+    if format == 'csv.gz':
+        return iter_gzip(iter_csv(frames, columns))
+    if format == 'parquet':
+        return iter_parquet(frames, columns)
+    if format == 'arrow':
+        return iter_arrow(frames, columns)
+
+    raise ValueError(f"不支持的导出格式: {format}")
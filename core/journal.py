@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量日志 - 持久化结构在两次检查点之间只追加每个批次的变化，加载时在检查点上重放
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def new_generation() -> str:
+    """检查点代号：日志记录只对写出它时的检查点有效"""
+    return uuid.uuid4().hex
+
+class Journal:
+    """追加写的 JSON Lines 变化日志
+
+    每行一条变化记录并带有所属检查点的代号。写出新检查点后清空日志；
+    清空前中断时残留的旧记录因代号不同在读取时被忽略，
+    末尾不完整的一行（写入中断）及其后的内容也被忽略。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    @property
+    def size(self) -> int:
+        """日志文件字节数"""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, generation: str, record: Dict[str, Any]):
+        """追加一条变化记录"""
+        line = json.dumps(dict(record, g=generation), ensure_ascii=False, separators=(',', ':'))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def read(self, generation: str) -> List[Dict[str, Any]]:
+        """读取属于该检查点的全部变化记录（按写入顺序）"""
+        if not self.path.exists():
+            return []
+
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"变化日志 {self.path.name} 存在损坏的记录，忽略其后的内容")
+                    break
+                if record.get('g') == generation:
+                    records.append(record)
+
+        return records
+
+    def reset(self):
+        """写出新检查点后清空日志"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排序索引 - 常驻价格表按保存时间、交易日期维护的有序行号，“最新N条”直接切片
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .storage import order_keys, sort_and_limit, top_k_positions
+
+# 维护排序的列
+ORDERED_COLUMNS = ['保存时间', '交易日期']
+
+class OrderIndex:
+    """常驻价格表的排序索引
+
+    每个(列, 方向)保存全表的有序行号和每行的名次，按价格表对象缓存，
+    表合并后首次查询时重建。未过滤时前N条即有序行号的切片；
+    过滤后按名次在候选行上做部分选择，代价与候选行数成线性。
+    """
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns = list(columns or ORDERED_COLUMNS)
+        self._orders = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'builds': 0,
+            'last_build_ms': 0.0,
+            'slices': 0,
+            'partial_selects': 0,
+            'fallbacks': 0
+        }
+
+    def _order(self, table: pd.DataFrame, column: str, descending: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """全表的有序行号及每行名次"""
+        key = (column, descending)
+
+        with self._lock:
+            cached = self._orders.get(key)
+            if cached is not None and cached[0] is table:
+                return cached[1], cached[2]
+
+        start = time.perf_counter()
+        order = top_k_positions(order_keys(table[column], descending), len(table))
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._orders = {k: v for k, v in self._orders.items() if v[0] is table}
+            self._orders[key] = (table, order, rank)
+            self.stats['builds'] += 1
+            self.stats['last_build_ms'] = round(elapsed_ms, 3)
+
+        return order, rank
+
+    def sort_and_limit(self, table: pd.DataFrame, df: pd.DataFrame, order_by: Optional[str] = None,
+                       descending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+        """对 table 的过滤结果 df 排序并截取前 limit 条
+
+        df 的索引须为 table 中的行号（常驻表为从0开始的连续索引），否则退回通用实现。
+        """
+        index = table.index
+        usable = (
+            order_by in self.columns and order_by in table.columns and limit is not None
+            and isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+        )
+
+        if not usable:
+            if order_by in self.columns and limit is not None:
+                self.stats['fallbacks'] += 1
+            return sort_and_limit(df, order_by, descending, limit)
+
+        try:
+            order, rank = self._order(table, order_by, descending)
+        except TypeError:
+            self.stats['fallbacks'] += 1
+            return sort_and_limit(df, order_by, descending, limit)
+
+        if len(df) == len(table):
+            self.stats['slices'] += 1
+            return table.iloc[order[:limit]]
+
+        positions = df.index.to_numpy()
+        selected = top_k_positions(rank[positions], limit)
+        self.stats['partial_selects'] += 1
+
+        return df.iloc[selected]
+
+    def sorted_positions(self, table: pd.DataFrame, positions: np.ndarray, order_by: str,
+                         descending: bool = True) -> np.ndarray:
+        """把 table 中的一组行号按某列排序，不可用时按原顺序返回"""
+        index = table.index
+        usable = (
+            order_by in self.columns and order_by in table.columns
+            and isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+        )
+
+        if not usable or len(positions) == 0:
+            return positions
+
+        try:
+            order, rank = self._order(table, order_by, descending)
+        except TypeError:
+            self.stats['fallbacks'] += 1
+            return positions
+
+        if len(positions) == len(table):
+            self.stats['slices'] += 1
+            return order
+
+        self.stats['partial_selects'] += 1
+        return positions[top_k_positions(rank[positions], len(positions))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """排序索引使用统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['orders'] = [f"{column}:{'desc' if descending else 'asc'}" for column, descending in self._orders]
+            return stats
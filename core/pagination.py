@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游标分页 - 按 (排序键, 行ID) 倒序的键集分页：游标记录上一页最后一行，下一页只取其后的行，与页码深度无关
+
+游标只记录位置，不绑定数据版本：两页之间有新写入时游标仍然有效，已翻过的行不会重复出现，
+排在游标之前（更新）的新记录不会出现在后续页，排在游标之后的新记录按顺序出现在后续页。
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .storage import decode_categories, order_keys
+
+# 组合行ID时各列之间的分隔符（小于任何可见字符，组合后的字符串比较与逐列比较一致）
+ID_SEPARATOR = '\x1f'
+
+def query_digest(query: Any) -> str:
+    """查询条件的摘要，游标只能用于生成它的查询"""
+    return hashlib.blake2b(repr(query).encode('utf-8'), digest_size=6).hexdigest()
+
+def encode_cursor(kind: str, query: Any, key: str, row_id: str) -> str:
+    """生成不透明游标：接口类型、查询摘要与上一页最后一行的 (排序键, 行ID)"""
+    payload = {'t': kind, 'q': query_digest(query), 'k': key, 'id': row_id}
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, kind: str, query: Any) -> Dict[str, Any]:
+    """解析游标并校验其属于本接口与本查询"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(data.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("无效的分页游标")
+
+    if not isinstance(payload, dict) or payload.get('t') != kind or not {'k', 'id'} <= payload.keys():
+        raise ValueError("无效的分页游标")
+
+    if payload.get('q') != query_digest(query):
+        raise ValueError("分页游标与查询条件不一致")
+
+    return payload
+
+def row_ids(df: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """由一列或多列组成的行ID（文本）"""
+    frame = decode_categories(df[columns])
+    ids = frame[columns[0]].astype(str)
+    for col in columns[1:]:
+        ids = ids + ID_SEPARATOR + frame[col].astype(str)
+    return ids
+
+def after_cursor(df: pd.DataFrame, sort_column: str, id_columns: List[str],
+                 key: str, row_id: str) -> pd.DataFrame:
+    """(排序键, 行ID) 倒序排在游标位置之后的行"""
+    if df.empty:
+        return df
+
+    keys = decode_categories(df[[sort_column]])[sort_column]
+    ids = row_ids(df, id_columns)
+    mask = (keys < key) | ((keys == key) & (ids < row_id))
+    return df[mask.fillna(False).to_numpy(dtype=bool)]
+
+def keyset_order(df: pd.DataFrame, sort_column: str, id_columns: List[str],
+                 limit: Optional[int] = None) -> pd.DataFrame:
+    """按 (排序键, 行ID) 倒序排列并截取前 limit 条，排序键为空的行不参与
+
+    先按排序键部分选择出前 limit 名（含并列）的候选行，只对候选行完整排序。
+    """
+    if df.empty:
+        return df
+
+    df = df[decode_categories(df[[sort_column]])[sort_column].notna().to_numpy()]
+    if df.empty:
+        return df
+
+    sort_keys = order_keys(decode_categories(df[[sort_column]])[sort_column], descending=True)
+
+    if limit is not None and limit < len(df):
+        threshold = np.partition(sort_keys, limit - 1)[limit - 1]
+        candidates = sort_keys <= threshold
+        df = df[candidates]
+        sort_keys = sort_keys[candidates]
+
+    # 行ID倒序：按排序后的编码取反
+    codes, uniques = pd.factorize(row_ids(df, id_columns), sort=True)
+    order = np.lexsort((len(uniques) - 1 - codes, sort_keys))
+    result = df.iloc[order]
+
+    return result.head(limit) if limit is not None else result
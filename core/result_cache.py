@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果缓存 - 按规范化的查询条件与数据版本缓存结果，LRU 淘汰、过期时间与内存上限，新版本发布时整体失效
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import logging
+
+import pandas as pd
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """查询结果的 LRU 缓存
+
+    键为规范化后的查询条件，每个条目记录生成它的数据版本，版本不同即视为失效；
+    条目超过 ttl_seconds 过期；总占用超过 max_bytes 时淘汰最久未使用的条目。
+    缓存的结果由多个请求共享，调用方不得原地修改。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300.0):
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'oversized': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _size(result: Any) -> int:
+        """结果占用的内存字节数"""
+        if isinstance(result, pd.DataFrame):
+            return int(result.memory_usage(index=True, deep=True).sum())
+        if isinstance(result, dict):
+            return sum(ResultCache._size(value) for value in result.values())
+        return 0
+
+    def _drop(self, key: Hashable):
+        """删除一个条目（须持有 _lock）"""
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        """命中时返回缓存的结果；不存在、版本不同或已过期时返回None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            entry_version, created, result, _ = entry
+
+            if entry_version != version:
+                self._drop(key)
+                self.stats['invalidations'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            if time.monotonic() - created > self.ttl_seconds:
+                self._drop(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return result
+
+    def put(self, key: Hashable, version: Hashable, result: Any):
+        """缓存一个结果，超出内存上限时淘汰最久未使用的条目"""
+        if not self.enabled:
+            return
+
+        size = self._size(result)
+        if size > self.max_bytes:
+            self.stats['oversized'] += 1
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+            self._entries[key] = (version, time.monotonic(), result, size)
+            self._bytes += size
+            self.stats['stores'] += 1
+
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def invalidate(self, version: Optional[Hashable] = None):
+        """删除不属于 version 的全部条目（未指定时全部删除）"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if version is None or entry[0] != version]
+            for key in stale:
+                self._drop(key)
+            self.stats['invalidations'] += len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中率与内存占用"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['memory_bytes'] = self._bytes
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['memory_mb'] = round(stats['memory_bytes'] / 1024 / 1024, 3)
+        stats['max_bytes'] = self.max_bytes
+        stats['ttl_seconds'] = self.ttl_seconds
+        stats['enabled'] = self.enabled
+        return stats
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分层保留 - 近期数据保留原始粒度，较早的数据按 (市场, 品种, 交易日) 降采样为日聚合，并限制总记录数
+
+价格表的关键字段是 (市场名称, 品种名称, 交易日期)，交易日期只有日期时每组本来就只有一条，
+降采样只合并交易日期带时间（同一天多次报价）的记录。
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .storage import DATE_PATTERN, decode_categories
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 日聚合的分组列
+DOWNSAMPLE_KEYS = ['市场名称', '品种名称', '交易日期']
+
+# 各价格列的聚合方式，其余列取组内最后一条；平均价按样本数加权，见 downsample_daily
+DOWNSAMPLE_AGGREGATES = {
+    '最低价': 'min',
+    '最高价': 'max'
+}
+
+def downsample_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """按 (市场名称, 品种名称, 交易日) 聚合为每天一条
+
+    交易日期截取到日；最低价取最小、平均价按样本数加权平均、最高价取最大、交易量求和，
+    其余列取组内最后一条非空值。原始记录计为1个样本，已降采样的记录按其样本数计，
+    同一天再次降采样（如补入迟到记录）时平均价不会偏向已聚合的记录。
+    交易日期都不带时间时已是日粒度，原样返回。
+    """
+    if df.empty or not has_intraday(df['交易日期'] if '交易日期' in df.columns else pd.Series(dtype=object)):
+        return df
+
+    df = decode_categories(df).copy()
+    df['交易日期'] = df['交易日期'].astype(str).str[:10]
+
+    for col in DOWNSAMPLE_KEYS:
+        if col not in df.columns:
+            df[col] = ''
+
+    if '样本数' not in df.columns:
+        df['样本数'] = np.nan
+
+    aggregates = {col: 'last' for col in df.columns if col not in DOWNSAMPLE_KEYS}
+    aggregates.update({col: func for col, func in DOWNSAMPLE_AGGREGATES.items() if col in df.columns})
+
+    grouped = df.groupby(DOWNSAMPLE_KEYS, sort=False, dropna=False)
+    result = grouped.agg(aggregates)
+
+    # 交易量全部为空的组保持为空，而不是0
+    if '交易量' in df.columns:
+        result['交易量'] = grouped['交易量'].sum(min_count=1)
+
+    # 平均价按样本数加权，平均价为空的记录不计入样本
+    group = grouped.ngroup()
+    weights = df['样本数'].fillna(1)
+    if '平均价' in df.columns:
+        weights = weights.where(df['平均价'].notna(), 0)
+    counts = weights.groupby(group).sum().where(lambda values: values > 0)
+
+    if '平均价' in df.columns:
+        totals = (df['平均价'].fillna(0) * weights).groupby(group).sum()
+        result['平均价'] = (totals / counts).to_numpy()
+    result['样本数'] = counts.to_numpy()
+
+    return result.reset_index()[list(df.columns)]
+
+def has_intraday(dates: pd.Series) -> bool:
+    """是否有带时间的交易日期（同一天可能有多条记录）"""
+    dates = decode_categories(dates.to_frame())[dates.name].dropna().astype(str)
+    return bool((dates.str.len() > 10).any())
+
+def day_windows(days: List[str]) -> List[List[str]]:
+    """把若干交易日合并为连续的日期范围 [start, end)"""
+    windows = []
+    for day in sorted(set(days)):
+        if windows and windows[-1][1] == day:
+            windows[-1][1] = next_day(day)
+        else:
+            windows.append([day, next_day(day)])
+    return windows
+
+def next_day(day: str) -> str:
+    """下一天（YYYY-MM-DD）"""
+    return (datetime.strptime(day[:10], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+def expiry_boundary(dates: pd.Series, max_records: int) -> Optional[str]:
+    """为使记录数不超过 max_records 需删除的最早若干交易日的结束日期（不含）
+
+    按整天删除，无需删除时返回None；交易日期无效的记录不参与。
+    """
+    excess = len(dates) - max_records
+    if excess <= 0:
+        return None
+
+    days = dates.dropna().astype(str)
+    days = days[days.str.match(DATE_PATTERN)].str[:10]
+    if days.empty:
+        return None
+
+    counts = days.value_counts().sort_index()
+    covered = counts.cumsum()
+    reached = covered[covered >= excess]
+    last_day = reached.index[0] if not reached.empty else counts.index[-1]
+
+    return next_day(last_day)
+
+class RetentionPolicy:
+    """保留策略与进度
+
+    cleanup_days 之前的交易日按批降采样，每次最多推进 batch_days 天，
+    已处理到的日期持久化在 retention.json，下次从该日期继续。
+    晚到的带时间记录落在已降采样的日期内时，其交易日记入 late_days，下次执行时重新降采样。
+    """
+
+    def __init__(self, data_dir: Path, cleanup_days: int = 30, max_records: int = 100000,
+                 batch_days: int = 31):
+        self.state_file = Path(data_dir) / "retention.json"
+        self.cleanup_days = int(cleanup_days)
+        self.max_records = int(max_records)
+        self.batch_days = max(1, int(batch_days))
+        self._lock = threading.RLock()
+        self.state = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        """读取保留进度"""
+        try:
+            if self.state_file.exists():
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"保留进度读取失败，将从头开始: {e}")
+
+        return {'downsampled_through': None, 'late_days': [], 'runs': 0, 'last_run': None, 'last_result': None}
+
+    def save(self):
+        """原子写出保留进度"""
+        with self._lock:
+            temp_file = self.state_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.state_file)
+
+    def cutoff(self, today: Optional[datetime] = None) -> str:
+        """保留原始粒度的最早交易日（不含更早的日期）"""
+        today = today or datetime.now()
+        return (today - timedelta(days=self.cleanup_days)).strftime('%Y-%m-%d')
+
+    def next_window(self, first_date: Optional[str], today: Optional[datetime] = None) -> Optional[List[str]]:
+        """本次需要降采样的交易日期范围 [start, end)，没有时返回None"""
+        cutoff = self.cutoff(today)
+        start = self.state.get('downsampled_through') or (first_date[:10] if first_date else None)
+
+        if start is None or start >= cutoff:
+            return None
+
+        end = (datetime.strptime(start, '%Y-%m-%d') + timedelta(days=self.batch_days)).strftime('%Y-%m-%d')
+        return [start, min(end, cutoff)]
+
+    def advance(self, end: str):
+        """记录已降采样到的日期"""
+        with self._lock:
+            self.state['downsampled_through'] = end
+
+    def note_written(self, dates: pd.Series):
+        """记录写入的带时间记录中落在已降采样日期内的交易日，需要重新降采样"""
+        with self._lock:
+            through = self.state.get('downsampled_through')
+            if through is None or dates.empty or not has_intraday(dates):
+                return
+
+            dates = decode_categories(dates.to_frame())[dates.name].dropna().astype(str)
+            dates = dates[(dates.str.len() > 10) & dates.str.match(DATE_PATTERN)].str[:10]
+            late = set(dates[dates < through]) - set(self.state.get('late_days', []))
+            if not late:
+                return
+
+            self.state['late_days'] = sorted(set(self.state.get('late_days', [])) | late)
+            self.save()
+
+    def late_windows(self) -> List[List[str]]:
+        """需要重新降采样的日期范围"""
+        with self._lock:
+            return day_windows(self.state.get('late_days', []))
+
+    def clear_late(self, windows: List[List[str]]):
+        """重新降采样完成后移除这些范围内的交易日"""
+        with self._lock:
+            self.state['late_days'] = [
+                day for day in self.state.get('late_days', [])
+                if not any(start <= day < end for start, end in windows)
+            ]
+
+    def record_run(self, result: Dict[str, Any]):
+        """记录一次保留任务的结果"""
+        self.state['runs'] = self.state.get('runs', 0) + 1
+        self.state['last_run'] = datetime.now().isoformat()
+        self.state['last_result'] = result
+        self.save()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """保留策略与进度"""
+        stats = dict(self.state)
+        stats.update({
+            'cleanup_days': self.cleanup_days,
+            'max_records': self.max_records,
+            'batch_days': self.batch_days,
+            'cutoff': self.cutoff()
+        })
+        return stats
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日汇总 - 按 (交易日, 省份, 品种类型, 品种名称) 物化的平均价 count/sum/min/max，随写入按交易日增量维护并以变化日志持久化
+"""
+
+import os
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .journal import Journal, new_generation
+from .storage import DATE_PATTERN, decode_categories
+from .upsert import ROW_UPDATED
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 汇总文件格式版本，格式不同时重新构建
+ROLLUP_FORMAT = 2
+
+# 变化日志超过检查点大小且不小于该字节数时写出新检查点
+CHECKPOINT_MIN_BYTES = 1024 * 1024
+
+# 汇总的分组列
+ROLLUP_KEYS = ['交易日期', '省份', '品种类型', '品种名称']
+
+# 汇总需要读取的列
+ROLLUP_SOURCE_COLUMNS = ROLLUP_KEYS + ['平均价']
+
+# 每组的聚合值
+ROLLUP_VALUES = ['count', 'sum', 'min', 'max']
+
+def aggregate_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """按 (交易日, 省份, 品种类型, 品种名称) 聚合平均价
+
+    交易日期截取到日，格式无效的记录不计入；平均价为空的记录不计入 count/sum/min/max。
+    """
+    if df.empty or '交易日期' not in df.columns:
+        return pd.DataFrame(columns=ROLLUP_KEYS + ROLLUP_VALUES)
+
+    frame = decode_categories(df.reindex(columns=ROLLUP_SOURCE_COLUMNS))
+    dates = frame['交易日期'].astype(str)
+    valid = dates.str.match(DATE_PATTERN).to_numpy()
+
+    if not valid.any():
+        return pd.DataFrame(columns=ROLLUP_KEYS + ROLLUP_VALUES)
+
+    keys = {'交易日期': dates[valid].str[:10].to_numpy()}
+    for col in ROLLUP_KEYS[1:]:
+        values = frame[col][valid]
+        keys[col] = values.where(values.notna(), '').astype(str).to_numpy()
+
+    prices = pd.to_numeric(frame['平均价'][valid], errors='coerce').to_numpy(dtype=np.float64)
+
+    grouped = pd.DataFrame(dict(keys, 平均价=prices)).groupby(ROLLUP_KEYS, sort=False)['平均价']
+    result = grouped.agg(ROLLUP_VALUES).reset_index()
+    result['count'] = result['count'].astype(np.int64)
+
+    return result
+
+def _merge_groups(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """合并同一组的聚合值"""
+    table = pd.concat(frames, ignore_index=True)
+    return table.groupby(ROLLUP_KEYS, sort=False).agg(
+        count=('count', 'sum'), sum=('sum', 'sum'), min=('min', 'min'), max=('max', 'max')
+    ).reset_index()
+
+def _split_days(table: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """按交易日拆分汇总表，每日内按分组列排序"""
+    return {
+        day: group.sort_values(ROLLUP_KEYS, kind='stable').reset_index(drop=True)
+        for day, group in table.groupby('交易日期', sort=False)
+    }
+
+def _rows(table: pd.DataFrame) -> List[list]:
+    """汇总行的JSON表示（空值为null）"""
+    return table.astype(object).where(table.notna(), None).values.tolist()
+
+def _frame(rows: List[list]) -> pd.DataFrame:
+    """由JSON表示还原汇总行"""
+    table = pd.DataFrame(rows, columns=ROLLUP_KEYS + ROLLUP_VALUES)
+    table['count'] = table['count'].astype(np.int64)
+    for col in ('sum', 'min', 'max'):
+        table[col] = table[col].astype(np.float64)
+    return table
+
+class DailyRollup:
+    """平均价日汇总表
+
+    汇总按交易日分块保存。新增的记录只与所在交易日的组合并；被覆盖更新的记录无法从 min/max 中扣除，
+    其所在交易日按写入后的数据整日重新汇总。每个批次只把变化的交易日追加到变化日志，
+    日志超过检查点大小或存储压缩时才整体写出检查点。汇总表与存储版本绑定，
+    存储版本一致时冷启动加载检查点并重放日志；趋势与指标查询只读汇总表，不再扫描明细。
+    """
+
+    def __init__(self, data_dir: Path):
+        self.rollup_file = Path(data_dir) / "daily_rollup.json"
+        self.journal = Journal(Path(data_dir) / "daily_rollup.log")
+        self._days = {}
+        self._table = None
+        self._generation = None
+        self._checkpoint_bytes = 0
+        self.signature = None
+        self.loaded = False
+        self._lock = threading.RLock()
+        self.stats = {
+            'rebuilds': 0,
+            'updates': 0,
+            'recomputed_days': 0,
+            'checkpoints': 0,
+            'last_update_ms': 0.0,
+            'queries': 0
+        }
+
+    def load(self, signature: Optional[tuple]) -> bool:
+        """从磁盘加载汇总表（检查点加变化日志），仅当其记录的存储版本与当前一致时有效"""
+        with self._lock:
+            try:
+                if not self.rollup_file.exists():
+                    return False
+
+                with open(self.rollup_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+
+                if data.get('format') != ROLLUP_FORMAT:
+                    return False
+
+                generation = data.get('generation')
+                days = _split_days(_frame(data['rows']))
+                stored_signature = data.get('signature')
+
+                for record in self.journal.read(generation):
+                    for day in record['days']:
+                        days.pop(day, None)
+                    days.update(_split_days(_frame(record['rows'])))
+                    stored_signature = record['signature']
+
+                if stored_signature != repr(signature):
+                    return False
+
+                self._days = days
+                self._table = None
+                self._generation = generation
+                self._checkpoint_bytes = self.rollup_file.stat().st_size
+                self.signature = signature
+                self.loaded = True
+                return True
+
+            except Exception as e:
+                logger.warning(f"日汇总加载失败，将重新构建: {e}")
+                return False
+
+    def rebuild(self, df: pd.DataFrame, signature: Optional[tuple]):
+        """按完整价格表重建汇总并写出检查点"""
+        with self._lock:
+            self._days = _split_days(aggregate_daily(df))
+            self._table = None
+            self.signature = signature
+            self.loaded = True
+            self.stats['rebuilds'] += 1
+            self.checkpoint()
+
+    def update(self, df: pd.DataFrame, status: np.ndarray,
+               day_rows: Callable[[List[str]], pd.DataFrame], signature: Optional[tuple]):
+        """写入一个批次（只含新增和更新的行）后增量更新汇总，只处理批次涉及的交易日
+
+        day_rows(days) 返回写入后这些交易日的全部记录，用于重新汇总有记录被覆盖的交易日。
+        """
+        start = time.perf_counter()
+
+        with self._lock:
+            updated = df[status == ROW_UPDATED]
+            days = sorted(set(aggregate_daily(updated)['交易日期'])) if not updated.empty else []
+            changed = {}
+
+            if days:
+                recomputed = aggregate_daily(day_rows(days))
+                recomputed = _split_days(recomputed[recomputed['交易日期'].isin(days)])
+                changed = {day: recomputed.get(day) for day in days}
+
+            added = df[status != ROW_UPDATED]
+            if days and not added.empty and '交易日期' in added.columns:
+                added = added[~added['交易日期'].astype(str).str[:10].isin(days)]
+
+            for day, groups in _split_days(aggregate_daily(added)).items():
+                current = self._days.get(day)
+                if current is not None:
+                    groups = _merge_groups([current, groups])
+                changed[day] = groups.sort_values(ROLLUP_KEYS, kind='stable').reset_index(drop=True)
+
+            for day, groups in changed.items():
+                if groups is None or groups.empty:
+                    self._days.pop(day, None)
+                else:
+                    self._days[day] = groups
+
+            self._table = None
+            self.signature = signature
+            self.stats['updates'] += 1
+            self.stats['recomputed_days'] += len(days)
+            self._log(changed)
+            self.stats['last_update_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    def mark(self, signature: Optional[tuple]):
+        """存储内容不变而版本变化（如压缩）时，更新汇总记录的存储版本并写出检查点"""
+        with self._lock:
+            self.signature = signature
+            self.checkpoint()
+
+    def _log(self, changed: Dict[str, Optional[pd.DataFrame]]):
+        """把变化的交易日追加到变化日志，日志大于检查点时改为写出检查点"""
+        if self.journal.size > max(self._checkpoint_bytes, CHECKPOINT_MIN_BYTES):
+            self.checkpoint()
+            return
+
+        frames = [groups for groups in changed.values() if groups is not None and not groups.empty]
+        self.journal.append(self._generation, {
+            'signature': repr(self.signature),
+            'days': sorted(changed),
+            'rows': _rows(pd.concat(frames, ignore_index=True)) if frames else []
+        })
+
+    def _frame(self) -> pd.DataFrame:
+        """按交易日排序的完整汇总表（缓存到下次更新）"""
+        if self._table is None:
+            frames = [self._days[day] for day in sorted(self._days)]
+            self._table = (pd.concat(frames, ignore_index=True) if frames
+                           else pd.DataFrame(columns=ROLLUP_KEYS + ROLLUP_VALUES))
+        return self._table
+
+    def checkpoint(self):
+        """写出完整汇总表作为新检查点并清空变化日志"""
+        with self._lock:
+            generation = new_generation()
+            data = {
+                'format': ROLLUP_FORMAT,
+                'generation': generation,
+                'signature': repr(self.signature),
+                'updated': datetime.now().isoformat(),
+                'rows': _rows(self._frame())
+            }
+
+            temp_file = self.rollup_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_file, self.rollup_file)
+            self.journal.reset()
+
+            self._generation = generation
+            self._checkpoint_bytes = self.rollup_file.stat().st_size
+            self.stats['checkpoints'] += 1
+
+    def query(self, days: Optional[int] = None, province: Optional[str] = None,
+              variety: Optional[str] = None, variety_type: Optional[str] = None) -> pd.DataFrame:
+        """汇总表中最新交易日之前 days 天内（含）、满足维度条件的组"""
+        with self._lock:
+            self.stats['queries'] += 1
+
+            if days is None:
+                table = self._frame()
+            elif self._days:
+                # 只取最新交易日之前 days 天内的分块
+                ordered = sorted(self._days)
+                start_date = (pd.Timestamp(ordered[-1]) - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+                frames = [self._days[day] for day in ordered if day >= start_date]
+                table = pd.concat(frames, ignore_index=True)
+            else:
+                table = self._frame()
+
+        if table.empty:
+            return table
+
+        mask = np.ones(len(table), dtype=bool)
+        if province:
+            mask &= (table['省份'] == province).to_numpy()
+        if variety:
+            mask &= (table['品种名称'] == variety).to_numpy()
+        if variety_type:
+            mask &= (table['品种类型'] == variety_type).to_numpy()
+
+        return table[mask]
+
+    def daily(self, days: int = 30, **filters) -> List[Dict[str, Any]]:
+        """每个交易日的平均价（按记录数加权）、最低与最高平均价、记录数"""
+        groups = self.query(days, **filters)
+        groups = groups[groups['count'] > 0]
+
+        if groups.empty:
+            return []
+
+        daily = groups.groupby('交易日期', sort=True).agg(
+            count=('count', 'sum'), sum=('sum', 'sum'), min=('min', 'min'), max=('max', 'max')
+        )
+
+        return [
+            {
+                '交易日期': day,
+                '平均价': float(row['sum'] / row['count']),
+                '最低平均价': float(row['min']),
+                '最高平均价': float(row['max']),
+                '记录数': int(row['count'])
+            }
+            for day, row in daily.iterrows()
+        ]
+
+    def metrics(self) -> Dict[str, Any]:
+        """全部数据的平均价指标，及最新两个交易日之间日均价的变化"""
+        groups = self.query()
+        groups = groups[groups['count'] > 0]
+
+        if groups.empty:
+            return {}
+
+        count = int(groups['count'].sum())
+        metrics = {
+            'avg_price': float(groups['sum'].sum() / count),
+            'max_price': float(groups['max'].max()),
+            'min_price': float(groups['min'].min())
+        }
+
+        daily = groups.groupby('交易日期', sort=True)[['sum', 'count']].sum()
+        if len(daily) >= 2:
+            recent_price = daily['sum'].iloc[-1] / daily['count'].iloc[-1]
+            previous_price = daily['sum'].iloc[-2] / daily['count'].iloc[-2]
+            if previous_price > 0:
+                metrics['price_change_percent'] = round((recent_price - previous_price) / previous_price * 100, 2)
+
+        return metrics
+
+    def get_stats(self) -> Dict[str, Any]:
+        """汇总表规模与维护统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['loaded'] = self.loaded
+            stats['groups'] = sum(len(groups) for groups in self._days.values())
+            stats['days'] = len(self._days)
+            stats['journal_bytes'] = self.journal.size
+            return stats
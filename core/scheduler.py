@@ -38,6 +38,7 @@ class TaskScheduler:
             'backup_count': 0,
             'last_crawl': None,
             'last_cleanup': None,
+            'last_cleanup_result': None,
             'last_backup': None
         }
         
@@ -141,9 +142,13 @@ class TaskScheduler:
         try:
             logger.info("执行定时数据清理任务...")
             
+            # 分层保留：降采样较早的数据、限制总记录数并压缩存储
+            result = self.data_manager.apply_retention()
+            
             # 更新统计
             self.task_stats['cleanup_count'] += 1
             self.task_stats['last_cleanup'] = datetime.now().isoformat()
+            self.task_stats['last_cleanup_result'] = result
             
             logger.info("定时数据清理任务完成")
             
@@ -155,8 +160,10 @@ class TaskScheduler:
         try:
             logger.info("执行定时数据备份任务...")
             
-            # 创建备份
-            self.data_manager._create_backup()
+            # 先压缩增量段，压缩完成时会自动创建包含全部数据的备份
+            result = self.data_manager.compact()
+            if not result.get('compacted_segments'):
+                self.data_manager._create_backup()
             
             # 更新统计
             self.task_stats['backup_count'] += 1
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果序列化 - 查询结果DataFrame的JSON安全清理与按列快速编码
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .storage import decode_categories
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，缺失时退回标准库json
+    orjson = None
+
+def sanitize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """按列把结果清理为可安全JSON序列化的形式
+
+    类别列还原为文本；浮点列中的正负无穷替换为0；空值替换为空字符串。
+    """
+    df = decode_categories(df)
+    columns = {}
+
+    for col in df.columns:
+        series = df[col]
+
+        if pd.api.types.is_float_dtype(series.dtype):
+            values = series.to_numpy(dtype=np.float64, copy=True)
+            values[np.isinf(values)] = 0.0
+            series = pd.Series(values, index=series.index)
+
+        nulls = series.isna()
+        if nulls.any():
+            series = series.astype(object).where(~nulls, '')
+
+        columns[col] = series
+
+    return pd.DataFrame(columns, index=df.index)
+
+def _unescape_slashes(text: str) -> str:
+    """还原 DataFrame.to_json 转义的斜杠（"元\\/公斤" -> "元/公斤"）
+
+    to_json 输出的反斜杠总是成对转义且斜杠总是带转义，\\/ 只可能是斜杠的转义，直接替换是安全的。
+    """
+    return text.replace('\\/', '/')
+
+def frame_json(df: pd.DataFrame) -> bytes:
+    """把（已清理的）结果直接按列编码为JSON记录数组"""
+    if df.empty:
+        return b'[]'
+
+    text = df.to_json(orient='records', force_ascii=False, double_precision=15, date_format='iso')
+    return _unescape_slashes(text).encode('utf-8')
+
+def frame_ndjson(df: pd.DataFrame) -> bytes:
+    """把（已清理的）结果编码为换行分隔的JSON记录（NDJSON），每条记录一行"""
+    if df.empty:
+        return b''
+
+    text = df.to_json(orient='records', lines=True, force_ascii=False, double_precision=15, date_format='iso')
+    text = _unescape_slashes(text)
+    return (text if text.endswith('\n') else text + '\n').encode('utf-8')
+
+def _default(value: Any) -> Any:
+    """标准库无法编码的numpy/pandas类型"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """编码为JSON字节串：DataFrame按列编码，其余内容有orjson时用orjson"""
+    if isinstance(content, pd.DataFrame):
+        return frame_json(content)
+
+    if isinstance(content, dict) and any(isinstance(value, (pd.DataFrame, dict)) for value in content.values()):
+        items = [dumps(str(key)) + b':' + dumps(value) for key, value in content.items()]
+        return b'{' + b','.join(items) + b'}'
+
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
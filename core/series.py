@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间序列 - 按 (市场ID, 品种ID) 保存按交易日排序的连续价格数组，单条序列的读取只与其长度有关
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .storage import DATE_PATTERN, decode_categories
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 序列键
+SERIES_KEYS = ['市场ID', '品种ID']
+
+# 序列的数值列
+SERIES_VALUES = ['最低价', '平均价', '最高价', '交易量']
+
+# 序列的描述列，取最后一次写入的值
+SERIES_LABELS = ['市场名称', '品种名称', '省份', '单位']
+
+# 构建序列需要读取的列
+SERIES_SOURCE_COLUMNS = SERIES_KEYS + SERIES_LABELS + ['交易日期'] + SERIES_VALUES
+
+# 重采样粒度
+RESAMPLE_RULES = ('day', 'week', 'month')
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """取出 ID 与交易日期有效的行：交易日期截取到日，按 (市场ID, 品种ID, 交易日) 稳定排序，同日保留最后一条"""
+    if df.empty or not set(SERIES_KEYS + ['交易日期']).issubset(df.columns):
+        return pd.DataFrame(columns=SERIES_SOURCE_COLUMNS)
+
+    frame = decode_categories(df.reindex(columns=SERIES_SOURCE_COLUMNS))
+
+    columns = {}
+    for col in SERIES_KEYS + SERIES_LABELS:
+        values = frame[col]
+        columns[col] = values.where(values.notna(), '').astype(str).str.strip()
+
+    dates = frame['交易日期'].astype(str)
+    valid = dates.str.match(DATE_PATTERN) & (columns['市场ID'] != '') & (columns['品种ID'] != '')
+    for col in SERIES_KEYS:
+        valid &= ~columns[col].isin(['nan', 'None'])
+
+    columns['交易日期'] = pd.to_datetime(dates.str[:10], format='%Y-%m-%d', errors='coerce')
+    for col in SERIES_VALUES:
+        columns[col] = pd.to_numeric(frame[col], errors='coerce')
+
+    prepared = pd.DataFrame(columns)[valid.to_numpy()]
+    prepared = prepared[prepared['交易日期'].notna()]
+
+    prepared = prepared.sort_values(SERIES_KEYS + ['交易日期'], kind='stable')
+    return prepared.drop_duplicates(subset=SERIES_KEYS + ['交易日期'], keep='last')
+
+class PriceSeries:
+    """一条 (市场ID, 品种ID) 序列：按交易日升序、每日一个点的连续数组（只读，更新时整体替换）"""
+
+    __slots__ = ('key', 'labels', 'dates', 'values')
+
+    def __init__(self, key: Tuple[str, str], labels: Dict[str, str], dates: np.ndarray, values: Dict[str, np.ndarray]):
+        self.key = key
+        self.labels = labels
+        self.dates = dates
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_frame(cls, key: Tuple[str, str], frame: pd.DataFrame) -> 'PriceSeries':
+        """由一个序列的已排序行构建"""
+        last = frame.iloc[-1]
+        labels = {col: last[col] for col in SERIES_LABELS}
+        dates = frame['交易日期'].to_numpy(dtype='datetime64[D]')
+        values = {col: frame[col].to_numpy(dtype=np.float64) for col in SERIES_VALUES}
+        return cls(key, labels, dates, values)
+
+    def merge(self, other: 'PriceSeries') -> 'PriceSeries':
+        """合并新写入的点：同一交易日以新点为准，返回新序列"""
+        dates = np.concatenate([self.dates, other.dates])
+        order = np.argsort(dates, kind='stable')
+        dates = dates[order]
+
+        # 同一交易日保留最后一个（新写入的点排在后面）
+        keep = np.append(dates[1:] != dates[:-1], True)
+        values = {
+            col: np.concatenate([self.values[col], other.values[col]])[order][keep]
+            for col in SERIES_VALUES
+        }
+
+        labels = {col: other.labels[col] or self.labels[col] for col in SERIES_LABELS}
+        return PriceSeries(self.key, labels, dates[keep], values)
+
+    def window(self, start: Optional[str] = None, end: Optional[str] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """交易日在 [start, end]（含）内的点，按二分查找截取"""
+        lo = np.searchsorted(self.dates, np.datetime64(start[:10], 'D'), side='left') if start else 0
+        hi = np.searchsorted(self.dates, np.datetime64(end[:10], 'D'), side='right') if end else len(self.dates)
+        return self.dates[lo:hi], {col: values[lo:hi] for col, values in self.values.items()}
+
+def resample(dates: np.ndarray, values: Dict[str, np.ndarray], rule: str) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """按周（周一开始）或按月聚合已排序的点：最低价取最小、平均价取均值、最高价取最大、交易量求和
+
+    各列忽略空值，整组为空时结果为空；日期为所在周期的第一天。
+    """
+    if rule == 'day' or len(dates) == 0:
+        return dates, values
+
+    if rule == 'week':
+        days = dates.astype(np.int64)
+        periods = (dates - ((days + 3) % 7)).astype('datetime64[D]')
+    else:
+        periods = dates.astype('datetime64[M]').astype('datetime64[D]')
+
+    starts = np.flatnonzero(np.append(True, periods[1:] != periods[:-1]))
+    counts = {
+        col: np.add.reduceat((~np.isnan(array)).astype(np.int64), starts)
+        for col, array in values.items()
+    }
+
+    sums = {col: np.add.reduceat(np.nan_to_num(array), starts) for col, array in values.items()}
+    result = {
+        '最低价': np.fmin.reduceat(values['最低价'], starts),
+        '平均价': np.divide(sums['平均价'], counts['平均价'],
+                          out=np.full(len(starts), np.nan), where=counts['平均价'] > 0),
+        '最高价': np.fmax.reduceat(values['最高价'], starts),
+        '交易量': np.where(counts['交易量'] > 0, sums['交易量'], np.nan)
+    }
+
+    return periods[starts], result
+
+def _json_values(array: np.ndarray) -> List[Optional[float]]:
+    """数值数组转为列表，空值为None"""
+    return [None if np.isnan(value) else value for value in array.tolist()]
+
+class SeriesStore:
+    """(市场ID, 品种ID) -> PriceSeries
+
+    与存储版本绑定：首次读取时按全表构建一次，之后每个写入批次只合并涉及的序列；
+    替换序列对象而非原地修改，读取无需加锁。存储版本不一致（如分层保留重写）时重新构建。
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._by_market = {}
+        self._by_variety = {}
+        self.signature = None
+        self.loaded = False
+        self._lock = threading.Lock()
+        self.stats = {
+            'rebuilds': 0,
+            'updates': 0,
+            'reads': 0,
+            'last_rebuild_ms': 0.0,
+            'last_update_ms': 0.0
+        }
+
+    def _index(self, key: Tuple[str, str]):
+        """登记市场、品种到序列键的映射"""
+        self._by_market.setdefault(key[0], set()).add(key)
+        self._by_variety.setdefault(key[1], set()).add(key)
+
+    @staticmethod
+    def _split(df: pd.DataFrame) -> Dict[Tuple[str, str], PriceSeries]:
+        """把批次行按序列拆分"""
+        prepared = _prepare(df)
+        if prepared.empty:
+            return {}
+
+        return {
+            key: PriceSeries.from_frame(key, rows)
+            for key, rows in prepared.groupby(SERIES_KEYS, sort=False)
+        }
+
+    def rebuild(self, df: pd.DataFrame, signature: Optional[tuple]):
+        """按完整价格表重建全部序列"""
+        start = time.perf_counter()
+        series = self._split(df)
+
+        with self._lock:
+            self._series = series
+            self._by_market = {}
+            self._by_variety = {}
+            for key in series:
+                self._index(key)
+
+            self.signature = signature
+            self.loaded = True
+            self.stats['rebuilds'] += 1
+            self.stats['last_rebuild_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    def update(self, df: pd.DataFrame, signature: Optional[tuple]):
+        """合并一个写入批次涉及的序列"""
+        start = time.perf_counter()
+        batch = self._split(df)
+
+        with self._lock:
+            for key, points in batch.items():
+                current = self._series.get(key)
+                if current is None:
+                    self._series[key] = points
+                    self._index(key)
+                else:
+                    self._series[key] = current.merge(points)
+
+            self.signature = signature
+            self.stats['updates'] += 1
+            self.stats['last_update_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    def mark(self, signature: Optional[tuple]):
+        """存储内容不变而版本变化（如压缩）时，更新序列对应的存储版本"""
+        self.signature = signature
+
+    def find(self, market_id: Optional[str] = None, variety_id: Optional[str] = None) -> List[Tuple[str, str]]:
+        """某市场或某品种的全部序列键（排序后）"""
+        with self._lock:
+            if market_id and variety_id:
+                keys = {(market_id, variety_id)} & self._series.keys()
+            elif market_id:
+                keys = set(self._by_market.get(market_id, ()))
+            elif variety_id:
+                keys = set(self._by_variety.get(variety_id, ()))
+            else:
+                keys = set()
+
+        return sorted(keys)
+
+    def read(self, key: Tuple[str, str], start: Optional[str] = None, end: Optional[str] = None,
+             rule: str = 'day') -> Optional[Dict[str, Any]]:
+        """读取一条序列（按列的数组），不存在时返回None"""
+        series = self._series.get(key)
+        self.stats['reads'] += 1
+
+        if series is None:
+            return None
+
+        dates, values = series.window(start, end)
+        dates, values = resample(dates, values, rule)
+
+        result = {'市场ID': key[0], '品种ID': key[1]}
+        result.update(series.labels)
+        result['points'] = len(dates)
+        result['交易日期'] = np.datetime_as_string(dates, unit='D').tolist()
+        for col in SERIES_VALUES:
+            result[col] = _json_values(values[col])
+
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """序列数量与点数统计"""
+        series = list(self._series.values())
+        stats = dict(self.stats)
+        stats['loaded'] = self.loaded
+        stats['series'] = len(series)
+        stats['points'] = int(sum(len(item) for item in series))
+        stats['markets'] = len(self._by_market)
+        stats['varieties'] = len(self._by_variety)
+        return stats
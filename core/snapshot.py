@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照与单写者队列 - 写操作在同一线程中依次执行并发布不可变的版本化快照，读取方无锁获取当前快照
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import logging
+
+import pandas as pd
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Snapshot:
+    """价格数据的不可变快照
+
+    version: 数据版本号，内容每变化一次加一，可作为缓存键
+    signature: 对应的存储版本
+    table: 常驻内存时的合并价格表（只读，任何人不得原地修改），否则为None
+    """
+
+    __slots__ = ('version', 'signature', 'table', 'created')
+
+    def __init__(self, version: int, signature: Optional[tuple], table: Optional[pd.DataFrame] = None):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'signature', signature)
+        object.__setattr__(self, 'table', table)
+        object.__setattr__(self, 'created', datetime.now().isoformat())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("快照不可修改")
+
+    def with_signature(self, signature: Optional[tuple]) -> 'Snapshot':
+        """内容不变、存储版本变化（如压缩）时的新快照，版本号不变"""
+        return Snapshot(self.version, signature, self.table)
+
+    @property
+    def records(self) -> int:
+        return len(self.table) if self.table is not None else 0
+
+class WriterQueue:
+    """单写者队列：提交的写操作在同一个后台线程中按提交顺序执行"""
+
+    def __init__(self, name: str = "price-writer"):
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'max_depth': 0,
+            'last_run_ms': 0.0
+        }
+
+    def _ensure_started(self):
+        """首次提交时启动写线程"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def in_writer(self) -> bool:
+        """当前线程是否为写线程"""
+        return threading.current_thread() is self._thread
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """提交写操作，返回可等待结果的Future"""
+        future = Future()
+
+        if self.in_writer():
+            self._execute(future, func, args, kwargs)
+            return future
+
+        self._ensure_started()
+        self._queue.put((future, func, args, kwargs))
+        self.stats['submitted'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], self._queue.qsize())
+
+        return future
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """提交写操作并等待其完成（在写线程内调用时直接执行）"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def _execute(self, future: Future, func: Callable, args: tuple, kwargs: dict):
+        if not future.set_running_or_notify_cancel():
+            return
+
+        start = time.perf_counter()
+        try:
+            future.set_result(func(*args, **kwargs))
+            self.stats['completed'] += 1
+        except BaseException as e:
+            self.stats['failed'] += 1
+            future.set_exception(e)
+        finally:
+            self.stats['last_run_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    def _run(self):
+        """写线程主循环"""
+        while True:
+            future, func, args, kwargs = self._queue.get()
+            try:
+                self._execute(future, func, args, kwargs)
+            except Exception as e:
+                logger.error(f"写操作执行失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def depth(self) -> int:
+        """等待执行的写操作数"""
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """写队列统计"""
+        stats = dict(self.stats)
+        stats['depth'] = self.depth()
+        stats['running'] = bool(self._thread and self._thread.is_alive())
+        return stats
@@ -0,0 +1,1468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+价格存储后端 - 统一的保存、条件扫描、压缩、按日期替换与备份接口
+"""
+
+import os
+import re
+import json
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，仅Parquet引擎需要
+    pa = None
+    pq = None
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 价格表基础列
+PRICE_COLUMNS = [
+    '省份', '市场名称', '品种名称', '最低价', '平均价', '最高价',
+    '单位', '交易日期', '更新时间', '保存时间'
+]
+
+# 爬虫附加的扩展列；样本数为降采样记录合并的原始报价条数，原始记录为空
+EXTRA_COLUMNS = ['市场ID', '品种ID', '产地', '交易量', '品种类型', '样本数']
+
+# 文本列：读取时固定为字符串，避免ID、日期等被推断为数值
+TEXT_COLUMNS = [
+    '省份', '市场名称', '品种名称', '单位', '交易日期', '更新时间', '保存时间',
+    '市场ID', '品种ID', '产地', '品种类型'
+]
+
+# 数值列：读取后统一转换为浮点数
+NUMERIC_COLUMNS = ['最低价', '平均价', '最高价', '交易量', '样本数']
+
+# 字典编码列：重复度高的长文本，内存中与Parquet中按类别（整数编码+字典）存储
+CATEGORICAL_COLUMNS = ['省份', '市场名称', '品种名称', '单位', '品种类型', '产地']
+
+# 去重关键字段：同一市场、品种、交易日期只保留最后写入的记录
+KEY_COLUMNS = ['市场名称', '品种名称', '交易日期']
+
+# 有效交易日期格式
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+# 扫描期间遇到并发压缩时的最大读取次数
+SCAN_RETRIES = 3
+
+# 分块扫描时每块的记录数
+SCAN_CHUNK_ROWS = 50000
+
+# 过滤条件: (列名, 操作, 值)，操作支持 contains / == / != / >= / <= / > / < / in
+Predicate = Tuple[str, str, Any]
+
+def coerce_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """数值列统一转换为浮点数"""
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+
+    return df
+
+def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """统一列类型：数值列为浮点数，文本列为字符串"""
+    df = coerce_numeric(df)
+
+    for col in TEXT_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+    return df
+
+def is_categorical(series: pd.Series) -> bool:
+    """是否为字典编码列"""
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+def encode_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """把字典编码列转换为类别类型，类别去除未使用值并按字典序排列
+
+    类别按字典序排列后，按类别排序与按文本排序结果一致，
+    类别本身就是该列已排序的去重值。
+    """
+    df = df.copy(deep=False)
+
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+
+        series = df[col]
+
+        if not is_categorical(series):
+            df[col] = series.where(series.isna(), series.astype(str)).astype('category')
+            continue
+
+        series = series.cat.remove_unused_categories()
+        categories = series.cat.categories
+        if not categories.is_monotonic_increasing:
+            series = series.cat.set_categories(categories.sort_values())
+        df[col] = series
+
+    return df
+
+def decode_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """把类别列还原为普通文本列（用于填充空值、序列化等）"""
+    columns = [col for col in df.columns if is_categorical(df[col])]
+
+    if not columns:
+        return df
+
+    return df.astype({col: object for col in columns})
+
+def align_categories(frames: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """拼接前统一各部分字典编码列的类别，避免拼接后退化为object列"""
+    frames = list(frames)
+
+    for col in CATEGORICAL_COLUMNS:
+        if not any(col in frame.columns and is_categorical(frame[col]) for frame in frames):
+            continue
+
+        parts = []
+        for frame in frames:
+            if col not in frame.columns:
+                continue
+            if is_categorical(frame[col]):
+                parts.append(frame[col].cat.categories)
+            else:
+                parts.append(pd.Index(frame[col].dropna().astype(str).unique()))
+
+        categories = parts[0].append(parts[1:]).unique() if len(parts) > 1 else parts[0]
+
+        aligned = []
+        for frame in frames:
+            frame = frame.copy(deep=False)
+            if col not in frame.columns:
+                frame[col] = pd.Categorical([None] * len(frame), categories=categories)
+            elif is_categorical(frame[col]):
+                frame[col] = frame[col].cat.set_categories(categories)
+            else:
+                values = frame[col].where(frame[col].isna(), frame[col].astype(str))
+                frame[col] = pd.Categorical(values, categories=categories)
+            aligned.append(frame)
+        frames = aligned
+
+    return frames
+
+def merge_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """按写入顺序合并数据，关键字段相同时后写覆盖"""
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+
+    if not frames:
+        return pd.DataFrame()
+
+    if len(frames) == 1:
+        return frames[0]
+
+    merged = pd.concat(align_categories(frames), ignore_index=True)
+
+    if all(col in merged.columns for col in KEY_COLUMNS):
+        merged = merged.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+
+    return merged.reset_index(drop=True)
+
+def apply_predicates(df: pd.DataFrame, predicates: Optional[List[Predicate]]) -> pd.DataFrame:
+    """在DataFrame上应用过滤条件（条件之间为AND关系）"""
+    if df.empty or not predicates:
+        return df
+
+    mask = None
+    for column, op, value in predicates:
+        if column not in df.columns:
+            return df.iloc[0:0]
+
+        series = df[column]
+
+        if op == 'contains':
+            condition = series.str.contains(value, na=False)
+        elif op == '==':
+            condition = series == value
+        elif op == '!=':
+            condition = series != value
+        elif op == '>=':
+            condition = series >= value
+        elif op == '<=':
+            condition = series <= value
+        elif op == '>':
+            condition = series > value
+        elif op == '<':
+            condition = series < value
+        elif op == 'in':
+            condition = series.isin(list(value))
+        else:
+            raise ValueError(f"不支持的过滤操作: {op}")
+
+        mask = condition if mask is None else (mask & condition)
+
+    return df[mask]
+
+def required_columns(columns: Optional[List[str]], predicates: Optional[List[Predicate]]) -> Optional[List[str]]:
+    """计算扫描需要读取的列：投影列、过滤列和去重关键字段"""
+    if columns is None:
+        return None
+
+    needed = list(columns)
+    for col in KEY_COLUMNS + [p[0] for p in predicates or []]:
+        if col not in needed:
+            needed.append(col)
+
+    return needed
+
+def key_index(df: pd.DataFrame) -> pd.MultiIndex:
+    """关键字段组成的索引，类别列按文本、空值按空字符串比较"""
+    keys = decode_categories(df.reindex(columns=KEY_COLUMNS)).astype(object)
+    keys = keys.where(keys.notna(), '').astype(str)
+    return pd.MultiIndex.from_frame(keys)
+
+def project_columns(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """按请求的列投影结果，缺失的列忽略"""
+    if columns is None:
+        return df
+
+    return df[[col for col in columns if col in df.columns]]
+
+def parse_datetimes(series: pd.Series) -> Optional[pd.Series]:
+    """把日期文本列解析为日期时间，存在无法解析的非空值时返回None"""
+    if series.dtype != object:
+        return None
+
+    sample = series.dropna()
+    if sample.empty or not DATE_PATTERN.match(str(sample.iloc[0])):
+        return None
+
+    try:
+        parsed = pd.to_datetime(series, format='ISO8601', errors='coerce')
+    except (ValueError, TypeError):
+        return None
+
+    if parsed.isna().sum() != series.isna().sum():
+        return None
+
+    return parsed
+
+def order_keys(series: pd.Series, descending: bool = True) -> np.ndarray:
+    """把排序列转换为整数排序键（键越小越靠前），空值始终排在最后
+
+    日期文本列先解析为日期时间再编码，避免对长字符串排序。
+    """
+    parsed = parse_datetimes(series)
+    codes, uniques = pd.factorize(series if parsed is None else parsed, sort=True)
+    codes = codes.astype(np.int64)
+    nulls = codes < 0
+
+    if descending:
+        codes = len(uniques) - 1 - codes
+
+    codes[nulls] = len(uniques)
+    return codes
+
+def top_k_positions(keys: np.ndarray, limit: int) -> np.ndarray:
+    """按排序键部分选择前 limit 个位置并排好序，键相同时保持原有顺序
+
+    argpartition 为线性时间，只对选出的 limit 个位置排序。
+    """
+    n = len(keys)
+    composite = keys * max(n, 1) + np.arange(n, dtype=np.int64)
+
+    if limit <= 0:
+        return np.array([], dtype=np.int64)
+
+    if limit < n:
+        selected = np.argpartition(composite, limit - 1)[:limit]
+    else:
+        selected = np.arange(n)
+
+    return selected[np.argsort(composite[selected])]
+
+def sort_and_limit(df: pd.DataFrame, order_by: Optional[str] = None,
+                   descending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+    """按列排序并截取前 limit 条，排序列不存在时只截取
+
+    截取条数小于行数时用部分选择代替全量排序。排序稳定：值相同时保持原有顺序。
+    """
+    if order_by and order_by in df.columns:
+        if limit is not None and limit < len(df):
+            try:
+                return df.iloc[top_k_positions(order_keys(df[order_by], descending), limit)]
+            except TypeError:
+                pass  # 混合类型无法编码排序键时退回全量排序
+
+        df = df.sort_values(order_by, ascending=not descending, kind='stable')
+
+    if limit is not None:
+        df = df.head(limit)
+
+    return df
+
+class StorageBackend:
+    """价格存储后端基类
+
+    子类需要提供版本标识、批次写入、条件扫描、整体替换与备份读写；完整读取、分块扫描、
+    交易日期范围和按日期替换在基类中基于条件扫描实现，子类可按自身格式下推优化，压缩默认无需执行。
+    """
+
+    engine = None
+
+    # 数据与备份文件的扩展名
+    suffix = ''
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+
+    def initialize(self):
+        """初始化存储（创建目录、空表等）"""
+        raise NotImplementedError
+
+    def signature(self) -> Optional[tuple]:
+        """存储版本标识，内容变化时必须改变"""
+        raise NotImplementedError
+
+    def save(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """写入一个批次，关键字段相同的记录后写覆盖"""
+        raise NotImplementedError
+
+    def load(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取完整的合并视图"""
+        return self.scan(columns=columns)
+
+    def scan(self, predicates: Optional[List[Predicate]] = None,
+             columns: Optional[List[str]] = None, order_by: Optional[str] = None,
+             descending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+        """按条件扫描，只返回请求的列，可选按某列排序并截取前 limit 条"""
+        raise NotImplementedError
+
+    def iter_scan(self, predicates: Optional[List[Predicate]] = None, columns: Optional[List[str]] = None,
+                  chunk_rows: int = SCAN_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """按条件分块扫描（不保证顺序），默认实现整体扫描后分块返回"""
+        df = self.scan(predicates=predicates, columns=columns)
+
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+    def write_snapshot(self, df: pd.DataFrame):
+        """用给定数据整体替换存储内容（用于格式转换）"""
+        raise NotImplementedError
+
+    def read_backup(self, path: Path) -> pd.DataFrame:
+        """读取本引擎格式的备份文件"""
+        raise NotImplementedError
+
+    def write_backup(self, df: pd.DataFrame, path: Path):
+        """把数据写成本引擎格式的独立备份文件"""
+        raise NotImplementedError
+
+    def date_range(self) -> Tuple[Optional[str], Optional[str]]:
+        """获取交易日期的最小值与最大值"""
+        df = self.scan(columns=['交易日期'])
+
+        if df.empty or '交易日期' not in df.columns:
+            return None, None
+
+        return valid_date_range(df['交易日期'])
+
+    def compact(self, merged: Optional[pd.DataFrame] = None,
+                signature: Optional[tuple] = None) -> Dict[str, Any]:
+        """压缩存储，默认无需压缩"""
+        return {'compacted_segments': 0}
+
+    def replace_dates(self, start: str, end: str, df: pd.DataFrame,
+                      merged: Optional[pd.DataFrame] = None,
+                      signature: Optional[tuple] = None) -> Dict[str, Any]:
+        """把交易日期在 [start, end) 内的记录整体替换为 df（df 为空即删除）
+
+        merged/signature 含义同 compact：调用方已持有的替换后完整视图及替换前的存储版本。
+        默认实现读取全表后整体重写。
+        """
+        current = self.load()
+        mask = date_mask(current, start, end)
+        self.write_snapshot(merge_frames([current[~mask], df]))
+
+        return {'removed': int(mask.sum()), 'written': len(df)}
+
+    def backup(self, backup_dir: Path) -> Optional[Path]:
+        """创建备份文件，返回备份路径"""
+        return None
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """获取存储层统计"""
+        return {'engine': self.engine}
+
+class SegmentedFileStorage(StorageBackend):
+    """主文件 + 增量段的文件存储
+
+    新批次写入独立的增量段文件，写入代价只与批次大小有关；
+    压缩时把增量段合并进主文件（后写覆盖）并删除已合并的增量段。
+    """
+
+    def __init__(self, data_dir: Path):
+        super().__init__(data_dir)
+        self.base_file = self.data_dir / f"market_prices{self.suffix}"
+        self.segment_dir = self.data_dir / "segments"
+        self._segment_seq = 0
+        self._seq_lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+
+    def _read_file(self, path: Path, columns: Optional[List[str]] = None,
+                   predicates: Optional[List[Predicate]] = None) -> pd.DataFrame:
+        """读取单个文件，predicates 只作为可选的下推提示"""
+        raise NotImplementedError
+
+    def _write_file(self, df: pd.DataFrame, path: Path, sort: bool = False):
+        """写入单个文件"""
+        raise NotImplementedError
+
+    def initialize(self):
+        """创建目录，主文件不存在时创建空表"""
+        self.data_dir.mkdir(exist_ok=True)
+        self.segment_dir.mkdir(exist_ok=True)
+
+        if not self.base_file.exists():
+            self._write_file(coerce_types(pd.DataFrame(columns=PRICE_COLUMNS)), self.base_file)
+            logger.info(f"创建空数据文件: {self.base_file}")
+
+    def _path_signature(self, path: Path) -> Optional[tuple]:
+        """获取文件版本标识（修改时间、大小）"""
+        try:
+            stat = path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _list_segments(self) -> List[Path]:
+        """按写入顺序列出增量段文件"""
+        return sorted(self.segment_dir.glob(f"delta_*{self.suffix}"))
+
+    def signature(self) -> Optional[tuple]:
+        """主文件与全部增量段的修改时间、大小"""
+        base_signature = self._path_signature(self.base_file)
+        if base_signature is None:
+            return None
+
+        segments = []
+        for path in self._list_segments():
+            signature = self._path_signature(path)
+            if signature is not None:
+                segments.append((path.name,) + signature)
+
+        return (base_signature, tuple(segments))
+
+    def save(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """将一个批次写入新的增量段文件"""
+        with self._seq_lock:
+            self._segment_seq += 1
+            seq = self._segment_seq
+
+        segment_name = f"delta_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{seq:06d}{self.suffix}"
+        segment_file = self.segment_dir / segment_name
+
+        # 先写临时文件再改名，读取方不会看到写了一半的增量段
+        temp_file = segment_file.with_name(segment_file.name + '.tmp')
+        self._write_file(df, temp_file)
+        os.replace(temp_file, segment_file)
+
+        return {'segment': segment_name, 'records': len(df)}
+
+    def _scan_signature(self, signature: Optional[tuple], predicates: Optional[List[Predicate]] = None,
+                        columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """读取某一版本的主文件与增量段并合并"""
+        if signature is None:
+            return pd.DataFrame()
+
+        read_columns = required_columns(columns, predicates)
+
+        # 只把关键字段上的条件下推到文件读取，避免过滤掉覆盖旧记录的新版本
+        pushdown = [p for p in predicates or [] if p[0] in KEY_COLUMNS]
+
+        frames = [self._read_file(self.base_file, read_columns, pushdown)]
+        for name, *_ in signature[1]:
+            segment_file = self.segment_dir / name
+            if segment_file.exists():
+                frames.append(self._read_file(segment_file, read_columns, pushdown))
+
+        df = merge_frames(frames)
+        df = apply_predicates(df, predicates)
+
+        return project_columns(df, columns)
+
+    def scan(self, predicates: Optional[List[Predicate]] = None,
+             columns: Optional[List[str]] = None, order_by: Optional[str] = None,
+             descending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+        """按条件扫描主文件与增量段"""
+        read_columns = columns
+        if columns is not None and order_by and order_by not in columns:
+            read_columns = list(columns) + [order_by]
+
+        # 读取期间主文件被压缩替换时，已读的旧主文件可能缺少随后删除的增量段，按新版本重读
+        for _ in range(SCAN_RETRIES):
+            signature = self.signature()
+            df = self._scan_signature(signature, predicates, read_columns)
+            if signature is None or self._path_signature(self.base_file) == signature[0]:
+                break
+        
+        df = sort_and_limit(df, order_by, descending, limit)
+
+        return project_columns(df, columns)
+
+    def _iter_file(self, path: Path, columns: Optional[List[str]] = None,
+                   predicates: Optional[List[Predicate]] = None,
+                   chunk_rows: int = SCAN_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """分块读取一个文件，默认整体读取"""
+        yield self._read_file(path, columns, predicates)
+
+    def iter_scan(self, predicates: Optional[List[Predicate]] = None, columns: Optional[List[str]] = None,
+                  chunk_rows: int = SCAN_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """分块扫描：增量段（通常很小）整体读入，主文件分块读取并跳过被增量段覆盖的关键字段
+
+        内存占用取决于块大小与增量段大小，与主文件大小无关。先返回主文件中的记录，再返回增量段中的记录。
+        """
+        signature = self.signature()
+        if signature is None:
+            return
+
+        read_columns = required_columns(columns, predicates)
+        pushdown = [p for p in predicates or [] if p[0] in KEY_COLUMNS]
+
+        segments = merge_frames([
+            self._read_file(self.segment_dir / name, read_columns, pushdown)
+            for name, *_ in signature[1]
+            if (self.segment_dir / name).exists()
+        ])
+        overridden = key_index(segments) if not segments.empty else None
+
+        for chunk in self._iter_file(self.base_file, read_columns, pushdown, chunk_rows):
+            if overridden is not None:
+                chunk = chunk[~key_index(chunk).isin(overridden)]
+
+            chunk = apply_predicates(chunk, predicates)
+            if not chunk.empty:
+                yield project_columns(chunk, columns)
+
+        segments = apply_predicates(segments, predicates)
+        for start in range(0, len(segments), chunk_rows):
+            yield project_columns(segments.iloc[start:start + chunk_rows], columns)
+
+    def write_snapshot(self, df: pd.DataFrame):
+        """整体替换主文件并删除全部增量段"""
+        temp_file = self.base_file.with_name(self.base_file.name + '.tmp')
+        self._write_file(df, temp_file, sort=True)
+        os.replace(temp_file, self.base_file)
+
+        for path in self._list_segments():
+            path.unlink(missing_ok=True)
+
+    def read_backup(self, path: Path) -> pd.DataFrame:
+        """读取备份文件"""
+        return self._read_file(path)
+
+    def write_backup(self, df: pd.DataFrame, path: Path):
+        """写出备份文件"""
+        self._write_file(df, path, sort=True)
+
+    def _still_current(self, signature: Optional[tuple]) -> bool:
+        """调用方持有的版本是否仍可直接写出：主文件未被替换，其增量段都还在
+
+        等待压缩锁期间主文件可能已被按日期替换，此时调用方的合并视图已过期，须重新读取。
+        """
+        if signature is None:
+            return False
+
+        current = self.signature()
+        return current is not None and current[0] == signature[0] and set(signature[1]) <= set(current[1])
+
+    def compact(self, merged: Optional[pd.DataFrame] = None,
+                signature: Optional[tuple] = None) -> Dict[str, Any]:
+        """把增量段合并进主文件
+
+        merged/signature: 调用方已持有的完整合并视图及其对应的存储版本，
+        提供时直接写出，无需重新读取。只删除该版本中包含的增量段，
+        压缩期间新写入的增量段保留到下一次压缩。
+        """
+        if not self._compaction_lock.acquire(blocking=False):
+            logger.info("增量段压缩已在进行中，跳过本次压缩")
+            return {'compacted_segments': 0, 'skipped': True}
+
+        try:
+            if merged is None or not self._still_current(signature):
+                signature = self.signature()
+                merged = self._scan_signature(signature)
+
+            if signature is None or not signature[1]:
+                return {'compacted_segments': 0}
+
+            start = time.perf_counter()
+
+            temp_file = self.base_file.with_name(self.base_file.name + '.compact.tmp')
+            self._write_file(merged, temp_file, sort=True)
+            os.replace(temp_file, self.base_file)
+
+            for name, *_ in signature[1]:
+                (self.segment_dir / name).unlink(missing_ok=True)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            logger.info(f"增量段压缩完成: 合并 {len(signature[1])} 个增量段，主文件记录数 {len(merged)}，耗时 {elapsed_ms:.1f} ms")
+
+            return {
+                'compacted_segments': len(signature[1]),
+                'total_records': len(merged),
+                'elapsed_ms': round(elapsed_ms, 3)
+            }
+        finally:
+            self._compaction_lock.release()
+
+    def replace_dates(self, start: str, end: str, df: pd.DataFrame,
+                      merged: Optional[pd.DataFrame] = None,
+                      signature: Optional[tuple] = None) -> Dict[str, Any]:
+        """替换日期范围内的记录，同时完成一次压缩
+
+        与压缩互斥；写出期间新写入的增量段保留。
+        """
+        with self._compaction_lock:
+            start_time = time.perf_counter()
+
+            if merged is None or not self._still_current(signature):
+                signature = self.signature()
+                current = self._scan_signature(signature)
+                mask = date_mask(current, start, end)
+                removed = int(mask.sum())
+                merged = merge_frames([current[~mask], df])
+            else:
+                removed = None
+
+            if signature is None:
+                return {'removed': 0, 'written': 0}
+
+            temp_file = self.base_file.with_name(self.base_file.name + '.compact.tmp')
+            self._write_file(merged, temp_file, sort=True)
+            os.replace(temp_file, self.base_file)
+
+            for name, *_ in signature[1]:
+                (self.segment_dir / name).unlink(missing_ok=True)
+
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            logger.info(f"替换交易日期 [{start}, {end}) 的记录: 写入 {len(df)} 条，主文件记录数 {len(merged)}，耗时 {elapsed_ms:.1f} ms")
+
+            return {
+                'removed': removed,
+                'written': len(df),
+                'compacted_segments': len(signature[1]),
+                'total_records': len(merged),
+                'elapsed_ms': round(elapsed_ms, 3)
+            }
+
+    def backup(self, backup_dir: Path) -> Optional[Path]:
+        """复制主文件作为备份"""
+        if not self.base_file.exists():
+            return None
+
+        backup_file = backup_dir / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}{self.suffix}"
+        shutil.copy2(self.base_file, backup_file)
+
+        return backup_file
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """获取存储层统计"""
+        segments = self._list_segments()
+        return {
+            'engine': self.engine,
+            'base_file': str(self.base_file),
+            'base_bytes': self.base_file.stat().st_size if self.base_file.exists() else 0,
+            'pending_segments': len(segments),
+            'compaction_running': self._compaction_lock.locked()
+        }
+
+class CsvStorage(SegmentedFileStorage):
+    """UTF-8-BOM CSV 文件存储"""
+
+    engine = 'csv'
+    suffix = '.csv'
+
+    def _read_file(self, path: Path, columns: Optional[List[str]] = None,
+                   predicates: Optional[List[Predicate]] = None) -> pd.DataFrame:
+        """读取CSV文件（CSV无法下推过滤条件，只做列裁剪）"""
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda col: col in wanted
+
+        df = pd.read_csv(
+            path,
+            encoding='utf-8-sig',
+            usecols=usecols,
+            dtype={col: str for col in TEXT_COLUMNS}
+        )
+
+        return coerce_numeric(df)
+
+    def _iter_file(self, path: Path, columns: Optional[List[str]] = None,
+                   predicates: Optional[List[Predicate]] = None,
+                   chunk_rows: int = SCAN_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """按块读取CSV文件"""
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda col: col in wanted
+
+        reader = pd.read_csv(
+            path,
+            encoding='utf-8-sig',
+            usecols=usecols,
+            dtype={col: str for col in TEXT_COLUMNS},
+            chunksize=chunk_rows
+        )
+
+        with reader:
+            for chunk in reader:
+                yield coerce_numeric(chunk)
+
+    def _write_file(self, df: pd.DataFrame, path: Path, sort: bool = False):
+        """写入CSV文件"""
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+
+class ParquetStorage(SegmentedFileStorage):
+    """Parquet 列式存储
+
+    数值列以 float64、文本列以字符串类型存储，价格不经过文本往返；
+    省份、市场、品种等重复文本以字典编码存储，读取后直接得到类别列；
+    主文件按交易日期排序写出，行组统计信息可用于日期范围裁剪。
+    """
+
+    engine = 'parquet'
+    suffix = '.parquet'
+
+    # 每个行组的记录数
+    ROW_GROUP_SIZE = 50000
+
+    # 可以下推到行组过滤的比较操作
+    PUSHDOWN_OPS = ('==', '!=', '>=', '<=', '>', '<', 'in')
+
+    def __init__(self, data_dir: Path):
+        if pq is None:
+            raise RuntimeError("Parquet存储引擎需要安装pyarrow: pip install pyarrow")
+        super().__init__(data_dir)
+
+    def _read_file(self, path: Path, columns: Optional[List[str]] = None,
+                   predicates: Optional[List[Predicate]] = None) -> pd.DataFrame:
+        """读取Parquet文件，列裁剪并按行组统计跳过不相关的数据"""
+        schema = pq.read_schema(path)
+        available = schema.names
+
+        read_columns = None
+        if columns is not None:
+            read_columns = [col for col in columns if col in available]
+
+        # 空主文件的列类型为 null，无法与字符串比较，这类列不下推，交由调用方过滤
+        filters = [
+            (col, op, list(value) if op == 'in' else value)
+            for col, op, value in predicates or []
+            if op in self.PUSHDOWN_OPS and col in available
+            and not pa.types.is_null(schema.field(col).type)
+        ]
+
+        table = pq.read_table(path, columns=read_columns, filters=filters or None)
+        return table.to_pandas()
+
+    def _iter_file(self, path: Path, columns: Optional[List[str]] = None,
+                   predicates: Optional[List[Predicate]] = None,
+                   chunk_rows: int = SCAN_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """按批读取Parquet文件（条件由调用方在每块上应用）"""
+        parquet_file = pq.ParquetFile(path)
+        available = parquet_file.schema_arrow.names
+
+        read_columns = None
+        if columns is not None:
+            read_columns = [col for col in columns if col in available]
+
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=read_columns):
+            yield batch.to_pandas()
+
+    def _write_file(self, df: pd.DataFrame, path: Path, sort: bool = False):
+        """写入Parquet文件，字典编码列以 dictionary<string> 类型存储"""
+        df = encode_categories(coerce_types(df.copy()))
+
+        if sort and '交易日期' in df.columns:
+            df = df.sort_values('交易日期', kind='stable')
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_table(table, path, row_group_size=self.ROW_GROUP_SIZE, compression='snappy')
+
+class SqliteStorage(StorageBackend):
+    """SQLite 存储（WAL模式）
+
+    (市场名称, 品种名称, 交易日期) 为唯一键，保存即 INSERT ... ON CONFLICT 更新；
+    按品种、市场、省份与交易日期建立组合索引，过滤、排序和截取都在SQL中完成。
+    WAL模式下读取不会被爬虫线程的写入阻塞。
+    """
+
+    engine = 'sqlite'
+    suffix = '.db'
+
+    TABLE = 'market_prices'
+
+    # 列及其SQL类型
+    COLUMNS = PRICE_COLUMNS + EXTRA_COLUMNS
+
+    INDEXES = {
+        'idx_prices_variety_date': ('品种名称', '交易日期'),
+        'idx_prices_market_date': ('市场名称', '交易日期'),
+        'idx_prices_province_date': ('省份', '交易日期'),
+        'idx_prices_saved': ('保存时间',)
+    }
+
+    def __init__(self, data_dir: Path):
+        super().__init__(data_dir)
+        self.base_file = self.data_dir / f"market_prices{self.suffix}"
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    @staticmethod
+    def _quote(column: str) -> str:
+        """引用列名"""
+        return '"' + column.replace('"', '""') + '"'
+
+    def _column_type(self, column: str) -> str:
+        """列的SQL类型"""
+        return 'REAL' if column in NUMERIC_COLUMNS else 'TEXT'
+
+    def _open(self, path: Path) -> sqlite3.Connection:
+        """打开数据库连接并启用WAL"""
+        conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open(self.base_file)
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self, conn: sqlite3.Connection):
+        """创建数据表、唯一键、索引和版本表"""
+        column_defs = ', '.join(f"{self._quote(col)} {self._column_type(col)}" for col in self.COLUMNS)
+        key = ', '.join(self._quote(col) for col in KEY_COLUMNS)
+
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE} ({column_defs}, UNIQUE ({key}))")
+
+        # 旧版本创建的数据表补齐新增的列
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({self.TABLE})")}
+        for col in self.COLUMNS:
+            if col not in existing:
+                conn.execute(f"ALTER TABLE {self.TABLE} ADD COLUMN {self._quote(col)} {self._column_type(col)}")
+
+        for name, columns in self.INDEXES.items():
+            index_columns = ', '.join(self._quote(col) for col in columns)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {self.TABLE} ({index_columns})")
+
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', 0)")
+        conn.commit()
+
+    def initialize(self):
+        """创建数据库文件与表结构"""
+        self.data_dir.mkdir(exist_ok=True)
+        self._create_schema(self._connect())
+
+    def signature(self) -> Optional[tuple]:
+        """每次写入事务递增的版本号"""
+        if not self.base_file.exists():
+            return None
+
+        row = self._connect().execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()
+        return (row[0],) if row else None
+
+    def _rows(self, df: pd.DataFrame) -> List[tuple]:
+        """把DataFrame转换为插入用的行，关键字段空值写为空字符串"""
+        df = decode_categories(df.reindex(columns=self.COLUMNS))
+
+        for col in KEY_COLUMNS:
+            df[col] = df[col].fillna('')
+
+        df = df.astype(object).where(df.notna(), None)
+        return list(df.itertuples(index=False, name=None))
+
+    def _upsert(self, conn: sqlite3.Connection, df: pd.DataFrame):
+        """按唯一键插入或覆盖"""
+        columns = ', '.join(self._quote(col) for col in self.COLUMNS)
+        placeholders = ', '.join('?' for _ in self.COLUMNS)
+        key = ', '.join(self._quote(col) for col in KEY_COLUMNS)
+        updates = ', '.join(
+            f"{self._quote(col)} = excluded.{self._quote(col)}"
+            for col in self.COLUMNS if col not in KEY_COLUMNS
+        )
+
+        conn.executemany(
+            f"INSERT INTO {self.TABLE} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates}",
+            self._rows(df)
+        )
+
+    def save(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """在一个事务中按唯一键写入批次并递增版本号"""
+        unknown = [col for col in df.columns if col not in self.COLUMNS]
+        if unknown:
+            logger.debug(f"SQLite存储忽略未知列: {unknown}")
+
+        conn = self._connect()
+        with self._write_lock, conn:
+            self._upsert(conn, df)
+            conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+
+        return {'records': len(df)}
+
+    def _where(self, predicates: Optional[List[Predicate]]) -> Tuple[str, List[Any]]:
+        """把过滤条件转换为WHERE子句（contains按字面子串匹配）"""
+        clauses = []
+        params = []
+
+        for column, op, value in predicates or []:
+            if column not in self.COLUMNS:
+                return ' WHERE 0', []
+
+            quoted = self._quote(column)
+
+            if op == 'contains':
+                clauses.append(f"instr({quoted}, ?) > 0")
+                params.append(value)
+            elif op in ('==', '!=', '>=', '<=', '>', '<'):
+                clauses.append(f"{quoted} {'=' if op == '==' else op} ?")
+                params.append(value)
+            elif op == 'in':
+                values = list(value)
+                if not values:
+                    return ' WHERE 0', []
+                clauses.append(f"{quoted} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            else:
+                raise ValueError(f"不支持的过滤操作: {op}")
+
+        if not clauses:
+            return '', []
+
+        return ' WHERE ' + ' AND '.join(clauses), params
+
+    def _read_sql(self, sql: str, params: List[Any], conn: Optional[sqlite3.Connection] = None) -> pd.DataFrame:
+        """执行查询并统一数值列类型"""
+        df = pd.read_sql_query(sql, conn or self._connect(), params=params)
+        return coerce_numeric(df)
+
+    def scan(self, predicates: Optional[List[Predicate]] = None,
+             columns: Optional[List[str]] = None, order_by: Optional[str] = None,
+             descending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+        """在SQL中完成过滤、排序与截取，由组合索引做范围扫描"""
+        select_columns = self.COLUMNS if columns is None else [col for col in columns if col in self.COLUMNS]
+        if not select_columns:
+            return pd.DataFrame()
+
+        where, params = self._where(predicates)
+        sql = f"SELECT {', '.join(self._quote(col) for col in select_columns)} FROM {self.TABLE}{where}"
+
+        if order_by and order_by in self.COLUMNS:
+            sql += f" ORDER BY {self._quote(order_by)} {'DESC' if descending else 'ASC'}"
+
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = params + [int(limit)]
+
+        return self._read_sql(sql, params)
+
+    def iter_scan(self, predicates: Optional[List[Predicate]] = None, columns: Optional[List[str]] = None,
+                  chunk_rows: int = SCAN_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """用独立连接的游标分块读取，生成器可跨线程消费"""
+        select_columns = self.COLUMNS if columns is None else [col for col in columns if col in self.COLUMNS]
+        if not select_columns:
+            return
+
+        where, params = self._where(predicates)
+        sql = f"SELECT {', '.join(self._quote(col) for col in select_columns)} FROM {self.TABLE}{where}"
+
+        conn = self._open(self.base_file)
+        try:
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_rows):
+                yield coerce_numeric(chunk)
+        finally:
+            conn.close()
+
+    def date_range(self) -> Tuple[Optional[str], Optional[str]]:
+        """获取交易日期范围"""
+        row = self._connect().execute(
+            f"SELECT MIN(NULLIF(\"交易日期\", '')), MAX(NULLIF(\"交易日期\", '')) FROM {self.TABLE}"
+        ).fetchone()
+        return row[0], row[1]
+
+    def compact(self, merged: Optional[pd.DataFrame] = None,
+                signature: Optional[tuple] = None) -> Dict[str, Any]:
+        """SQLite没有增量段，只把WAL检查点写回主库"""
+        self._connect().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return {'compacted_segments': 0}
+
+    def replace_dates(self, start: str, end: str, df: pd.DataFrame,
+                      merged: Optional[pd.DataFrame] = None,
+                      signature: Optional[tuple] = None) -> Dict[str, Any]:
+        """在一个事务中按交易日期索引删除范围内的记录并写入替换记录"""
+        conn = self._connect()
+        with self._write_lock, conn:
+            cursor = conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE \"交易日期\" >= ? AND \"交易日期\" < ?", (start, end)
+            )
+            removed = cursor.rowcount
+            if not df.empty:
+                self._upsert(conn, df)
+            conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+
+        return {'removed': removed, 'written': len(df)}
+
+    def write_snapshot(self, df: pd.DataFrame):
+        """在一个事务中清空并重新写入全部数据"""
+        conn = self._connect()
+        with self._write_lock, conn:
+            conn.execute(f"DELETE FROM {self.TABLE}")
+            self._upsert(conn, df)
+            conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+
+    def read_backup(self, path: Path) -> pd.DataFrame:
+        """读取备份数据库"""
+        conn = sqlite3.connect(str(path))
+        try:
+            return self._read_sql(f"SELECT * FROM {self.TABLE}", [], conn)
+        finally:
+            conn.close()
+
+    def write_backup(self, df: pd.DataFrame, path: Path):
+        """写出独立的备份数据库"""
+        conn = self._open(path)
+        try:
+            self._create_schema(conn)
+            with conn:
+                self._upsert(conn, df)
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            conn.close()
+
+    def backup(self, backup_dir: Path) -> Optional[Path]:
+        """用SQLite在线备份接口复制数据库"""
+        if not self.base_file.exists():
+            return None
+
+        backup_file = backup_dir / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}{self.suffix}"
+        target = sqlite3.connect(str(backup_file))
+        try:
+            self._connect().backup(target)
+        finally:
+            target.close()
+
+        return backup_file
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """获取存储层统计"""
+        wal_file = self.base_file.with_name(self.base_file.name + '-wal')
+        return {
+            'engine': self.engine,
+            'base_file': str(self.base_file),
+            'base_bytes': self.base_file.stat().st_size if self.base_file.exists() else 0,
+            'wal_bytes': wal_file.stat().st_size if wal_file.exists() else 0,
+            'pending_segments': 0
+        }
+
+def valid_date_range(dates: pd.Series) -> Tuple[Optional[str], Optional[str]]:
+    """计算格式有效（YYYY-MM-DD开头）的交易日期的最小值与最大值"""
+    dates = dates.dropna().astype(str)
+    dates = dates[dates.str.match(DATE_PATTERN)]
+
+    if dates.empty:
+        return None, None
+
+    return dates.min(), dates.max()
+
+def date_bounds(predicates: Optional[List[Predicate]]) -> Tuple[Optional[str], Optional[str]]:
+    """从过滤条件中提取交易日期的上下界（闭区间）"""
+    low = None
+    high = None
+
+    for column, op, value in predicates or []:
+        if column != '交易日期':
+            continue
+
+        if op in ('>=', '>', '=='):
+            low = value if low is None else max(low, value)
+        if op in ('<=', '<', '=='):
+            high = value if high is None else min(high, value)
+
+    return low, high
+
+def date_mask(df: pd.DataFrame, start: str, end: str) -> pd.Series:
+    """交易日期格式有效且在 [start, end) 内的行"""
+    if df.empty or '交易日期' not in df.columns:
+        return pd.Series(False, index=df.index)
+
+    dates = df['交易日期'].astype(str)
+    return dates.str.match(DATE_PATTERN) & (dates >= start) & (dates < end)
+
+class PartitionedStorage(StorageBackend):
+    """按交易日期分区的存储
+
+    每个月（或每天）一个分区文件，清单 manifest.json 记录各分区的
+    最小/最大交易日期与记录数。带日期条件的扫描只打开与时间窗口重叠的分区；
+    写入只重写批次涉及的分区。交易日期无法识别的记录放在 unknown 分区。
+    """
+
+    engine = 'partitioned'
+
+    # 无法识别交易日期的分区
+    UNKNOWN_PARTITION = 'unknown'
+
+    def __init__(self, data_dir: Path, granularity: str = 'month', file_format: str = 'csv'):
+        super().__init__(data_dir)
+
+        if granularity not in ('month', 'day'):
+            raise ValueError(f"不支持的分区粒度: {granularity}")
+
+        # 分区文件由分段文件引擎读写，只能是 csv 或 parquet
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"不支持的分区文件格式: {file_format}，可选: csv, parquet")
+
+        self.granularity = granularity
+        self.format = create_storage(file_format, data_dir)
+        self.suffix = self.format.suffix
+
+        self.partition_dir = self.data_dir / "partitions"
+        self.base_file = self.partition_dir / "manifest.json"
+
+        self._write_lock = threading.Lock()
+        self._manifest = None
+        self._manifest_signature = None
+        self.prune_stats = {'scans': 0, 'partitions_scanned': 0, 'partitions_pruned': 0}
+
+    def initialize(self):
+        """创建分区目录与空清单"""
+        self.data_dir.mkdir(exist_ok=True)
+        self.partition_dir.mkdir(exist_ok=True)
+
+        if not self.base_file.exists():
+            self._write_manifest({'granularity': self.granularity, 'version': 0, 'partitions': {}})
+            logger.info(f"创建分区清单: {self.base_file}")
+
+    def _path_signature(self, path: Path) -> Optional[tuple]:
+        """获取文件版本标识（修改时间、大小）"""
+        try:
+            stat = path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def signature(self) -> Optional[tuple]:
+        """清单文件在每次写入后重写，以其修改时间、大小作为版本"""
+        return self._path_signature(self.base_file)
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """读取清单（按文件版本缓存）"""
+        signature = self.signature()
+
+        if signature is None:
+            return {'granularity': self.granularity, 'version': 0, 'partitions': {}}
+
+        if self._manifest is None or signature != self._manifest_signature:
+            with open(self.base_file, 'r', encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._manifest_signature = signature
+
+        return self._manifest
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        """原子写入清单"""
+        temp_file = self.base_file.with_name(self.base_file.name + '.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.base_file)
+
+        self._manifest = manifest
+        self._manifest_signature = self.signature()
+
+    def _partition_keys(self, df: pd.DataFrame) -> pd.Series:
+        """计算每行所属分区"""
+        length = 7 if self.granularity == 'month' else 10
+
+        if '交易日期' not in df.columns:
+            return pd.Series(self.UNKNOWN_PARTITION, index=df.index)
+
+        dates = df['交易日期'].astype(str)
+        valid = dates.str.match(DATE_PATTERN)
+
+        return dates.str[:length].where(valid, self.UNKNOWN_PARTITION)
+
+    def _partition_file(self, key: str) -> Path:
+        """分区文件路径"""
+        return self.partition_dir / f"prices_{key}{self.suffix}"
+
+    def _partition_info(self, key: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """生成分区清单条目"""
+        dates = df['交易日期'].dropna() if '交易日期' in df.columns else pd.Series(dtype=object)
+        dates = dates[dates != '']
+
+        return {
+            'file': self._partition_file(key).name,
+            'rows': len(df),
+            'min_date': None if key == self.UNKNOWN_PARTITION or dates.empty else str(dates.min()),
+            'max_date': None if key == self.UNKNOWN_PARTITION or dates.empty else str(dates.max()),
+            'updated': datetime.now().isoformat()
+        }
+
+    def _write_partition(self, key: str, df: pd.DataFrame):
+        """原子写入一个分区文件"""
+        partition_file = self._partition_file(key)
+        temp_file = partition_file.with_name(partition_file.name + '.tmp')
+        self.format._write_file(df, temp_file, sort=True)
+        os.replace(temp_file, partition_file)
+
+    def save(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """按分区合并批次，只重写涉及的分区"""
+        with self._write_lock:
+            manifest = json.loads(json.dumps(self._load_manifest()))
+            partitions = manifest['partitions']
+            keys = self._partition_keys(df)
+
+            for key, batch in df.groupby(keys, sort=False):
+                existing = None
+                if key in partitions and self._partition_file(key).exists():
+                    existing = self.format._read_file(self._partition_file(key))
+
+                merged = merge_frames([existing, batch])
+                self._write_partition(key, merged)
+                partitions[key] = self._partition_info(key, merged)
+
+            manifest['version'] = manifest.get('version', 0) + 1
+            self._write_manifest(manifest)
+
+        return {'records': len(df), 'partitions': sorted(keys.unique().tolist())}
+
+    def _select_partitions(self, predicates: Optional[List[Predicate]]) -> List[str]:
+        """选出与日期条件重叠的分区"""
+        partitions = self._load_manifest()['partitions']
+        low, high = date_bounds(predicates)
+
+        selected = []
+        for key, info in sorted(partitions.items()):
+            if low is not None or high is not None:
+                if info.get('min_date') is None:
+                    continue
+                if low is not None and info['max_date'] < low:
+                    continue
+                if high is not None and info['min_date'] > high:
+                    continue
+            selected.append(key)
+
+        self.prune_stats['scans'] += 1
+        self.prune_stats['partitions_scanned'] += len(selected)
+        self.prune_stats['partitions_pruned'] += len(partitions) - len(selected)
+
+        return selected
+
+    def scan(self, predicates: Optional[List[Predicate]] = None,
+             columns: Optional[List[str]] = None, order_by: Optional[str] = None,
+             descending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+        """只读取与日期窗口重叠的分区"""
+        read_columns = required_columns(columns, predicates)
+        if read_columns is not None and order_by and order_by not in read_columns:
+            read_columns.append(order_by)
+
+        pushdown = [p for p in predicates or [] if p[0] in KEY_COLUMNS]
+
+        frames = []
+        for key in self._select_partitions(predicates):
+            partition_file = self._partition_file(key)
+            if partition_file.exists():
+                frames.append(self.format._read_file(partition_file, read_columns, pushdown))
+
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(align_categories(frames), ignore_index=True) if len(frames) > 1 else frames[0]
+        df = apply_predicates(df, predicates)
+        df = sort_and_limit(df, order_by, descending, limit)
+
+        return project_columns(df, columns)
+
+    def iter_scan(self, predicates: Optional[List[Predicate]] = None, columns: Optional[List[str]] = None,
+                  chunk_rows: int = SCAN_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """逐个分区读取，内存占用以单个分区为上限"""
+        read_columns = required_columns(columns, predicates)
+        pushdown = [p for p in predicates or [] if p[0] in KEY_COLUMNS]
+
+        for key in self._select_partitions(predicates):
+            partition_file = self._partition_file(key)
+            if not partition_file.exists():
+                continue
+
+            df = apply_predicates(self.format._read_file(partition_file, read_columns, pushdown), predicates)
+            for start in range(0, len(df), chunk_rows):
+                yield project_columns(df.iloc[start:start + chunk_rows], columns)
+
+    def date_range(self) -> Tuple[Optional[str], Optional[str]]:
+        """直接从清单读取交易日期范围"""
+        partitions = self._load_manifest()['partitions'].values()
+        min_dates = [info['min_date'] for info in partitions if info.get('min_date')]
+        max_dates = [info['max_date'] for info in partitions if info.get('max_date')]
+
+        return (min(min_dates) if min_dates else None, max(max_dates) if max_dates else None)
+
+    def replace_dates(self, start: str, end: str, df: pd.DataFrame,
+                      merged: Optional[pd.DataFrame] = None,
+                      signature: Optional[tuple] = None) -> Dict[str, Any]:
+        """只重写与日期范围重叠的分区，完全落在范围内且没有替换记录的分区直接删除"""
+        with self._write_lock:
+            manifest = json.loads(json.dumps(self._load_manifest()))
+            partitions = manifest['partitions']
+            replacement_keys = self._partition_keys(df)
+
+            selected = set(replacement_keys.unique().tolist())
+            for key, info in partitions.items():
+                if info.get('min_date') is None:
+                    continue
+                if info['max_date'] >= start and info['min_date'] < end:
+                    selected.add(key)
+
+            removed = 0
+            for key in sorted(selected):
+                partition_file = self._partition_file(key)
+                existing = None
+                if key in partitions and partition_file.exists():
+                    existing = self.format._read_file(partition_file)
+                    mask = date_mask(existing, start, end)
+                    removed += int(mask.sum())
+                    existing = existing[~mask]
+
+                part = merge_frames([existing, df[replacement_keys == key]])
+
+                if part.empty:
+                    partition_file.unlink(missing_ok=True)
+                    partitions.pop(key, None)
+                    continue
+
+                self._write_partition(key, part)
+                partitions[key] = self._partition_info(key, part)
+
+            manifest['version'] = manifest.get('version', 0) + 1
+            self._write_manifest(manifest)
+
+        return {'removed': removed, 'written': len(df), 'partitions': sorted(selected)}
+
+    def write_snapshot(self, df: pd.DataFrame):
+        """清空全部分区后按日期重新分区写入"""
+        with self._write_lock:
+            for path in self.partition_dir.glob(f"prices_*{self.suffix}"):
+                path.unlink()
+
+            partitions = {}
+            keys = self._partition_keys(df)
+            for key, part in df.groupby(keys, sort=False):
+                part = merge_frames([part.reset_index(drop=True)])
+                self._write_partition(key, part)
+                partitions[key] = self._partition_info(key, part)
+
+            manifest = self._load_manifest()
+            self._write_manifest({
+                'granularity': self.granularity,
+                'version': manifest.get('version', 0) + 1,
+                'partitions': partitions
+            })
+
+    def read_backup(self, path: Path) -> pd.DataFrame:
+        """读取备份文件"""
+        return self.format.read_backup(path)
+
+    def write_backup(self, df: pd.DataFrame, path: Path):
+        """写出备份文件"""
+        self.format.write_backup(df, path)
+
+    def backup(self, backup_dir: Path) -> Optional[Path]:
+        """把全部分区合并写成一个备份文件"""
+        if not self.base_file.exists():
+            return None
+
+        backup_file = backup_dir / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}{self.suffix}"
+        self.write_backup(self.scan(), backup_file)
+
+        return backup_file
+
+    def storage_stats(self) -> Dict[str, Any]:
+        """获取分区与裁剪统计"""
+        partitions = self._load_manifest()['partitions']
+        stats = {
+            'engine': self.engine,
+            'granularity': self.granularity,
+            'file_format': self.format.engine,
+            'partitions': len(partitions),
+            'pending_segments': 0
+        }
+        stats.update(self.prune_stats)
+        return stats
+
+# 可用的存储引擎
+STORAGE_ENGINES = {
+    'csv': CsvStorage,
+    'parquet': ParquetStorage,
+    'sqlite': SqliteStorage,
+    'partitioned': PartitionedStorage
+}
+
+def create_storage(engine: str, data_dir: Path, **options) -> StorageBackend:
+    """按名称创建存储后端，options 传给后端构造函数"""
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(f"未知的存储引擎: {engine}，可选: {', '.join(STORAGE_ENGINES)}")
+
+    return STORAGE_ENGINES[engine](data_dir, **options)
+
+def convert_storage(data_dir: Path, target_engine: str, source_engine: str = 'csv',
+                    include_backups: bool = True, target_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """一次性把现有数据（含增量段）和备份文件转换到目标存储引擎"""
+    data_dir = Path(data_dir)
+
+    source = create_storage(source_engine, data_dir)
+    target = create_storage(target_engine, data_dir, **(target_options or {}))
+
+    if source.signature() is None:
+        raise FileNotFoundError(f"源数据不存在: {data_dir}")
+
+    target.initialize()
+
+    df = source.load()
+    target.write_snapshot(df)
+
+    logger.info(f"转换主数据: {source.base_file} -> {target.base_file}，共 {len(df)} 条记录")
+
+    result = {'records': len(df), 'target': str(target.base_file), 'backups': []}
+
+    if include_backups:
+        backup_dir = data_dir / "backups"
+        for backup_file in sorted(backup_dir.glob(f"backup_*{source.suffix}")):
+            target_file = backup_file.with_suffix(target.suffix)
+            if target_file.exists():
+                continue
+
+            backup_df = source.read_backup(backup_file)
+            target.write_backup(backup_df, target_file)
+
+            # 保留原备份的修改时间，旧备份清理按时间排序
+            source_stat = backup_file.stat()
+            os.utime(target_file, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+            result['backups'].append(str(target_file))
+            logger.info(f"转换备份: {backup_file} -> {target_file}")
+
+    return result
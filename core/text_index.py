@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本子串索引 - 为省份、品种名称、市场名称的模糊查询建立字符二元组倒排索引
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Any, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .storage import Predicate, is_categorical
+
+# 建立子串索引的列（search_data 中按包含关系过滤的列）
+INDEXED_COLUMNS = ['省份', '品种名称', '市场名称']
+
+def bigrams(text: str) -> Set[str]:
+    """文本的字符二元组集合"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class NgramIndex:
+    """单列的字符二元组倒排索引
+
+    索引建立在该列的去重值上：二元组 -> 包含它的去重值集合，
+    另保存单字符 -> 去重值集合，用于单字符查询。
+    查询时对二元组倒排表求交得到候选值，再逐个校验是否包含查询串。
+    """
+
+    def __init__(self):
+        self.values = set()
+        self.grams = {}
+        self.chars = {}
+
+    def add(self, values) -> int:
+        """加入新的去重值，返回新增数量"""
+        added = 0
+
+        for value in values:
+            if not isinstance(value, str) or value in self.values:
+                continue
+
+            self.values.add(value)
+            for gram in bigrams(value):
+                self.grams.setdefault(gram, set()).add(value)
+            for char in set(value):
+                self.chars.setdefault(char, set()).add(value)
+            added += 1
+
+        return added
+
+    def lookup(self, query: str) -> Set[str]:
+        """返回包含查询串的全部去重值"""
+        if not query:
+            return set(self.values)
+
+        if len(query) == 1:
+            return set(self.chars.get(query, ()))
+
+        postings = []
+        for gram in bigrams(query):
+            values = self.grams.get(gram)
+            if not values:
+                return set()
+            postings.append(values)
+
+        # 从最短的倒排表开始求交
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for values in postings[1:]:
+            candidates &= values
+            if not candidates:
+                return candidates
+
+        # 二元组全部出现不代表连续出现，需校验
+        return {value for value in candidates if query in value}
+
+class SubstringIndex:
+    """价格表的子串索引：列 -> 去重值二元组索引，去重值 -> 行号集合
+
+    去重值索引随 save_data 增量更新，重新加载价格表时重建；
+    行号集合取自字典编码列的整数编码，按价格表对象缓存，表合并后首次查询时重建。
+    """
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns = list(columns or INDEXED_COLUMNS)
+        self._indexes = {col: NgramIndex() for col in self.columns}
+        self._rows = {}
+        self._lock = threading.RLock()
+        self.stats = {
+            'rebuilds': 0,
+            'incremental_values': 0,
+            'lookups': 0,
+            'fallbacks': 0,
+            'row_postings_builds': 0
+        }
+
+    def rebuild(self, df: pd.DataFrame):
+        """按价格表重建全部去重值索引"""
+        with self._lock:
+            self._indexes = {col: NgramIndex() for col in self.columns}
+            self._rows = {}
+            self._add_frame(df)
+            self.stats['rebuilds'] += 1
+
+    def add(self, df: pd.DataFrame):
+        """增量加入新批次中出现的去重值"""
+        with self._lock:
+            self.stats['incremental_values'] += self._add_frame(df)
+
+    def _add_frame(self, df: pd.DataFrame) -> int:
+        added = 0
+
+        for col in self.columns:
+            if col not in df.columns:
+                continue
+
+            series = df[col]
+            values = series.cat.categories if is_categorical(series) else series.dropna().unique()
+            added += self._indexes[col].add(values)
+
+        return added
+
+    def _row_postings(self, df: pd.DataFrame, column: str) -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+        """该列每个类别对应的行号：按编码稳定排序后的行号数组及各类别的起止位置"""
+        cached = self._rows.get(column)
+
+        if cached is not None and cached[0] is df:
+            return cached[1:]
+
+        series = df[column]
+        codes = series.cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(series.cat.categories) + 1))
+
+        self._rows[column] = (df, series.cat.categories, order, bounds)
+        self.stats['row_postings_builds'] += 1
+
+        return series.cat.categories, order, bounds
+
+    def row_ids(self, df: pd.DataFrame, column: str, query: str) -> Optional[np.ndarray]:
+        """返回该列包含查询串的行号（已排序），无法使用索引时返回None"""
+        if column not in self._indexes or column not in df.columns or not is_categorical(df[column]):
+            return None
+
+        # 含正则元字符的查询保持原有的正则匹配语义
+        if re.escape(query) != query:
+            return None
+
+        with self._lock:
+            values = self._indexes[column].lookup(query)
+            categories, order, bounds = self._row_postings(df, column)
+
+        codes = categories.get_indexer(list(values)) if values else np.array([], dtype=np.intp)
+        codes = codes[codes >= 0]
+
+        if len(codes) == 0:
+            return np.array([], dtype=np.intp)
+
+        rows = np.concatenate([order[bounds[code]:bounds[code + 1]] for code in codes])
+        rows.sort()
+        return rows
+
+    def filter(self, df: pd.DataFrame, predicates: Optional[List[Predicate]]) -> Tuple[pd.DataFrame, List[Predicate]]:
+        """用索引处理包含条件，返回过滤后的表和剩余的过滤条件"""
+        if df.empty or not predicates:
+            return df, list(predicates or [])
+
+        rows = None
+        remaining = []
+
+        for predicate in predicates:
+            column, op, value = predicate
+            matched = self.row_ids(df, column, value) if op == 'contains' and isinstance(value, str) else None
+
+            if matched is None:
+                if op == 'contains':
+                    self.stats['fallbacks'] += 1
+                remaining.append(predicate)
+                continue
+
+            self.stats['lookups'] += 1
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+
+        if rows is None:
+            return df, remaining
+
+        return df.iloc[rows], remaining
+
+    def get_stats(self) -> Dict[str, Any]:
+        """索引规模与使用统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['columns'] = {
+                col: {'values': len(index.values), 'bigrams': len(index.grams)}
+                for col, index in self._indexes.items()
+            }
+            return stats
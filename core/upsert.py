@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入去重 - 按关键字段哈希定位记录，新批次逐行覆盖或追加到预留容量的列缓冲
+"""
+
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .storage import (
+    EXTRA_COLUMNS, KEY_COLUMNS, PRICE_COLUMNS, decode_categories, encode_categories, is_categorical,
+    merge_frames
+)
+
+# 写入批次中每行的状态
+ROW_NEW = 0
+ROW_UPDATED = 1
+ROW_UNCHANGED = 2
+
+# 判断内容是否变化时忽略的列（每次抓取都会变化）
+VOLATILE_COLUMNS = ['更新时间', '保存时间']
+
+# 参与内容哈希的列
+CONTENT_COLUMNS = [col for col in PRICE_COLUMNS + EXTRA_COLUMNS if col not in VOLATILE_COLUMNS]
+
+def _hash_columns(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """按指定列计算每行的64位哈希，类别列与文本列、缺失列与空值结果一致"""
+    values = decode_categories(df.reindex(columns=columns)).astype(object)
+    values = values.where(values.notna(), '').astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def key_hashes(df: pd.DataFrame) -> np.ndarray:
+    """去重关键字段（市场、品种、交易日期）的哈希"""
+    return _hash_columns(df, KEY_COLUMNS)
+
+def content_hashes(df: pd.DataFrame) -> np.ndarray:
+    """记录内容（不含更新时间、保存时间）的哈希"""
+    return _hash_columns(df, CONTENT_COLUMNS)
+
+# 常驻表列缓冲的最小容量
+MIN_CAPACITY = 1024
+
+def _codes_dtype(categories: int) -> np.dtype:
+    """与pandas一致的类别编码整数类型（按类别数选择）"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _key_text(value: Any) -> str:
+    """关键字段值的文本形式，与哈希时的规则一致（空值为空字符串）"""
+    return '' if value is None or (not isinstance(value, str) and pd.isna(value)) else str(value)
+
+def _batch_keys(df: pd.DataFrame) -> Tuple[List[int], List[tuple]]:
+    """批次每行的关键字段哈希与关键字段文本"""
+    keys = decode_categories(df.reindex(columns=KEY_COLUMNS))
+    keys = list(zip(*[[_key_text(value) for value in keys[col].tolist()] for col in KEY_COLUMNS]))
+    return key_hashes(df).tolist(), keys
+
+class UpsertIndex:
+    """常驻价格表的 关键字段哈希 -> 行号 索引及可增长的列缓冲
+
+    价格表的每列保存在预留了容量的数组中，发布的价格表是各数组前 n 行的视图：
+    新增的行写入已有行之后的空闲位置，容量不足时按倍数扩容，追加的代价与批次大小成正比；
+    被覆盖的行只复制变化的列后再写入，已发布的价格表始终不被修改。
+    哈希命中时再比较关键字段本身，哈希冲突的不同关键字段单独记录，不会互相覆盖。
+    索引绑定在价格表对象上，表重新加载后首次合并时重建。
+    """
+
+    def __init__(self):
+        self._table = None
+        self._positions = {}
+        self._collisions = {}
+        self._buffers = {}
+        self._categories = {}
+        self._fresh = set()
+        self._length = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'rebuilds': 0,
+            'merges': 0,
+            'appended_rows': 0,
+            'updated_rows': 0,
+            'grows': 0,
+            'copied_columns': 0,
+            'hash_collisions': 0
+        }
+
+    def _key_at(self, position: int) -> tuple:
+        """价格表中第 position 行的关键字段"""
+        key = []
+        for col in KEY_COLUMNS:
+            buffer = self._buffers.get(col)
+            if buffer is None:
+                key.append('')
+            elif col in self._categories:
+                code = buffer[position]
+                key.append(self._categories[col][code] if code >= 0 else '')
+            else:
+                key.append(_key_text(buffer[position]))
+        return tuple(key)
+
+    def _find(self, value: int, key: tuple) -> Optional[int]:
+        """按哈希与关键字段查找行号"""
+        position = self._positions.get(value)
+        if position is None:
+            return None
+        if self._key_at(position) == key:
+            return position
+        return self._collisions.get(key)
+
+    def _insert(self, value: int, key: tuple, position: int):
+        """登记新行的行号"""
+        if value not in self._positions:
+            self._positions[value] = position
+        else:
+            self._collisions[key] = position
+            self.stats['hash_collisions'] += 1
+
+    def _adopt(self, table: pd.DataFrame):
+        """以价格表的内容建立列缓冲与行号索引"""
+        n = len(table)
+        capacity = max(MIN_CAPACITY, 2 * n)
+        self._buffers = {}
+        self._categories = {}
+
+        for col in table.columns:
+            series = table[col]
+            if is_categorical(series):
+                values = series.cat.codes.to_numpy()
+                self._categories[col] = series.cat.categories
+            else:
+                values = series.to_numpy()
+            buffer = np.empty(capacity, dtype=values.dtype)
+            buffer[:n] = values
+            self._buffers[col] = buffer
+
+        self._length = n
+        hashes = key_hashes(table).tolist()
+        self._positions = dict(zip(hashes, range(n)))
+        self._collisions = {}
+
+        # 哈希重复的行：关键字段不同时为冲突，单独记录
+        if len(self._positions) < n:
+            for position in np.flatnonzero(pd.Series(hashes).duplicated(keep='last').to_numpy()).tolist():
+                key = self._key_at(position)
+                if key != self._key_at(self._positions[hashes[position]]) and key not in self._collisions:
+                    self._collisions[key] = position
+                    self.stats['hash_collisions'] += 1
+
+        # 新建的缓冲不被任何已发布的表引用，可直接写入
+        self._fresh = set(self._buffers)
+        self._table = table
+        self.stats['rebuilds'] += 1
+
+    def _reserve(self, length: int):
+        """确保列缓冲能容纳 length 行，不足时按倍数扩容（复制到新数组，已发布的表不受影响）"""
+        capacity = len(next(iter(self._buffers.values()))) if self._buffers else 0
+        if length <= capacity:
+            return
+
+        capacity = max(length, 2 * capacity, MIN_CAPACITY)
+        for col, buffer in self._buffers.items():
+            grown = np.empty(capacity, dtype=buffer.dtype)
+            grown[:self._length] = buffer[:self._length]
+            self._buffers[col] = grown
+            self._fresh.add(col)
+        self.stats['grows'] += 1
+
+    def _copy_column(self, col: str, dtype: Optional[np.dtype] = None):
+        """复制一列的缓冲（写时复制），可同时转换类型；本次合并中已复制过且类型不变时跳过"""
+        buffer = self._buffers[col]
+        if col in self._fresh and (dtype is None or dtype == buffer.dtype):
+            return
+
+        copied = np.empty(len(buffer), dtype=dtype or buffer.dtype)
+        copied[:self._length] = buffer[:self._length]
+        self._buffers[col] = copied
+        self._fresh.add(col)
+        self.stats['copied_columns'] += 1
+
+    def _add_column(self, col: str, dtype: np.dtype):
+        """批次带来的新列：已有行为空值"""
+        capacity = len(next(iter(self._buffers.values())))
+        buffer = np.empty(capacity, dtype=dtype)
+        buffer[:self._length] = np.nan
+        self._buffers[col] = buffer
+        self._fresh.add(col)
+
+    def _encode(self, col: str, series: pd.Series) -> np.ndarray:
+        """把批次的一列转换为缓冲中的表示；类别列出现新值时按字典序插入类别并重编码已有行"""
+        if col in self._categories:
+            values = decode_categories(series.to_frame())[col]
+            present = values.notna().to_numpy()
+            texts = values[present].astype(str)
+            categories = self._categories[col]
+
+            new_values = pd.Index(texts.unique()).difference(categories)
+            if len(new_values):
+                merged = categories.append(new_values).sort_values()
+                mapping = merged.get_indexer(categories)
+                old = self._buffers[col][:self._length]
+                present_rows = old >= 0
+                self._copy_column(col, _codes_dtype(len(merged)))
+                recoded = self._buffers[col][:self._length]
+                recoded[present_rows] = mapping[old[present_rows]]
+                self._categories[col] = categories = merged
+
+            codes = np.full(len(series), -1, dtype=self._buffers[col].dtype)
+            codes[present] = categories.get_indexer(texts)
+            return codes
+
+        buffer = self._buffers[col]
+        if buffer.dtype != object:
+            try:
+                return series.to_numpy(dtype=buffer.dtype)
+            except (TypeError, ValueError):
+                self._copy_column(col, np.dtype(object))
+        return series.to_numpy(dtype=object)
+
+    def _empty_values(self, col: str, count: int) -> np.ndarray:
+        """批次缺少的列：空值"""
+        buffer = self._buffers[col]
+        if col in self._categories:
+            return np.full(count, -1, dtype=buffer.dtype)
+        if buffer.dtype.kind != 'f' and buffer.dtype != object:
+            self._copy_column(col, np.dtype(np.float64))
+        return np.full(count, np.nan, dtype=self._buffers[col].dtype)
+
+    def _frame(self) -> pd.DataFrame:
+        """由列缓冲前 n 行的视图组成价格表（不复制数据）"""
+        n = self._length
+        columns = {}
+        for col, buffer in self._buffers.items():
+            if col in self._categories:
+                columns[col] = pd.Categorical.from_codes(
+                    buffer[:n], dtype=pd.CategoricalDtype(self._categories[col]), validate=False
+                )
+            else:
+                columns[col] = buffer[:n]
+        return pd.DataFrame(columns, copy=False)
+
+    def merge(self, table: Optional[pd.DataFrame], batches: List[pd.DataFrame]) -> pd.DataFrame:
+        """把待合并批次写入价格表，返回新的价格表（原表不被修改）"""
+        with self._lock:
+            batch = merge_frames(batches)
+
+            if table is None or table.empty or batch.empty:
+                merged = encode_categories(merge_frames([table, batch]))
+                self._table = None
+                return merged
+
+            if self._table is not table:
+                self._adopt(table)
+            else:
+                self._fresh = set()
+
+            hashes, keys = _batch_keys(batch)
+
+            appended = []
+            updated = []
+            updated_positions = []
+            for i, (value, key) in enumerate(zip(hashes, keys)):
+                position = self._find(value, key)
+                if position is None:
+                    appended.append(i)
+                else:
+                    updated.append(i)
+                    updated_positions.append(position)
+
+            for col in batch.columns:
+                if col not in self._buffers:
+                    dtype = np.dtype(np.float64) if pd.api.types.is_float_dtype(batch[col].dtype) else np.dtype(object)
+                    self._add_column(col, dtype)
+
+            start = self._length
+            self._reserve(start + len(appended))
+
+            for col in self._buffers:
+                if col in batch.columns:
+                    values = self._encode(col, batch[col])
+                else:
+                    values = self._empty_values(col, len(batch))
+
+                if updated:
+                    # 已发布的表引用当前缓冲，只复制内容有变化的列后再覆盖
+                    rows = values[updated]
+                    if not pd.Series(self._buffers[col][updated_positions]).equals(pd.Series(rows)):
+                        self._copy_column(col)
+                        self._buffers[col][updated_positions] = rows
+                if appended:
+                    self._buffers[col][start:start + len(appended)] = values[appended]
+
+            for offset, i in enumerate(appended):
+                self._insert(hashes[i], keys[i], start + offset)
+
+            self._length = start + len(appended)
+            merged = self._frame()
+
+            self._table = merged
+            self.stats['merges'] += 1
+            self.stats['appended_rows'] += len(appended)
+            self.stats['updated_rows'] += len(updated)
+
+            return merged
+
+    def lookup(self, table: Optional[pd.DataFrame], df: pd.DataFrame) -> np.ndarray:
+        """df 每行的关键字段在价格表中的行号，不存在时为-1"""
+        with self._lock:
+            if table is None or table.empty or df.empty:
+                return np.full(len(df), -1, dtype=np.int64)
+
+            if self._table is not table:
+                self._adopt(table)
+
+            hashes, keys = _batch_keys(df)
+            positions = [self._find(value, key) for value, key in zip(hashes, keys)]
+            return np.array([-1 if position is None else position for position in positions], dtype=np.int64)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """索引使用统计"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['indexed_keys'] = len(self._positions) + len(self._collisions) if self._table is not None else 0
+            stats['capacity_rows'] = len(next(iter(self._buffers.values()))) if self._buffers else 0
+            return stats
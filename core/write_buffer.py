@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入缓冲 - 批次提交后立即返回，按记录数阈值或时间间隔合并后一次写入存储
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class WriteBuffer:
+    """写后缓冲（write-behind）
+
+    add 把批次放入内存缓冲后立即返回；后台线程在缓冲记录数达到 max_rows
+    或最早一批等待超过 interval_seconds 时调用 flush_func 一次写入全部记录。
+    写入失败的记录放回缓冲头部，下次刷新时重试；close 停止后台线程并写出剩余记录。
+    关闭后仍在提交的批次（如停止超时后仍在运行的爬虫）直接同步写入，不丢失。
+    """
+
+    def __init__(self, flush_func: Callable[[List[Dict]], Any], max_rows: int = 5000,
+                 interval_seconds: float = 10.0, name: str = "price-write-buffer"):
+        self.flush_func = flush_func
+        self.max_rows = max(1, int(max_rows))
+        self.interval_seconds = max(0.1, float(interval_seconds))
+        self.name = name
+
+        self._rows = []
+        self._batches = 0
+        self._oldest = None
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.stats = {
+            'accepted_batches': 0,
+            'accepted_rows': 0,
+            'flushes': 0,
+            'flushed_rows': 0,
+            'failed_flushes': 0,
+            'size_triggered': 0,
+            'interval_triggered': 0,
+            'last_flush': None,
+            'last_flush_rows': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'max_depth': 0,
+            'write_through_batches': 0,
+            'write_through_rows': 0,
+            'last_error': None
+        }
+
+    def _ensure_started(self):
+        """首次提交时启动刷新线程"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def add(self, rows: List[Dict]) -> int:
+        """提交一个批次，立即返回当前缓冲的记录数；缓冲已关闭时同步写入后返回0"""
+        if not rows:
+            return self.depth()
+
+        with self._condition:
+            if not self._closed:
+                self._ensure_started()
+
+                if not self._rows:
+                    self._oldest = time.monotonic()
+                self._rows.extend(rows)
+                self._batches += 1
+
+                self.stats['accepted_batches'] += 1
+                self.stats['accepted_rows'] += len(rows)
+                self.stats['max_depth'] = max(self.stats['max_depth'], len(self._rows))
+
+                if len(self._rows) >= self.max_rows:
+                    self._condition.notify()
+
+                return len(self._rows)
+
+        return self._write_through(rows)
+
+    def _write_through(self, rows: List[Dict]) -> int:
+        """缓冲关闭后的提交：连同尚未写出的记录按提交顺序同步写入"""
+        with self._flush_lock:
+            with self._condition:
+                pending = self._take()
+
+            try:
+                self.flush_func(pending + rows)
+            except Exception:
+                self._restore(pending)
+                raise
+
+        with self._condition:
+            self.stats['write_through_batches'] += 1
+            self.stats['write_through_rows'] += len(rows)
+
+        return 0
+
+    def _take(self) -> List[Dict]:
+        """取出缓冲中的全部记录（须持有 _condition）"""
+        rows = self._rows
+        self._rows = []
+        self._batches = 0
+        self._oldest = None
+        return rows
+
+    def _restore(self, rows: List[Dict]):
+        """写入失败时把记录放回缓冲头部，保持提交顺序"""
+        with self._condition:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows = rows + self._rows
+            self._batches += 1
+
+    def flush(self) -> Dict[str, Any]:
+        """立即写出缓冲中的全部记录，返回本次刷新的记录数与耗时"""
+        with self._flush_lock:
+            with self._condition:
+                rows = self._take()
+
+            if not rows:
+                return {'rows': 0, 'elapsed_ms': 0.0}
+
+            start = time.perf_counter()
+            try:
+                self.flush_func(rows)
+            except Exception as e:
+                self._restore(rows)
+                self.stats['failed_flushes'] += 1
+                self.stats['last_error'] = str(e)
+                logger.error(f"写入缓冲刷新失败，{len(rows)} 条记录保留在缓冲中: {e}")
+                raise
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            self.stats['flushes'] += 1
+            self.stats['flushed_rows'] += len(rows)
+            self.stats['last_flush'] = datetime.now().isoformat()
+            self.stats['last_flush_rows'] = len(rows)
+            self.stats['last_flush_ms'] = round(elapsed_ms, 3)
+            self.stats['max_flush_ms'] = round(max(self.stats['max_flush_ms'], elapsed_ms), 3)
+            self.stats['total_flush_ms'] = round(self.stats['total_flush_ms'] + elapsed_ms, 3)
+            self.stats['last_error'] = None
+
+            return {'rows': len(rows), 'elapsed_ms': round(elapsed_ms, 3)}
+
+    def _due(self) -> Optional[str]:
+        """是否需要刷新及原因（须持有 _condition）"""
+        if not self._rows:
+            return None
+        if len(self._rows) >= self.max_rows:
+            return 'size_triggered'
+        if time.monotonic() - self._oldest >= self.interval_seconds:
+            return 'interval_triggered'
+        return None
+
+    def _run(self):
+        """刷新线程主循环"""
+        while True:
+            with self._condition:
+                reason = self._due()
+                while reason is None and not self._closed:
+                    if self._rows:
+                        timeout = self.interval_seconds - (time.monotonic() - self._oldest)
+                    else:
+                        timeout = self.interval_seconds
+                    self._condition.wait(timeout=max(timeout, 0.01))
+                    reason = self._due()
+
+                if self._closed:
+                    return
+
+                self.stats[reason] += 1
+
+            try:
+                self.flush()
+            except Exception:
+                # 失败的记录已放回缓冲，等待一个间隔后重试
+                time.sleep(self.interval_seconds)
+
+    def close(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """停止刷新线程并写出剩余记录"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+        return self.flush()
+
+    def depth(self) -> int:
+        """缓冲中等待写入的记录数"""
+        with self._condition:
+            return len(self._rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓冲深度与刷新延迟统计"""
+        with self._condition:
+            stats = dict(self.stats)
+            stats['depth_rows'] = len(self._rows)
+            stats['depth_batches'] = self._batches
+            stats['oldest_age_seconds'] = round(time.monotonic() - self._oldest, 3) if self._oldest else 0.0
+
+        stats['max_rows'] = self.max_rows
+        stats['interval_seconds'] = self.interval_seconds
+        stats['avg_flush_ms'] = round(stats['total_flush_ms'] / stats['flushes'], 3) if stats['flushes'] else 0.0
+        stats['running'] = bool(self._thread and self._thread.is_alive())
+        stats['closed'] = self._closed
+        return stats
@@ -13,8 +13,11 @@ class MarketPlatform {
         this.reportPageSize = 10;
         this.totalReportPages = 0;
         this.currentReportType = 'all'; // 当前报告类型
+        this.reportCursors = new Map(); // 页码 -> 游标（由上一页的 next_cursor 得到）
+        this.priceListFields = '省份,市场名称,品种名称,最低价,平均价,最高价,单位,交易日期,更新时间'; // 价格表格显示的列
         this.dashboardData = null; // 仪表盘数据
         this.previewChart = null; // 预览图表
+        this.http = new ConditionalClient(); // 带缓存校验的GET
         this.init();
     }
 
@@ -82,8 +85,7 @@ class MarketPlatform {
 
     async refreshStats() {
         try {
-            const response = await fetch(`${this.apiBase}/stats`);
-            const result = await response.json();
+            const result = await this.http.fetchJSON(`${this.apiBase}/stats`);
             
             if (result.success) {
                 this.updateStatsDisplay(result.data);
@@ -113,22 +115,19 @@ class MarketPlatform {
     async loadDropdownOptions() {
         try {
             // 加载省份选项
-            const provincesResponse = await fetch(`${this.apiBase}/data/provinces`);
-            const provincesResult = await provincesResponse.json();
+            const provincesResult = await this.http.fetchJSON(`${this.apiBase}/data/provinces`);
             if (provincesResult.success) {
                 this.populateSelect('province', provincesResult.data);
             }
 
             // 加载品种选项
-            const varietiesResponse = await fetch(`${this.apiBase}/data/varieties`);
-            const varietiesResult = await varietiesResponse.json();
+            const varietiesResult = await this.http.fetchJSON(`${this.apiBase}/data/varieties`);
             if (varietiesResult.success) {
                 this.populateSelect('variety', varietiesResult.data);
             }
 
             // 加载市场选项
-            const marketsResponse = await fetch(`${this.apiBase}/data/markets`);
-            const marketsResult = await marketsResponse.json();
+            const marketsResult = await this.http.fetchJSON(`${this.apiBase}/data/markets`);
             if (marketsResult.success) {
                 this.populateSelect('market', marketsResult.data);
             }
@@ -162,8 +161,7 @@ class MarketPlatform {
         try {
             this.showLoading(true);
             
-            const response = await fetch(`${this.apiBase}/data/latest?limit=100`);
-            const result = await response.json();
+            const result = await this.http.fetchJSON(`${this.apiBase}/data/latest?limit=100&fields=${encodeURIComponent(this.priceListFields)}`);
             
             if (result.success) {
                 this.currentData = result.data;
@@ -199,7 +197,7 @@ class MarketPlatform {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify(searchParams)
+                body: JSON.stringify({ ...searchParams, fields: this.priceListFields })
             });
 
             const result = await response.json();
@@ -382,10 +380,24 @@ class MarketPlatform {
     // 报告相关方法
     async loadLatestReports(page = 1, reportType = 'all') {
         try {
-            const response = await fetch(`${this.apiBase}/reports/latest?limit=${this.reportPageSize}&page=${page}&report_type=${reportType}`);
-            const result = await response.json();
+            if (page === 1 || reportType !== this.currentReportType) {
+                this.reportCursors.clear();
+            }
+
+            // 已知游标时按游标翻页，否则按页码偏移
+            const cursor = this.reportCursors.get(page);
+            let url = `${this.apiBase}/reports/latest?limit=${this.reportPageSize}&page=${page}&report_type=${reportType}`;
+            if (cursor) {
+                url += `&cursor=${encodeURIComponent(cursor)}`;
+            }
+
+            const result = await this.http.fetchJSON(url);
 
             if (result.success) {
+                if (result.next_cursor) {
+                    this.reportCursors.set(page + 1, result.next_cursor);
+                }
+
                 this.displayReports(result.data);
                 this.updateReportPagination(result);
                 this.updateReportCount(result.total);
@@ -404,8 +416,7 @@ class MarketPlatform {
 
     async loadReportStats() {
         try {
-            const response = await fetch(`${this.apiBase}/reports/stats`);
-            const result = await response.json();
+            const result = await this.http.fetchJSON(`${this.apiBase}/reports/stats`);
             this.updateReportTypeStats(result);
         } catch (error) {
             console.error('加载报告统计失败:', error);
@@ -436,8 +447,7 @@ class MarketPlatform {
     // 仪表盘相关方法
     async loadDashboardData() {
         try {
-            const response = await fetch(`${this.apiBase}/dashboard/data`);
-            const result = await response.json();
+            const result = await this.http.fetchJSON(`${this.apiBase}/dashboard/data`);
 
             if (result.success) {
                 this.dashboardData = result.data;
@@ -763,14 +773,24 @@ class MarketPlatform {
         }
     }
 
-    // 报告详情查看
-    viewReportDetail(reportIndex) {
+    // 报告详情查看（列表不含报告全文，按报告ID读取完整报告）
+    async viewReportDetail(reportIndex) {
         if (!this.currentReports || !this.currentReports[reportIndex]) {
             this.showMessage('报告数据不存在', 'error');
             return;
         }
 
-        const report = this.currentReports[reportIndex];
+        let report = this.currentReports[reportIndex];
+        if (report.报告ID) {
+            try {
+                const result = await this.http.fetchJSON(`${this.apiBase}/reports/${encodeURIComponent(report.报告ID)}`);
+                if (result.success) {
+                    report = result.data;
+                }
+            } catch (error) {
+                console.error('加载报告详情失败:', error);
+            }
+        }
         this.currentReportData = report;
 
         // 填充模态框数据
@@ -958,8 +978,7 @@ class MarketPlatform {
             this.showLoading(true);
 
             const timeRange = days || this.currentTimeRange;
-            const response = await fetch(`${this.apiBase}/dashboard/trends?days=${timeRange}`);
-            const result = await response.json();
+            const result = await this.http.fetchJSON(`${this.apiBase}/dashboard/trends?days=${timeRange}`);
 
             if (result.success) {
                 this.updateMetrics(result.data.key_metrics);
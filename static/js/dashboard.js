@@ -7,6 +7,7 @@ class Dashboard {
         this.apiBase = '/api';
         this.charts = {};
         this.dashboardData = null;
+        this.http = new ConditionalClient(); // 带缓存校验的GET
         this.init();
     }
 
@@ -49,8 +50,7 @@ class Dashboard {
 
     async loadDashboardData() {
         try {
-            const response = await fetch(`${this.apiBase}/dashboard/data`);
-            const result = await response.json();
+            const result = await this.http.fetchJSON(`${this.apiBase}/dashboard/data`);
 
             if (result.success) {
                 this.dashboardData = result.data;
@@ -0,0 +1,37 @@
+/**
+ * 农产品市场价格管理平台 - 带缓存校验的请求
+ */
+
+class ConditionalClient {
+    constructor() {
+        this.validatorCache = new Map(); // URL -> {etag, lastModified, data}
+    }
+
+    // 带缓存校验的GET：携带上次响应的ETag/Last-Modified，服务器返回304时直接使用上次的结果
+    async fetchJSON(url) {
+        const cached = this.validatorCache.get(url);
+        const headers = {};
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+            if (cached.lastModified) {
+                headers['If-Modified-Since'] = cached.lastModified;
+            }
+        }
+
+        const response = await fetch(url, { headers, cache: 'no-store' });
+        if (response.status === 304 && cached) {
+            return cached.data;
+        }
+
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        if (response.ok && etag) {
+            this.validatorCache.set(url, {
+                etag,
+                lastModified: response.headers.get('Last-Modified'),
+                data
+            });
+        }
+        return data;
+    }
+}
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共夹具 - 临时数据目录上的数据管理器与随机价格记录
+"""
+
+import random
+from typing import Dict, List
+
+import pytest
+
+from core.config import config
+from core.data_manager import DataManager
+
+ENGINES = ['csv', 'parquet', 'sqlite', 'partitioned']
+
+def price_rows(count: int, seed: int, days: int = 12, month: str = '2026-10') -> List[Dict]:
+    """生成爬虫格式的价格记录；关键字段 (市场, 品种, 交易日期) 取值较少，批次之间会有覆盖"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        rows.append({
+            'province': rng.choice(['山东', '河北', '江苏']),
+            'market_name': f"市场{rng.randint(1, 4)}",
+            'variety_name': rng.choice(['白菜', '土豆', '苹果', '西红柿']),
+            '品种类型': rng.choice(['蔬菜', '水果']),
+            'min_price': 1.0,
+            'avg_price': None if rng.random() < 0.1 else round(rng.uniform(1, 10), 2),
+            'max_price': 12.0,
+            'trade_date': f"{month}-{rng.randint(1, days):02d}",
+            'unit': '元/公斤'
+        })
+    return rows
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch):
+    """按存储引擎创建使用临时目录的数据管理器（默认不缓冲写入），测试结束时关闭
+
+    options 覆盖其余数据配置项，如 storage_options、write_buffer_rows。
+    """
+    managers = []
+
+    def factory(engine: str = 'csv', resident: bool = True, name: str = 'data', **options) -> DataManager:
+        data_config = dict(config.config['data'], storage_engine=engine, resident_table=resident,
+                           write_buffer_rows=0)
+        data_config.update(options)
+        monkeypatch.setitem(config.config, 'data', data_config)
+        manager = DataManager(str(tmp_path / name))
+        managers.append(manager)
+        return manager
+
+    yield factory
+
+    for manager in managers:
+        manager.close()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+维度目录测试：增量维护与全量重建一致，变化日志重放得到相同的目录
+"""
+
+import pytest
+
+from core.storage import decode_categories
+from tests.conftest import price_rows
+
+CATALOG_COLUMNS = ['省份', '品种名称', '市场名称']
+
+def expected_entries(manager, column):
+    """按价格表计算的目录条目"""
+    table = decode_categories(manager.storage.load())
+    table = table[table[column].notna()]
+    dates = table['交易日期'].astype(str).str[:10]
+    grouped = table.assign(date=dates).groupby(column)
+    return [
+        {'count': int(len(group)), 'first_date': group['date'].min(), 'last_date': group['date'].max(), 'value': value}
+        for value, group in grouped
+    ]
+
+def catalog_state(manager):
+    return {col: manager.catalog.entries(col) for col in CATALOG_COLUMNS}, manager.catalog.summary()
+
+@pytest.mark.parametrize('engine,resident', [('csv', True), ('sqlite', False)])
+def test_catalog_matches_table(make_manager, engine, resident):
+    """批次会改写已有关键字段的省份，目录仍与价格表一致"""
+    manager = make_manager(engine, resident=resident)
+    manager.save_data(price_rows(200, 1))
+    manager.get_provinces()
+    for seed in range(2, 8):
+        manager.save_data(price_rows(120, seed))
+
+    for col in CATALOG_COLUMNS:
+        assert manager.catalog.entries(col) == expected_entries(manager, col), col
+    assert manager.catalog.summary()['total_records'] == len(manager.storage.load())
+
+def test_province_change_moves_count_and_dates(make_manager):
+    manager = make_manager('csv')
+    rows = [
+        {'province': '山东', 'market_name': '市场1', 'variety_name': '白菜', 'avg_price': 1.0, 'trade_date': '2026-10-01'},
+        {'province': '山东', 'market_name': '市场1', 'variety_name': '白菜', 'avg_price': 1.0, 'trade_date': '2026-10-05'},
+        {'province': '河北', 'market_name': '市场2', 'variety_name': '土豆', 'avg_price': 1.0, 'trade_date': '2026-10-03'}
+    ]
+    manager.save_data(rows)
+    manager.get_provinces()
+
+    manager.save_data([dict(rows[1], province='河北')])
+    entries = {entry['value']: entry for entry in manager.catalog.entries('省份')}
+    assert entries['山东'] == {'count': 1, 'first_date': '2026-10-01', 'last_date': '2026-10-01', 'value': '山东'}
+    assert entries['河北'] == {'count': 2, 'first_date': '2026-10-03', 'last_date': '2026-10-05', 'value': '河北'}
+
+    manager.save_data([dict(rows[0], province='河北')])
+    assert manager.catalog.values('省份') == ['河北']
+    assert manager.catalog.summary()['province_records'] == {'河北': 3}
+
+def test_journal_replay_restores_catalog(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(200, 1))
+    manager.get_provinces()
+    for seed in range(2, 6):
+        manager.save_data(price_rows(80, seed))
+
+    stats = manager.catalog.get_stats()
+    assert stats['journal_bytes'] > 0 and stats['uncheckpointed_keys'] > 0
+    state = catalog_state(manager)
+    keys = dict(manager.catalog._keys)
+
+    reloaded = make_manager('csv')
+    reloaded.get_provinces()
+    assert reloaded.catalog.get_stats()['uncheckpointed_keys'] == stats['uncheckpointed_keys']
+    assert catalog_state(reloaded) == state
+    assert reloaded.catalog._keys == keys
+
+def test_torn_journal_line_is_ignored(make_manager):
+    """变化日志末尾写入中断时，存储版本与目录不一致而重新构建"""
+    manager = make_manager('csv')
+    manager.save_data(price_rows(100, 1))
+    manager.get_provinces()
+    manager.save_data(price_rows(50, 2))
+    state = catalog_state(manager)
+
+    with open(manager.catalog.journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"signature": "broken"')
+
+    reloaded = make_manager('csv')
+    reloaded.get_provinces()
+    assert catalog_state(reloaded) == state
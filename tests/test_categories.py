@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字典编码列测试：类别有序且只含使用中的值，编码与还原不改变内容
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from core.storage import (CATEGORICAL_COLUMNS, align_categories, decode_categories, encode_categories,
+                          is_categorical, merge_frames)
+from tests.conftest import price_rows
+
+def frame(values):
+    return pd.DataFrame({'省份': values, '平均价': range(len(values))})
+
+def test_encode_sorts_categories_and_keeps_nulls():
+    df = encode_categories(frame(['江苏', None, '北京', '江苏']))
+
+    assert is_categorical(df['省份'])
+    assert df['省份'].cat.categories.tolist() == ['北京', '江苏']
+    decoded = decode_categories(df)['省份']
+    assert decoded.isna().tolist() == [False, True, False, False]
+    assert decoded.dropna().tolist() == ['江苏', '北京', '江苏']
+    assert not is_categorical(df['平均价'])
+
+def test_encode_drops_unused_and_restores_order():
+    df = encode_categories(frame(['c', 'a', 'b']))
+    subset = df[df['省份'] != 'a']
+    subset = subset.assign(省份=subset['省份'].cat.set_categories(['c', 'b', 'a']))
+
+    encoded = encode_categories(subset)
+
+    assert encoded['省份'].cat.categories.tolist() == ['b', 'c']
+    assert decode_categories(encoded)['省份'].tolist() == ['c', 'b']
+
+def test_merge_keeps_categories_across_frames():
+    first = encode_categories(pd.DataFrame({'市场名称': ['m1'], '品种名称': ['白菜'], '交易日期': ['2026-10-01']}))
+    second = pd.DataFrame({'市场名称': ['m2', 'm1'], '品种名称': ['土豆', '白菜'], '交易日期': ['2026-10-01', '2026-10-01']})
+
+    aligned = align_categories([first, second])
+    assert all(is_categorical(part['市场名称']) for part in aligned)
+
+    merged = merge_frames([first, second])
+    assert is_categorical(merged['市场名称'])
+    assert sorted(decode_categories(merged)['市场名称']) == ['m1', 'm2']
+
+def test_resident_table_and_parquet_use_dictionary_encoding(make_manager):
+    manager = make_manager('parquet')
+    manager.save_data(price_rows(100, 1))
+    manager.compact()
+
+    table = manager.get_dataframe()
+    for col in CATEGORICAL_COLUMNS:
+        if col in table.columns:
+            assert is_categorical(table[col]), col
+            assert table[col].cat.categories.is_monotonic_increasing, col
+
+    schema = pq.read_schema(manager.storage.base_file)
+    assert str(schema.field('省份').type).startswith('dictionary')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条件请求测试：ETag 只随数据内容变化，请求携带的校验值一致时应答304
+"""
+
+from email.utils import formatdate
+
+import core.data_manager
+from core.conditional import Validators, file_validators
+from tests.conftest import price_rows
+
+def test_if_none_match():
+    validators = Validators(('prices', 3, 'token'), 1_700_000_000.0)
+    etag = validators.etag
+
+    assert validators.not_modified({'if-none-match': etag})
+    assert validators.not_modified({'if-none-match': f'"other", W/{etag}'})
+    assert validators.not_modified({'if-none-match': '*'})
+    assert not validators.not_modified({'if-none-match': '"other"'})
+    assert not validators.not_modified({})
+
+def test_if_modified_since_is_ignored_with_if_none_match():
+    validators = Validators(('prices', 3, 'token'), 1_700_000_000.0)
+    later = formatdate(1_700_000_100, usegmt=True)
+    earlier = formatdate(1_699_999_000, usegmt=True)
+
+    assert validators.not_modified({'if-modified-since': later})
+    assert not validators.not_modified({'if-modified-since': earlier})
+    assert not validators.not_modified({'if-modified-since': 'not a date'})
+    assert not validators.not_modified({'if-none-match': '"other"', 'if-modified-since': later})
+
+def test_headers_and_combine():
+    prices = Validators(('prices', 1, 'token'), 100.0)
+    reports = Validators(('reports', 5), 200.0)
+    combined = prices.combine(reports)
+
+    assert combined.modified == 200.0
+    assert combined.etag not in (prices.etag, reports.etag)
+    headers = combined.headers()
+    assert headers['ETag'] == combined.etag and headers['Cache-Control'] == 'no-cache'
+    assert headers['Last-Modified'] == formatdate(200.0, usegmt=True)
+
+def test_file_validators_follow_file(tmp_path):
+    path = tmp_path / 'reports.csv'
+    missing = file_validators(path)
+    assert missing.modified is None and missing.etag == file_validators(path).etag
+
+    path.write_text('a\n1\n', encoding='utf-8')
+    first = file_validators(path)
+    assert first.etag != missing.etag
+    path.write_text('a\n1\n2\n', encoding='utf-8')
+    assert file_validators(path).etag != first.etag
+
+def test_etag_changes_only_with_content(make_manager):
+    manager = make_manager('csv')
+    rows = price_rows(200, 1)
+    manager.save_data(rows)
+    validators = manager.get_validators()
+    assert manager.get_validators().etag == validators.etag
+    assert manager.get_validators().not_modified({'if-none-match': validators.etag})
+
+    # 内容不变的批次与压缩都不改变 ETag
+    manager.save_data(rows)
+    assert manager.get_validators().etag == validators.etag
+    assert manager.compact()['compacted_segments'] > 0
+    assert manager.get_validators().etag == validators.etag
+
+    manager.save_data([dict(rows[0], avg_price=99.0)])
+    changed = manager.get_validators()
+    assert changed.etag != validators.etag
+    assert not changed.not_modified({'if-none-match': validators.etag})
+
+def test_etag_differs_across_process_starts(make_manager, monkeypatch):
+    """重启后数据版本号从头计数，相同版本号的 ETag 也不同"""
+    manager = make_manager('csv')
+    manager.save_data(price_rows(50, 1))
+    before = manager.get_validators()
+
+    monkeypatch.setattr(core.data_manager, 'PROCESS_TOKEN', 'restarted')
+    after = manager.get_validators()
+    assert after.parts[1] == before.parts[1]
+    assert after.etag != before.etag
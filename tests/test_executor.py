@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阻塞任务执行器测试：同步调用在有界线程池中执行，事件循环在等待期间保持响应
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.executor import BlockingExecutor
+
+def test_run_returns_result_and_propagates_errors():
+    executor = BlockingExecutor(max_workers=2)
+
+    def fail():
+        raise KeyError('missing')
+
+    async def main():
+        assert await executor.run(lambda a, b=0: a + b, 1, b=2) == 3
+        with pytest.raises(KeyError):
+            await executor.run(fail)
+
+    asyncio.run(main())
+    stats = executor.get_stats()
+    assert stats['completed'] == 1 and stats['failed'] == 1
+    assert stats['queued'] == 0 and stats['active'] == 0
+    executor.shutdown()
+
+def test_pool_is_bounded_and_loop_stays_responsive():
+    executor = BlockingExecutor(max_workers=2)
+    release = threading.Event()
+
+    async def main():
+        tasks = [asyncio.ensure_future(executor.run(release.wait, 10)) for _ in range(5)]
+
+        # 阻塞任务占满线程池时，事件循环上的其他协程照常执行
+        started = time.perf_counter()
+        await asyncio.sleep(0.05)
+        assert time.perf_counter() - started < 1.0
+
+        stats = executor.get_stats()
+        assert stats['active'] == 2 and stats['queued'] == 3
+        assert stats['max_queued'] >= 3
+
+        release.set()
+        assert await asyncio.gather(*tasks) == [True] * 5
+
+    asyncio.run(main())
+    stats = executor.get_stats()
+    assert stats['completed'] == 5 and stats['active'] == 0 and stats['queued'] == 0
+    assert stats['max_wait_ms'] > 0
+    executor.shutdown()
+
+def test_iterate_advances_iterator_in_pool_threads():
+    executor = BlockingExecutor(max_workers=1, name='export-test')
+    threads = []
+
+    def chunks():
+        for i in range(4):
+            threads.append(threading.current_thread().name)
+            yield i
+
+    async def main():
+        return [item async for item in executor.iterate(chunks())]
+
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert all(name.startswith('export-test') for name in threads)
+    executor.shutdown()
+
+def test_iterate_closes_iterator_when_consumer_stops():
+    executor = BlockingExecutor(max_workers=1)
+    closed = threading.Event()
+
+    def chunks():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            closed.set()
+
+    async def main():
+        stream = executor.iterate(chunks())
+        received = []
+        async for item in stream:
+            received.append(item)
+            if len(received) == 3:
+                break
+        await stream.aclose()
+        return received
+
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert closed.is_set()
+    executor.shutdown()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导出测试：表头在读取数据前确定，分块输出与一次性导出结果一致
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from core.export import EXPORT_COLUMNS, iter_arrow, iter_csv, iter_parquet
+from core.storage import decode_categories
+from tests.conftest import price_rows
+
+def read_csv(data: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(data), encoding='utf-8-sig', dtype=str, keep_default_na=False)
+
+def test_header_is_sent_before_reading_frames():
+    def frames():
+        raise AssertionError('表头之前不应读取数据')
+        yield
+
+    chunks = iter_csv(frames(), ['市场名称', '平均价'])
+    assert next(chunks) == '\ufeff市场名称,平均价\n'.encode('utf-8')
+
+def test_column_only_in_later_chunk_is_exported():
+    first = pd.DataFrame({'市场名称': ['市场1'], '平均价': [1.5]})
+    second = pd.DataFrame({'市场名称': ['市场2'], '平均价': [2.5], '产地': ['山东']})
+
+    df = read_csv(b''.join(iter_csv([first, second])))
+    assert list(df.columns) == EXPORT_COLUMNS
+    assert df['产地'].tolist() == ['', '山东']
+    assert df['平均价'].tolist() == ['1.5', '2.5']
+
+def test_empty_export_has_header_only():
+    df = read_csv(b''.join(iter_csv([], ['省份', '平均价'])))
+    assert list(df.columns) == ['省份', '平均价'] and df.empty
+
+def test_export_streams_all_matching_rows(make_manager):
+    manager = make_manager('sqlite', resident=False)
+    for seed in range(1, 5):
+        manager.save_data(price_rows(150, seed))
+
+    frames = list(manager.iter_export([('省份', '==', '山东')], chunk_rows=7))
+    assert len(frames) > 1
+
+    exported = read_csv(b''.join(manager.export_data('csv', province='山东', columns=['市场名称', '品种名称', '交易日期'])))
+    table = decode_categories(manager.storage.load())
+    expected = table[table['省份'] == '山东']
+    assert list(exported.columns) == ['市场名称', '品种名称', '交易日期']
+    assert sorted(map(tuple, exported.values.tolist())) == \
+        sorted(map(tuple, expected[['市场名称', '品种名称', '交易日期']].astype(str).values.tolist()))
+
+def test_gzip_export_matches_csv(make_manager):
+    import gzip
+
+    manager = make_manager('csv')
+    manager.save_data(price_rows(200, 1))
+
+    plain = b''.join(manager.export_data('csv'))
+    compressed = b''.join(manager.export_data('csv.gz'))
+    assert gzip.decompress(compressed) == plain
+    assert len(read_csv(plain)) == len(manager.storage.load())
+
+pa = pytest.importorskip('pyarrow')
+
+def read_columnar(format, data: bytes) -> 'pa.Table':
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(io.BytesIO(data))
+    return pa.ipc.open_stream(io.BytesIO(data)).read_all()
+
+@pytest.mark.parametrize('format,encode', [('parquet', iter_parquet), ('arrow', iter_arrow)])
+def test_typed_export_schema_covers_later_columns(format, encode):
+    first = pd.DataFrame({'市场名称': ['市场1'], '平均价': [1.5]})
+    second = pd.DataFrame({'市场名称': ['市场2'], '平均价': [None], '产地': ['山东']})
+
+    table = read_columnar(format, b''.join(encode([first, second])))
+    assert table.schema.names == EXPORT_COLUMNS
+    assert table.schema.field('平均价').type == pa.float64()
+    assert table.schema.field('交易日期').type == pa.string()
+    assert table.column('产地').to_pylist() == [None, '山东']
+    assert table.column('平均价').to_pylist() == [1.5, None]
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_typed_export_matches_table(make_manager, format):
+    manager = make_manager('csv', resident=False)
+    for seed in range(1, 4):
+        manager.save_data(price_rows(150, seed))
+
+    columns = ['市场名称', '品种名称', '交易日期', '平均价']
+    table = read_columnar(format, b''.join(manager.export_data(format, variety='白菜', columns=columns))).to_pandas()
+    stored = decode_categories(manager.storage.load())
+    expected = stored[stored['品种名称'] == '白菜'][columns]
+
+    assert list(table.columns) == columns
+    key = ['市场名称', '交易日期']
+    pd.testing.assert_frame_equal(
+        table.sort_values(key).reset_index(drop=True),
+        expected.astype({'交易日期': str}).sort_values(key).reset_index(drop=True),
+        check_dtype=False
+    )
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_empty_typed_export_keeps_schema(make_manager, format):
+    manager = make_manager('csv')
+    table = read_columnar(format, b''.join(manager.export_data(format, columns=['省份', '平均价'])))
+    assert table.num_rows == 0
+    assert table.schema.names == ['省份', '平均价']
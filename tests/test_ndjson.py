@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NDJSON 流式搜索测试：逐块输出的记录与逐页翻完的搜索结果一致，块按需读取
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from core.serialization import frame_ndjson, sanitize_frame
+from tests.conftest import price_rows
+
+def parse(chunks):
+    return [json.loads(line) for chunk in chunks for line in chunk.decode('utf-8').splitlines()]
+
+def paged_records(manager, limit=None, cursor=None, columns=None, **filters):
+    records = []
+    while True:
+        page = manager.search_page(limit=15, cursor=cursor, columns=columns, **filters)
+        records.extend(json.loads(page['data'].to_json(orient='records', force_ascii=False)))
+        cursor = page['next_cursor']
+        if cursor is None or (limit is not None and len(records) >= limit):
+            return records[:limit]
+
+@pytest.fixture
+def manager(make_manager):
+    manager = make_manager('csv')
+    for seed in range(1, 5):
+        manager.save_data(price_rows(150, seed))
+    return manager
+
+def test_frame_ndjson_lines():
+    df = sanitize_frame(pd.DataFrame({'单位': ['元/公斤', None], '平均价': [1.5, float('nan')]}))
+    lines = frame_ndjson(df).decode('utf-8').split('\n')
+    assert lines[-1] == ''
+    assert [json.loads(line) for line in lines[:-1]] == [
+        {'单位': '元/公斤', '平均价': 1.5}, {'单位': '', '平均价': ''}
+    ]
+    assert frame_ndjson(df.head(0)) == b''
+
+def test_stream_matches_paged_search(manager):
+    total = len(paged_records(manager))
+    chunks = list(manager.stream_search(limit=total + 10, chunk_rows=5))
+
+    assert parse(chunks) == paged_records(manager)
+    sizes = [len(chunk.splitlines()) for chunk in chunks]
+    assert sizes[:3] == [5, 10, 20]
+
+def test_stream_respects_limit_filters_and_fields(manager):
+    records = parse(manager.stream_search(province='山东', limit=37, columns=['品种名称', '交易日期'], chunk_rows=4))
+    assert len(records) == 37
+    assert records == paged_records(manager, limit=37, columns=['品种名称', '交易日期'], province='山东')
+    assert all(set(record) == {'品种名称', '交易日期'} for record in records)
+
+def test_stream_continues_from_cursor(manager):
+    """游标与查询条件（含 limit）绑定，续取下一页的 limit 条"""
+    first = manager.search_page(limit=15)
+    second = manager.search_page(limit=15, cursor=first['next_cursor'])
+    records = parse(manager.stream_search(limit=15, cursor=first['next_cursor'], chunk_rows=4))
+    assert records == json.loads(second['data'].to_json(orient='records', force_ascii=False))
+
+def test_invalid_cursor_fails_before_streaming(manager):
+    with pytest.raises(ValueError):
+        manager.stream_search(limit=10, cursor='not-a-cursor')
+
+def test_chunks_are_read_on_demand(manager):
+    calls = []
+    keyset_page = manager._keyset_page
+
+    def counting(*args, **kwargs):
+        calls.append(args[2])
+        return keyset_page(*args, **kwargs)
+
+    manager._keyset_page = counting
+    chunks = manager.stream_search(limit=500, chunk_rows=10)
+    assert calls == []
+
+    assert len(next(chunks).splitlines()) == 10
+    assert calls == [10]
+    chunks.close()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+部分选择与排序索引测试：结果与稳定全量排序后截取一致
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.ordering import OrderIndex
+from core.storage import sort_and_limit, top_k_positions
+from tests.conftest import price_rows
+
+def make_table(count, seed):
+    """保存时间与交易日期有大量重复值和空值的价格表"""
+    rng = np.random.default_rng(seed)
+    saved = pd.Series(pd.to_datetime('2026-10-01') + pd.to_timedelta(rng.integers(0, 50, count), unit='min'))
+    dates = pd.Series(pd.to_datetime('2026-09-01') + pd.to_timedelta(rng.integers(0, 20, count), unit='D'))
+    table = pd.DataFrame({
+        '保存时间': saved.dt.strftime('%Y-%m-%d %H:%M:%S'),
+        '交易日期': dates.dt.strftime('%Y-%m-%d'),
+        '省份': rng.choice(['山东', '河北', '河南'], count),
+        '序号': np.arange(count)
+    })
+    table.loc[rng.random(count) < 0.05, '保存时间'] = None
+    return table
+
+def stable_head(df, order_by, descending, limit):
+    return df.sort_values(order_by, ascending=not descending, kind='stable', na_position='last').head(limit)
+
+@pytest.mark.parametrize('limit', [0, 1, 7, 100, 500])
+def test_top_k_positions_matches_stable_argsort(limit):
+    keys = np.random.default_rng(limit).integers(0, 10, 300).astype(np.int64)
+    expected = np.argsort(keys, kind='stable')[:limit]
+    assert top_k_positions(keys, limit).tolist() == expected.tolist()
+
+@pytest.mark.parametrize('order_by', ['保存时间', '交易日期'])
+@pytest.mark.parametrize('descending', [True, False])
+@pytest.mark.parametrize('limit', [1, 25, 2000])
+def test_sort_and_limit_matches_sort_values(order_by, descending, limit):
+    table = make_table(1000, 1)
+    result = sort_and_limit(table, order_by, descending, limit)
+    assert result['序号'].tolist() == stable_head(table, order_by, descending, limit)['序号'].tolist()
+
+@pytest.mark.parametrize('order_by', ['保存时间', '交易日期'])
+@pytest.mark.parametrize('descending', [True, False])
+def test_order_index_matches_sort_values(order_by, descending):
+    table = make_table(1000, 2)
+    index = OrderIndex()
+
+    full = index.sort_and_limit(table, table, order_by, descending, 40)
+    assert full['序号'].tolist() == stable_head(table, order_by, descending, 40)['序号'].tolist()
+
+    filtered = table[table['省份'] == '河北']
+    partial = index.sort_and_limit(table, filtered, order_by, descending, 40)
+    assert partial['序号'].tolist() == stable_head(filtered, order_by, descending, 40)['序号'].tolist()
+
+    positions = filtered.index.to_numpy()
+    ordered = index.sorted_positions(table, positions, order_by, descending)
+    assert ordered.tolist() == stable_head(filtered, order_by, descending, None).index.tolist()
+
+    stats = index.get_stats()
+    assert stats['builds'] == 1 and stats['slices'] == 1 and stats['partial_selects'] == 2
+
+def test_order_index_rebuilds_for_new_table():
+    index = OrderIndex()
+    first = make_table(300, 3)
+    index.sort_and_limit(first, first, '保存时间', True, 10)
+
+    second = make_table(400, 4)
+    result = index.sort_and_limit(second, second, '保存时间', True, 10)
+    assert result['序号'].tolist() == stable_head(second, '保存时间', True, 10)['序号'].tolist()
+    assert index.get_stats()['builds'] == 2
+
+def test_order_index_falls_back_without_range_index():
+    table = make_table(200, 5).iloc[::-1]
+    index = OrderIndex()
+    result = index.sort_and_limit(table, table, '交易日期', True, 15)
+    assert result['序号'].tolist() == stable_head(table, '交易日期', True, 15)['序号'].tolist()
+    assert index.get_stats()['fallbacks'] == 1
+
+def test_latest_data_matches_stable_sort(make_manager):
+    manager = make_manager('csv')
+    for seed in range(1, 4):
+        manager.save_data(price_rows(100, seed))
+
+    table = manager.get_snapshot().table
+    expected = stable_head(table, '保存时间', True, 30)
+    latest = manager.get_latest_frame(30)
+    assert list(zip(latest['市场名称'], latest['品种名称'], latest['交易日期'])) == \
+        list(zip(expected['市场名称'], expected['品种名称'], expected['交易日期'].astype(str)))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游标分页测试
+"""
+
+import pytest
+
+from core.pagination import decode_cursor, encode_cursor, query_digest
+from tests.conftest import price_rows
+
+def page_keys(page):
+    df = page['data']
+    return list(zip(df['交易日期'], df['市场名称'], df['品种名称']))
+
+def test_cursor_rejects_other_query_and_garbage():
+    cursor = encode_cursor('search', ('山东',), '2026-10-05', 'a')
+
+    assert decode_cursor(cursor, 'search', ('山东',))['k'] == '2026-10-05'
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'search', ('河北',))
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'reports', ('山东',))
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor', 'search', ('山东',))
+
+def test_cursor_is_not_bound_to_version(make_manager):
+    """两页之间有写入时游标仍然有效：已翻过的行不重复，更新的行不插入后续页"""
+    manager = make_manager('csv')
+    manager.save_data(price_rows(300, 1))
+
+    first = manager.search_page(limit=20)
+    assert first['next_cursor'] is not None
+
+    manager.save_data(price_rows(50, 2, month='2026-11'))
+    assert manager.get_snapshot().version != first['version']
+
+    seen = page_keys(first)
+    cursor = first['next_cursor']
+    while cursor:
+        page = manager.search_page(limit=20, cursor=cursor)
+        seen.extend(page_keys(page))
+        cursor = page['next_cursor']
+
+    assert len(seen) == len(set(seen))
+    assert not any(date.startswith('2026-11') for date, _, _ in seen)
+    assert seen == sorted(seen, key=lambda key: (key[0], key[1] + '\x1f' + key[2]), reverse=True)
+
+def test_cursor_from_older_format_is_accepted():
+    """带版本字段的旧游标仍可解析"""
+    import base64
+    import json
+
+    payload = {'t': 'search', 'q': query_digest(('x',)), 'v': 3, 'k': '2026-10-01', 'id': 'a'}
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+    assert decode_cursor(cursor, 'search', ('x',))['id'] == 'a'
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字段投影测试：只返回请求的列，且只从存储读取这些列与排序所需的列
+"""
+
+import pandas as pd
+import pytest
+
+from core.export import parse_columns
+from tests.conftest import price_rows
+
+FIELDS = ['品种名称', '平均价']
+
+def spy_scan(manager):
+    """记录存储扫描读取的列"""
+    calls = []
+    scan = manager.storage.scan
+
+    def recording_scan(*args, **kwargs):
+        calls.append(kwargs.get('columns'))
+        return scan(*args, **kwargs)
+
+    manager.storage.scan = recording_scan
+    return calls
+
+def all_pages(manager, columns=None, **filters):
+    frames = []
+    cursor = None
+    while True:
+        page = manager.search_page(limit=15, cursor=cursor, columns=columns, **filters)
+        frames.append(page['data'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pd.concat(frames, ignore_index=True)
+
+def test_parse_columns():
+    assert parse_columns(None) is None
+    assert parse_columns(' 平均价, 省份 ,平均价,') == ['平均价', '省份']
+    with pytest.raises(ValueError, match='未知的字段'):
+        parse_columns('平均价,价格', '字段')
+
+@pytest.mark.parametrize('engine,resident', [('csv', True), ('sqlite', False)])
+def test_search_projection_matches_full_pages(make_manager, engine, resident):
+    manager = make_manager(engine, resident=resident)
+    for seed in range(1, 4):
+        manager.save_data(price_rows(100, seed))
+
+    full = all_pages(manager, province='山东')
+    projected = all_pages(manager, columns=FIELDS, province='山东')
+    assert list(projected.columns) == FIELDS
+    pd.testing.assert_frame_equal(projected, full[FIELDS])
+
+def test_search_reads_only_needed_columns(make_manager):
+    manager = make_manager('sqlite', resident=False)
+    manager.save_data(price_rows(100, 1))
+    calls = spy_scan(manager)
+
+    page = manager.search_page(variety='白菜', limit=10, columns=FIELDS)
+    assert list(page['data'].columns) == FIELDS
+    assert calls and all(set(columns) == {'品种名称', '平均价', '交易日期', '市场名称'} for columns in calls)
+
+def test_latest_projection(make_manager):
+    manager = make_manager('sqlite', resident=False)
+    manager.save_data(price_rows(100, 1))
+    full = manager.get_latest_frame(20)
+
+    calls = spy_scan(manager)
+    projected = manager.get_latest_frame(20, columns=FIELDS)
+    assert list(projected.columns) == FIELDS
+    pd.testing.assert_frame_equal(projected.reset_index(drop=True), full[FIELDS].reset_index(drop=True))
+    assert set(calls[0]) == {'品种名称', '平均价'}
+
+def test_projected_and_full_results_are_cached_separately(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(100, 1))
+
+    full = manager.search_page(limit=10)
+    projected = manager.search_page(limit=10, columns=FIELDS)
+    assert list(projected['data'].columns) == FIELDS
+    assert len(full['data'].columns) > len(FIELDS)
+    assert manager.search_page(limit=10, columns=FIELDS) is projected
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻价格表测试：重复读取不重新加载，存储被外部修改时按存储版本失效
+"""
+
+from tests.conftest import price_rows
+
+def test_reads_reuse_resident_table(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(100, 1))
+    reloads = manager.cache_stats['reloads']
+
+    first = manager.get_dataframe()
+    for _ in range(5):
+        assert manager.get_dataframe() is first
+
+    assert manager.cache_stats['reloads'] == reloads
+
+def test_external_write_invalidates_resident_table(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(100, 1))
+    before = len(manager.get_dataframe())
+
+    # 另一个实例写入同一数据目录
+    other = make_manager('csv')
+    other.save_data(price_rows(30, 2, month='2026-12'))
+
+    # 发现存储版本变化后由写线程重新加载，本次读取仍返回旧快照
+    assert len(manager.get_dataframe()) == before
+    manager._writer.call(lambda: None)
+
+    table = manager.get_dataframe()
+    assert len(table) > before
+    assert table['交易日期'].astype(str).str.startswith('2026-12').any()
+    assert manager.get_snapshot().signature == manager.storage.signature()
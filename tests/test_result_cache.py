@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询结果缓存测试：按内存上限淘汰最久未使用的条目，过期与数据版本变化时失效
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.result_cache import ResultCache
+from tests.conftest import price_rows
+
+def frame(rows=1000):
+    return pd.DataFrame({'value': np.arange(rows, dtype=np.float64)})
+
+def test_evicts_least_recently_used_over_memory_limit():
+    size = ResultCache._size(frame())
+    cache = ResultCache(max_bytes=size * 2, ttl_seconds=60)
+
+    cache.put('a', 1, frame())
+    cache.put('b', 1, frame())
+    assert cache.get('a', 1) is not None  # a 变为最近使用
+    cache.put('c', 1, frame())
+
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is not None and cache.get('c', 1) is not None
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 2 and stats['memory_bytes'] == size * 2
+
+def test_replacing_entry_keeps_memory_accounting():
+    cache = ResultCache(max_bytes=10 ** 7)
+    cache.put('a', 1, frame(100))
+    cache.put('a', 2, frame(1000))
+    assert cache.get_stats()['memory_bytes'] == ResultCache._size(frame(1000))
+    assert cache.get('a', 2) is not None
+
+def test_oversized_result_is_not_stored():
+    cache = ResultCache(max_bytes=ResultCache._size(frame(10)))
+    cache.put('a', 1, frame())
+    assert cache.get('a', 1) is None
+    assert cache.get_stats()['oversized'] == 1
+
+def test_entries_expire_after_ttl():
+    cache = ResultCache(max_bytes=10 ** 7, ttl_seconds=0.05)
+    cache.put('a', 1, {'data': frame(10)})
+    assert cache.get('a', 1) is not None
+
+    time.sleep(0.1)
+    assert cache.get('a', 1) is None
+    stats = cache.get_stats()
+    assert stats['expirations'] == 1 and stats['entries'] == 0 and stats['memory_bytes'] == 0
+
+def test_version_change_invalidates():
+    cache = ResultCache(max_bytes=10 ** 7)
+    cache.put('a', 1, frame(10))
+    cache.put('b', 1, frame(10))
+    cache.put('c', 2, frame(10))
+
+    assert cache.get('a', 2) is None
+    assert cache.get_stats()['invalidations'] == 1
+
+    cache.invalidate(2)
+    assert cache.get_stats()['entries'] == 1
+    assert cache.get('c', 2) is not None
+
+    cache.invalidate()
+    assert cache.get_stats()['entries'] == 0
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_bytes=0)
+    cache.put('a', 1, frame(10))
+    assert cache.get('a', 1) is None
+    assert not cache.get_stats()['enabled']
+
+def test_search_results_cached_per_data_version(make_manager):
+    manager = make_manager('csv')
+    rows = price_rows(200, 1)
+    manager.save_data(rows)
+
+    first = manager.search_page(province='山东', limit=20)
+    assert manager.search_page(province='山东', limit=20) is first
+    assert manager.search_page(province='山东', limit=10) is not first
+    assert manager.get_search_cache_stats()['hits'] == 1
+
+    target = next(row for row in rows if row['province'] == '山东')
+    manager.save_data([dict(target, trade_date='2026-12-31')])
+    page = manager.search_page(province='山东', limit=20)
+    assert page is not first
+    assert page['version'] == first['version'] + 1
+    assert page['data']['交易日期'].iloc[0] == '2026-12-31'
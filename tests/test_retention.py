@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分层保留测试：降采样只合并同一天的多条记录，晚到的记录在下次执行时补做
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.retention import day_windows, downsample_daily, next_day
+from core.storage import decode_categories
+
+def intraday_rows(day: str, hours, price: float = 2.0):
+    return [{
+        'province': '山东', 'market_name': '市场1', 'variety_name': '白菜',
+        'min_price': price, 'avg_price': price + hour / 100, 'max_price': price + 1,
+        'trade_date': f"{day} {hour:02d}:00:00", 'unit': '元/公斤'
+    } for hour in hours]
+
+def rows_on(manager, day: str):
+    table = decode_categories(manager.get_dataframe())
+    return table[table['交易日期'].astype(str).str.startswith(day)]
+
+def test_daily_rows_are_left_as_is():
+    import pandas as pd
+
+    df = pd.DataFrame({'市场名称': ['a', 'a'], '品种名称': ['x', 'x'], '交易日期': ['2026-01-01', '2026-01-02'],
+                       '平均价': [1.0, 2.0]})
+    assert downsample_daily(df) is df
+
+def test_day_windows_merge_consecutive_days():
+    assert day_windows(['2026-01-03', '2026-01-01', '2026-01-02', '2026-01-05']) == [
+        ['2026-01-01', '2026-01-04'], ['2026-01-05', '2026-01-06']
+    ]
+
+def test_late_rows_are_downsampled(make_manager):
+    manager = make_manager('csv')
+    old = (datetime.now() - timedelta(days=manager.retention.cleanup_days + 10)).strftime('%Y-%m-%d')
+    manager.save_data(intraday_rows(old, [8, 12, 16]))
+
+    result = manager.apply_retention()
+    assert result['downsampled']['removed'] == 3
+    assert len(rows_on(manager, old)) == 1
+    assert manager.retention.state['downsampled_through'] > old
+
+    # 降采样之后才到达的同一天报价
+    manager.save_data(intraday_rows(old, [18, 20], price=3.0))
+    assert len(rows_on(manager, old)) == 3
+    assert manager.retention.late_windows()
+
+    result = manager.apply_retention()
+    day = rows_on(manager, old)
+    assert result['late']['removed'] == 3
+    assert len(day) == 1
+    assert day['最低价'].tolist() == [2.0]
+    assert day['最高价'].tolist() == [4.0]
+    assert not manager.retention.late_windows()
+
+def old_day(manager):
+    return (datetime.now() - timedelta(days=manager.retention.cleanup_days + 10)).strftime('%Y-%m-%d')
+
+def test_redownsampled_day_weights_average_by_samples(make_manager):
+    """已聚合的记录按其样本数参与平均，而不是当作一条报价"""
+    manager = make_manager('csv')
+    old = old_day(manager)
+    manager.save_data(intraday_rows(old, [8, 12, 16]))
+    manager.apply_retention()
+
+    day = rows_on(manager, old)
+    assert day['平均价'].tolist() == [pytest.approx((2.08 + 2.12 + 2.16) / 3)]
+    assert day['样本数'].tolist() == [3]
+
+    manager.save_data(intraday_rows(old, [18, 20], price=3.0))
+    manager.apply_retention()
+
+    day = rows_on(manager, old)
+    assert day['平均价'].tolist() == [pytest.approx((2.08 + 2.12 + 2.16 + 3.18 + 3.20) / 5)]
+    assert day['样本数'].tolist() == [5]
+
+def test_overlapping_compaction_and_rewrite(make_manager):
+    """按日期重写先于压缩结束时，压缩仍在进行，不能提前恢复版本检查"""
+    manager = make_manager('csv')
+    old = old_day(manager)
+    manager.save_data(intraday_rows(old, [8, 12]))
+    manager.save_data(intraday_rows(old, [16], price=3.0))
+
+    entered = threading.Event()
+    release = threading.Event()
+    compact = manager.storage.compact
+
+    def blocking_compact(*args, **kwargs):
+        entered.set()
+        release.wait(10)
+        return compact(*args, **kwargs)
+
+    manager.storage.compact = blocking_compact
+    thread = threading.Thread(target=manager.compact)
+    thread.start()
+    assert entered.wait(10)
+
+    manager._rewrite_dates(old, next_day(old), downsample_daily)
+    assert manager._compacting
+
+    release.set()
+    thread.join(10)
+    assert not manager._compacting
+
+    table = decode_categories(manager.get_dataframe())
+    assert len(table) == 1 and table['样本数'].tolist() == [3]
+    assert len(decode_categories(manager.storage.load())) == 1
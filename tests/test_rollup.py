@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日汇总测试：增量维护与按价格表全量汇总一致，覆盖更新的交易日整日重算，变化日志重放得到相同的汇总
+"""
+
+import pandas as pd
+import pytest
+
+from core.rollup import ROLLUP_KEYS, aggregate_daily
+from tests.conftest import price_rows
+
+def normalized(groups):
+    return groups.sort_values(ROLLUP_KEYS).reset_index(drop=True)[ROLLUP_KEYS + ['count', 'sum', 'min', 'max']]
+
+def assert_matches_table(manager):
+    expected = normalized(aggregate_daily(manager.storage.load()))
+    pd.testing.assert_frame_equal(normalized(manager.rollup.query()), expected, check_dtype=False, atol=1e-9)
+
+@pytest.mark.parametrize('engine,resident', [('csv', True), ('sqlite', False)])
+def test_incremental_rollup_matches_table(make_manager, engine, resident):
+    manager = make_manager(engine, resident=resident)
+    manager.save_data(price_rows(200, 1))
+    manager.get_price_trends()
+    for seed in range(2, 8):
+        manager.save_data(price_rows(120, seed))
+
+    assert manager.rollup.get_stats()['rebuilds'] == 1
+    assert manager.rollup.get_stats()['recomputed_days'] > 0
+    assert_matches_table(manager)
+
+def test_updated_row_recomputes_its_day(make_manager):
+    """覆盖更新把最高平均价调低后，该交易日的 max 按写入后的数据重算"""
+    manager = make_manager('csv')
+    rows = [
+        {'province': '山东', 'market_name': f'市场{i}', 'variety_name': '白菜', '品种类型': '蔬菜',
+         'avg_price': price, 'trade_date': '2026-10-01'}
+        for i, price in enumerate([1.0, 2.0, 9.0])
+    ]
+    manager.save_data(rows)
+    manager.get_price_trends()
+
+    manager.save_data([dict(rows[2], avg_price=3.0), dict(rows[0], trade_date='2026-10-02')])
+    trends = {day['交易日期']: day for day in manager.get_price_trends()}
+    assert trends['2026-10-01']['最高平均价'] == 3.0
+    assert trends['2026-10-01']['平均价'] == pytest.approx(2.0)
+    assert trends['2026-10-02']['记录数'] == 1
+    assert_matches_table(manager)
+
+def test_trends_skip_missing_prices(make_manager):
+    manager = make_manager('csv')
+    manager.save_data([
+        {'province': '山东', 'market_name': '市场1', 'variety_name': '白菜', 'avg_price': 4.0, 'trade_date': '2026-10-01'},
+        {'province': '山东', 'market_name': '市场2', 'variety_name': '白菜', 'avg_price': None, 'trade_date': '2026-10-01'}
+    ])
+    assert manager.get_price_trends() == [
+        {'交易日期': '2026-10-01', '平均价': 4.0, '最低平均价': 4.0, '最高平均价': 4.0, '记录数': 1}
+    ]
+
+def test_journal_replay_restores_rollup(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(200, 1))
+    manager.get_price_trends()
+    for seed in range(2, 5):
+        manager.save_data(price_rows(80, seed))
+    assert manager.rollup.journal.size > 0
+    expected = normalized(manager.rollup.query())
+
+    reloaded = make_manager('csv')
+    reloaded.get_price_trends()
+    assert reloaded.rollup.get_stats()['rebuilds'] == 0
+    pd.testing.assert_frame_equal(normalized(reloaded.rollup.query()), expected)
+
+def test_compaction_keeps_rollup(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(150, 1))
+    manager.get_price_trends()
+    manager.save_data(price_rows(100, 2))
+
+    assert manager.compact()['compacted_segments'] > 0
+    manager.get_price_trends()
+    assert manager.rollup.get_stats()['rebuilds'] == 1
+    assert manager.rollup.signature == manager.storage.signature()
+    assert_matches_table(manager)
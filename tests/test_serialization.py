@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果序列化测试
+"""
+
+import json
+
+import pandas as pd
+
+from core.serialization import dumps, frame_json, frame_ndjson, sanitize_frame
+
+def test_unit_column_keeps_slashes():
+    df = sanitize_frame(pd.DataFrame({'单位': ['元/公斤', '元/斤'], '平均价': [2.5, float('nan')]}))
+
+    body = frame_json(df)
+
+    assert '"单位":"元/公斤"'.encode('utf-8') in body
+    assert b'\\/' not in body
+    assert json.loads(body) == [{'单位': '元/公斤', '平均价': 2.5}, {'单位': '元/斤', '平均价': ''}]
+
+def test_ndjson_keeps_slashes_and_backslashes():
+    df = pd.DataFrame({'单位': ['元/公斤', 'a\\/b', 'c\\']})
+
+    body = frame_ndjson(df)
+
+    assert b'\\/' not in body.replace(b'\\\\', b'')
+    assert [json.loads(line)['单位'] for line in body.decode('utf-8').splitlines()] == ['元/公斤', 'a\\/b', 'c\\']
+
+def test_dumps_frame_inside_dict():
+    body = dumps({'success': True, 'data': pd.DataFrame({'单位': ['元/公斤']})})
+
+    assert json.loads(body) == {'success': True, 'data': [{'单位': '元/公斤'}]}
+    assert '元/公斤'.encode('utf-8') in body
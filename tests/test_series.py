@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+价格序列测试：增量合并的序列与按价格表计算的一致，日期窗口与重采样结果正确
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.series import SERIES_VALUES
+from core.storage import decode_categories
+from tests.conftest import price_rows
+
+VARIETY_IDS = {'白菜': 'V1', '土豆': 'V2', '苹果': 'V3', '西红柿': 'V4'}
+
+def series_rows(count, seed, days=28):
+    """带市场ID、品种ID与交易量的价格记录"""
+    rows = price_rows(count, seed, days=days)
+    for i, row in enumerate(rows):
+        row['市场ID'] = row['market_name'].replace('市场', 'M')
+        row['品种ID'] = VARIETY_IDS[row['variety_name']]
+        row['交易量'] = float((seed * 7 + i) % 5) or None
+    return rows
+
+def expected_series(manager, key):
+    """按价格表计算的一条序列"""
+    table = decode_categories(manager.storage.load())
+    rows = table[(table['市场ID'] == key[0]) & (table['品种ID'] == key[1])]
+    rows = rows.assign(交易日期=rows['交易日期'].astype(str).str[:10]).sort_values('交易日期')
+    return rows.set_index('交易日期')[SERIES_VALUES]
+
+def as_frame(result):
+    return pd.DataFrame({col: result[col] for col in SERIES_VALUES}, index=pd.Index(result['交易日期'], name='交易日期'),
+                        dtype=float)
+
+def all_keys(manager):
+    table = decode_categories(manager.storage.load())
+    return sorted(set(zip(table['市场ID'], table['品种ID'])))
+
+@pytest.mark.parametrize('engine,resident', [('csv', True), ('sqlite', False)])
+def test_incremental_series_match_table(make_manager, engine, resident):
+    manager = make_manager(engine, resident=resident)
+    manager.save_data(series_rows(200, 1))
+    manager.get_series(market_id='M1')
+    for seed in range(2, 6):
+        manager.save_data(series_rows(120, seed))
+
+    keys = all_keys(manager)
+    result = manager.get_series(keys=keys, limit=len(keys))
+    assert manager.series.get_stats()['rebuilds'] == 1
+    assert result['missing'] == [] and len(result['series']) == len(keys)
+
+    for key, series in zip(keys, result['series']):
+        assert (series['市场ID'], series['品种ID']) == key
+        pd.testing.assert_frame_equal(as_frame(series), expected_series(manager, key), check_dtype=False)
+
+def test_window_and_missing_keys(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(series_rows(300, 1))
+
+    key = all_keys(manager)[0]
+    result = manager.get_series(keys=[key, ('M9', 'V9')], start='2026-10-05', end='2026-10-12')
+    assert result['missing'] == ['M9:V9']
+
+    expected = expected_series(manager, key)
+    expected = expected[(expected.index >= '2026-10-05') & (expected.index <= '2026-10-12')]
+    pd.testing.assert_frame_equal(as_frame(result['series'][0]), expected, check_dtype=False)
+
+def test_find_by_market_or_variety(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(series_rows(300, 1))
+    keys = all_keys(manager)
+
+    market = manager.get_series(market_id='M2', limit=100)['series']
+    assert [(s['市场ID'], s['品种ID']) for s in market] == [key for key in keys if key[0] == 'M2']
+    variety = manager.get_series(variety_id='V3', limit=100)['series']
+    assert [(s['市场ID'], s['品种ID']) for s in variety] == [key for key in keys if key[1] == 'V3']
+
+@pytest.mark.parametrize('rule,freq', [('week', 'W-SUN'), ('month', 'MS')])
+def test_resample_matches_pandas(make_manager, rule, freq):
+    manager = make_manager('csv')
+    manager.save_data(series_rows(400, 1, days=31))
+    key = all_keys(manager)[0]
+
+    result = manager.get_series(keys=[key], resample=rule)['series'][0]
+    daily = expected_series(manager, key)
+    daily.index = pd.to_datetime(daily.index)
+    grouped = daily.resample(freq, label='left' if rule == 'month' else 'right', closed='right' if rule == 'week' else 'left')
+    expected = pd.DataFrame({
+        '最低价': grouped['最低价'].min(),
+        '平均价': grouped['平均价'].mean(),
+        '最高价': grouped['最高价'].max(),
+        '交易量': grouped['交易量'].sum(min_count=1)
+    })
+    counts = grouped.size()
+    expected = expected[counts > 0]
+    if rule == 'week':
+        expected.index = expected.index - pd.Timedelta(days=6)
+
+    assert result['交易日期'] == expected.index.strftime('%Y-%m-%d').tolist()
+    np.testing.assert_allclose(as_frame(result).to_numpy(dtype=float), expected.to_numpy(dtype=float), equal_nan=True)
+
+def test_unknown_resample_rule_is_rejected(make_manager):
+    manager = make_manager('csv')
+    with pytest.raises(ValueError):
+        manager.get_series(market_id='M1', resample='hour')
+
+def test_compaction_keeps_series(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(series_rows(150, 1))
+    manager.get_series(market_id='M1')
+    manager.save_data(series_rows(100, 2))
+
+    assert manager.compact()['compacted_segments'] > 0
+    manager.get_series(market_id='M1')
+    assert manager.series.get_stats()['rebuilds'] == 1
+    assert manager.series.signature == manager.storage.signature()
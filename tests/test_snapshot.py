@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照隔离测试：并发写入时读取方持有的快照不变
+"""
+
+import threading
+
+from core.storage import decode_categories
+from tests.conftest import price_rows
+
+def test_snapshot_isolated_from_concurrent_writes(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(200, 1))
+
+    held = manager.get_snapshot()
+    held_copy = decode_categories(held.table).copy()
+
+    errors = []
+    done = threading.Event()
+
+    def writer():
+        try:
+            for seed in range(2, 12):
+                manager.save_data(price_rows(80, seed, month='2026-11' if seed % 2 else '2026-10'))
+        except Exception as e:  # 写入失败时让测试失败
+            errors.append(e)
+        finally:
+            done.set()
+
+    def reader():
+        # 每个快照自身在持有期间不变，版本单调递增
+        last_version = 0
+        while not done.is_set():
+            snapshot = manager.get_snapshot()
+            before = decode_categories(snapshot.table).copy()
+            if snapshot.version < last_version:
+                errors.append(AssertionError('快照版本回退'))
+            last_version = snapshot.version
+            if not decode_categories(snapshot.table).equals(before):
+                errors.append(AssertionError(f"快照 {snapshot.version} 被修改"))
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert decode_categories(held.table).equals(held_copy)
+
+    latest = manager.get_snapshot()
+    assert latest.version > held.version
+    assert len(latest.table) > len(held.table)
+    assert (latest.table['交易日期'].astype(str).str.startswith('2026-11')).any()
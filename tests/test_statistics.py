@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统计计数器测试：增量维护的统计与按价格表计算的结果一致
+"""
+
+import pytest
+
+from core.storage import decode_categories
+from tests.conftest import price_rows
+
+def expected_statistics(manager):
+    """按价格表全量计算的统计"""
+    table = decode_categories(manager.storage.load())
+    dates = table['交易日期'].astype(str).str[:10]
+    provinces = table[table['省份'].notna()].assign(date=dates)
+    return {
+        'total_records': len(table),
+        'total_markets': table['市场名称'].nunique(),
+        'total_varieties': table['品种名称'].nunique(),
+        'total_provinces': table['省份'].nunique(),
+        'last_update': table['保存时间'].astype(str).max(),
+        'province_records': provinces.groupby('省份').size().to_dict(),
+        'province_latest_dates': provinces.groupby('省份')['date'].max().to_dict()
+    }
+
+def counters(stats):
+    return {key: stats[key] for key in (
+        'total_records', 'total_markets', 'total_varieties', 'total_provinces',
+        'last_update', 'province_records', 'province_latest_dates'
+    )}
+
+@pytest.mark.parametrize('engine,resident', [('csv', True), ('sqlite', False)])
+def test_statistics_match_table(make_manager, engine, resident):
+    manager = make_manager(engine, resident=resident)
+    manager.save_data(price_rows(150, 1))
+    manager.get_statistics()
+    for seed in range(2, 6):
+        manager.save_data(price_rows(100, seed))
+
+    stats = manager.get_statistics()
+    assert counters(stats) == expected_statistics(manager)
+
+def test_ingested_today_counts_written_rows(make_manager):
+    """覆盖写入的行计入当日写入行数，未变化的行不写入也不计入"""
+    manager = make_manager('csv')
+    rows = [
+        {'province': '山东', 'market_name': f'市场{i}', 'variety_name': '白菜', 'avg_price': 1.0, 'trade_date': '2026-10-01'}
+        for i in range(3)
+    ]
+    manager.save_data(rows)
+    manager.get_statistics()
+    manager.save_data([dict(rows[0], avg_price=2.0), rows[1]])
+
+    stats = manager.get_statistics()
+    assert stats['ingested_today'] == 4
+    assert stats['total_records'] == 3
+
+def test_statistics_survive_restart(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(150, 1))
+    manager.get_statistics()
+    manager.save_data(price_rows(100, 2))
+    stats = manager.get_statistics()
+
+    reloaded = make_manager('csv')
+    restored = reloaded.get_statistics()
+    assert counters(restored) == counters(stats)
+    assert restored['ingested_today'] == stats['ingested_today']
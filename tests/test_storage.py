@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+存储测试：追加增量段、压缩与冷启动重新加载
+"""
+
+import pandas as pd
+import pytest
+
+from core.storage import KEY_COLUMNS, create_storage, decode_categories
+from tests.conftest import price_rows
+
+COMPARED_COLUMNS = KEY_COLUMNS + ['省份', '品种类型', '最低价', '平均价', '最高价', '单位']
+
+def normalized(df: pd.DataFrame) -> pd.DataFrame:
+    """按关键字段排序、只保留比较列的价格表，空值统一为None"""
+    df = decode_categories(df).reindex(columns=COMPARED_COLUMNS)
+    df = df.sort_values(KEY_COLUMNS, kind='stable').reset_index(drop=True)
+    return df.astype(object).where(df.notna(), None)
+
+def ingest(manager, batches: int = 4):
+    manager.save_data(price_rows(200, 1))
+    for seed in range(2, batches + 1):
+        manager.save_data(price_rows(120, seed))
+
+def check_append_compact_reload(make_manager, engine: str):
+    """追加多个批次、压缩后冷启动重新加载，得到与写入时相同的价格表"""
+    manager = make_manager(engine)
+    ingest(manager)
+    before = normalized(manager.get_dataframe())
+
+    manager.compact()
+    assert normalized(manager.get_dataframe()).equals(before)
+
+    reloaded = make_manager(engine)
+    assert normalized(reloaded.get_dataframe()).equals(before)
+    assert normalized(reloaded.storage.load()).equals(before)
+
+def test_append_compact_reload(make_manager):
+    check_append_compact_reload(make_manager, 'csv')
+
+def test_batches_append_segments_until_compaction(make_manager):
+    manager = make_manager('csv')
+    ingest(manager)
+    assert manager.storage.storage_stats()['pending_segments'] == 4
+
+    result = manager.compact()
+    assert result['compacted_segments'] == 4
+    assert manager.storage.storage_stats()['pending_segments'] == 0
+
+SCAN_PREDICATES = [('省份', '==', '山东'), ('交易日期', '>=', '2026-10-05')]
+
+def check_engine_matches_csv(make_manager, engine: str):
+    """引擎（常驻内存与存储扫描两种方式）对相同写入给出与CSV引擎相同的数据与查询结果"""
+    expected = make_manager('csv', name='csv')
+    ingest(expected)
+    table = normalized(expected.get_dataframe())
+    search = normalized(expected.search_page(province='山东', date_from='2026-10-03', limit=25)['data'])
+    metrics = expected.get_price_metrics()
+    trends = expected.get_price_trends(5)
+
+    for resident in (True, False):
+        manager = make_manager(engine, resident=resident, name=f"{engine}_{resident}")
+        ingest(manager)
+        key = (engine, resident)
+
+        assert normalized(manager.get_dataframe()).equals(table), key
+        page = manager.search_page(province='山东', date_from='2026-10-03', limit=25)
+        assert normalized(page['data']).equals(search), key
+        assert manager.get_price_metrics() == pytest.approx(metrics), key
+        assert len(manager.get_price_trends(5)) == len(trends), key
+        for row, expected_row in zip(manager.get_price_trends(5), trends):
+            assert row == pytest.approx(expected_row), key
+
+def check_scan_pushdown(make_manager, engine: str):
+    """条件、投影、排序与截取下推到存储后与在完整表上计算的结果相同"""
+    manager = make_manager(engine, resident=False)
+    ingest(manager)
+    full = decode_categories(manager.storage.load())
+    expected = full[(full['省份'] == '山东') & (full['交易日期'] >= '2026-10-05')]
+
+    scanned = manager.storage.scan(predicates=SCAN_PREDICATES, columns=['平均价'])
+    assert '平均价' in scanned.columns
+    assert set(scanned.columns) <= {'平均价', '省份'} | set(KEY_COLUMNS)
+    assert len(scanned) == len(expected)
+    assert normalized(manager.storage.scan(predicates=SCAN_PREDICATES)).equals(normalized(expected))
+
+    top = manager.storage.scan(predicates=SCAN_PREDICATES, order_by='交易日期', limit=10)
+    dates = decode_categories(top)['交易日期'].astype(str).tolist()
+    assert dates == sorted(expected['交易日期'].astype(str), reverse=True)[:10]
+
+def test_parquet_engine(make_manager):
+    check_append_compact_reload(make_manager, 'parquet')
+    check_engine_matches_csv(make_manager, 'parquet')
+    check_scan_pushdown(make_manager, 'parquet')
+
+def test_csv_scan_pushdown(make_manager):
+    check_scan_pushdown(make_manager, 'csv')
+
+def test_sqlite_engine(make_manager):
+    check_append_compact_reload(make_manager, 'sqlite')
+    check_engine_matches_csv(make_manager, 'sqlite')
+    check_scan_pushdown(make_manager, 'sqlite')
+
+def test_sqlite_search_uses_composite_index(make_manager):
+    """按品种与日期范围查询时由组合索引做范围扫描"""
+    manager = make_manager('sqlite', resident=False)
+    ingest(manager)
+    storage = manager.storage
+
+    indexes = {row[1] for row in storage._connect().execute(f"PRAGMA index_list({storage.TABLE})")}
+    assert set(storage.INDEXES) <= indexes
+
+    where, params = storage._where([('品种名称', '==', '白菜'), ('交易日期', '>=', '2026-10-05')])
+    plan = ' '.join(str(row[-1]) for row in storage._connect().execute(
+        f"EXPLAIN QUERY PLAN SELECT * FROM {storage.TABLE}{where}", params
+    ))
+    assert 'idx_prices_variety_date' in plan
+
+def test_sqlite_adds_columns_missing_from_old_table(tmp_path):
+    """旧版本创建的数据表打开时补齐新增的列"""
+    import sqlite3
+
+    conn = sqlite3.connect(str(tmp_path / 'market_prices.db'))
+    conn.execute('CREATE TABLE market_prices ("市场名称" TEXT, "品种名称" TEXT, "交易日期" TEXT, "平均价" REAL, '
+                 'UNIQUE ("市场名称", "品种名称", "交易日期"))')
+    conn.execute("INSERT INTO market_prices VALUES ('市场1', '白菜', '2026-10-01', 1.5)")
+    conn.commit()
+    conn.close()
+
+    storage = create_storage('sqlite', tmp_path)
+    storage.initialize()
+    columns = {row[1] for row in storage._connect().execute(f"PRAGMA table_info({storage.TABLE})")}
+    assert set(storage.COLUMNS) <= columns
+    assert storage.load()['平均价'].tolist() == [1.5]
+
+def test_partitioned_engine(make_manager):
+    check_append_compact_reload(make_manager, 'partitioned')
+    check_engine_matches_csv(make_manager, 'partitioned')
+    check_scan_pushdown(make_manager, 'partitioned')
+
+def test_partitioned_scan_prunes_partitions(make_manager):
+    manager = make_manager('partitioned', resident=False, storage_options={'granularity': 'day'})
+    ingest(manager)
+    storage = manager.storage
+    before = dict(storage.prune_stats)
+
+    df = storage.scan(predicates=[('交易日期', '>=', '2026-10-05'), ('交易日期', '<=', '2026-10-06')])
+
+    assert set(decode_categories(df)['交易日期'].astype(str)) == {'2026-10-05', '2026-10-06'}
+    assert storage.prune_stats['partitions_scanned'] - before['partitions_scanned'] == 2
+    assert storage.prune_stats['partitions_pruned'] - before['partitions_pruned'] == 10
+
+@pytest.mark.parametrize('file_format', ['sqlite', 'partitioned', 'json'])
+def test_partitioned_rejects_unsupported_file_format(tmp_path, file_format):
+    with pytest.raises(ValueError):
+        create_storage('partitioned', tmp_path, file_format=file_format)
+
+def test_partitioned_parquet_files(make_manager):
+    manager = make_manager('partitioned', storage_options={'file_format': 'parquet'})
+    ingest(manager)
+    assert list(manager.storage.partition_dir.glob('*.parquet'))
+    check_append_compact_reload(make_manager, 'partitioned')
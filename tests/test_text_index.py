@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+子串索引测试：索引过滤结果与 str.contains 相同
+"""
+
+import random
+
+import pandas as pd
+
+from core.storage import apply_predicates, encode_categories
+from core.text_index import NgramIndex, SubstringIndex
+
+NAMES = ['北京新发地', '北京八里桥', '上海江桥', '山东寿光', '寿光农产品物流园', '大白菜', '白菜', '小白菜',
+         '土豆', '马铃薯', '西红柿', '苹果', '红富士苹果', '江苏', '山东', '山西', '广西', '新疆']
+
+QUERIES = ['', '北', '北京', '白菜', '大白', '寿光', '苹果', '山', '西', '红', '京桥', '不存在', '农产品物流', 'a.b']
+
+def random_table(seed: int, rows: int = 500) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        '省份': [rng.choice(NAMES) for _ in range(rows)],
+        '市场名称': [rng.choice(NAMES) + str(rng.randint(1, 3)) for _ in range(rows)],
+        '品种名称': [rng.choice(NAMES) if rng.random() > 0.05 else None for _ in range(rows)],
+        '平均价': [rng.random() for _ in range(rows)]
+    })
+
+def test_lookup_matches_substring_scan():
+    index = NgramIndex()
+    index.add(NAMES + [None, 3])
+
+    for query in QUERIES:
+        assert index.lookup(query) == {name for name in NAMES if query in name}, query
+
+def test_filter_matches_str_contains():
+    table = encode_categories(random_table(1))
+    index = SubstringIndex()
+    index.rebuild(table)
+
+    for column in ['省份', '市场名称', '品种名称']:
+        for query in QUERIES:
+            predicates = [(column, 'contains', query)]
+            filtered, remaining = index.filter(table, predicates)
+            result = apply_predicates(filtered, remaining)
+            expected = table[table[column].astype(object).str.contains(query, na=False)]
+            assert result.index.tolist() == expected.index.tolist(), (column, query)
+
+def test_combined_predicates_and_incremental_values():
+    table = encode_categories(random_table(2))
+    index = SubstringIndex()
+    index.rebuild(table)
+
+    # 新批次带来索引中没有的值
+    batch = pd.DataFrame({'省份': ['内蒙古'], '市场名称': ['呼和浩特东瓦窑'], '品种名称': ['大白菜'], '平均价': [1.0]})
+    index.add(batch)
+    table = encode_categories(pd.concat([table, batch], ignore_index=True))
+
+    predicates = [('品种名称', 'contains', '白菜'), ('市场名称', 'contains', '瓦窑'), ('平均价', '>=', 0.5)]
+    filtered, remaining = index.filter(table, predicates)
+    assert remaining == [('平均价', '>=', 0.5)]
+
+    expected = apply_predicates(table.astype({'品种名称': object, '市场名称': object}), predicates)
+    assert apply_predicates(filtered, remaining).index.tolist() == expected.index.tolist() == [len(table) - 1]
+
+def test_regex_queries_fall_back():
+    table = encode_categories(random_table(3))
+    index = SubstringIndex()
+    index.rebuild(table)
+
+    filtered, remaining = index.filter(table, [('省份', 'contains', '山.')])
+
+    assert filtered is table
+    assert remaining == [('省份', 'contains', '山.')]
+    assert index.get_stats()['fallbacks'] == 1
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+去重分类与增量合并测试
+"""
+
+import random
+
+import pandas as pd
+
+from core.storage import KEY_COLUMNS, coerce_types, decode_categories, encode_categories, merge_frames
+from core.upsert import ROW_NEW, ROW_UNCHANGED, ROW_UPDATED, UpsertIndex
+from tests.conftest import price_rows
+
+def test_classify_new_updated_unchanged(make_manager):
+    manager = make_manager('csv')
+    rows = price_rows(40, 1)
+    manager.save_data(rows)
+    table = decode_categories(manager.get_dataframe())
+
+    stored = table.head(3).copy()
+    updated = table.iloc[[3]].copy()
+    updated['平均价'] = 99.5
+    new = table.iloc[[4]].copy()
+    new['交易日期'] = '2027-01-01'
+    batch = pd.concat([stored, updated, new], ignore_index=True)
+
+    _, _, status = manager.catalog.classify(batch)
+
+    assert status.tolist() == [ROW_UNCHANGED] * 3 + [ROW_UPDATED, ROW_NEW]
+
+def test_save_writes_only_changed_rows(make_manager):
+    manager = make_manager('csv')
+    rows = price_rows(60, 1)
+    manager.save_data(rows)
+    version = manager.get_snapshot().version
+
+    # 完全相同的批次不写入，也不发布新版本
+    manager.save_data(rows)
+    assert manager.get_snapshot().version == version
+
+    changed = [dict(rows[-1], avg_price=123.0)]
+    manager.save_data(changed)
+    table = decode_categories(manager.get_dataframe())
+    row = table[(table['市场名称'] == changed[0]['market_name'])
+                & (table['品种名称'] == changed[0]['variety_name'])
+                & (table['交易日期'] == changed[0]['trade_date'])]
+    assert row['平均价'].tolist() == [123.0]
+    assert manager.get_snapshot().version == version + 1
+
+def test_upsert_index_matches_merge_frames():
+    """增量合并与整表合并结果相同，且不修改旧表"""
+    rng = random.Random(7)
+    index = UpsertIndex()
+    table = None
+    frames = []
+
+    for seed in range(20):
+        batch = pd.DataFrame(price_rows(rng.randint(1, 60), seed)).rename(columns={
+            'province': '省份', 'market_name': '市场名称', 'variety_name': '品种名称', 'min_price': '最低价',
+            'avg_price': '平均价', 'max_price': '最高价', 'trade_date': '交易日期', 'unit': '单位'
+        })
+        batch = coerce_types(batch).drop_duplicates(subset=KEY_COLUMNS, keep='last').reset_index(drop=True)
+        frames.append(batch)
+
+        previous = None if table is None else decode_categories(table).copy()
+        merged = index.merge(table, [batch])
+        if previous is not None:
+            assert decode_categories(table).equals(previous)
+        table = merged
+
+        expected = decode_categories(encode_categories(merge_frames(frames)))
+        got = decode_categories(table)
+        order = KEY_COLUMNS
+        pd.testing.assert_frame_equal(
+            got.sort_values(order).reset_index(drop=True)[expected.columns],
+            expected.sort_values(order).reset_index(drop=True),
+            check_dtype=False
+        )
+
+def test_upsert_index_lookup_finds_key_positions(make_manager):
+    manager = make_manager('csv')
+    manager.save_data(price_rows(120, 1))
+    manager.save_data(price_rows(80, 2))
+    table = manager.get_snapshot().table
+
+    decoded = decode_categories(table)
+    probe = decoded.sample(20, random_state=3)
+    missing = probe.head(5).assign(交易日期='2027-01-01')
+    batch = pd.concat([probe, missing], ignore_index=True)
+
+    positions = manager.upsert_index.lookup(table, batch)
+    assert positions[:20].tolist() == probe.index.tolist()
+    assert positions[20:].tolist() == [-1] * 5
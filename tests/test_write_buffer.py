@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入缓冲测试：按记录数或时间间隔刷新、失败重试、关闭时写出剩余记录
+"""
+
+import threading
+import time
+
+import pytest
+
+from core.write_buffer import WriteBuffer
+from tests.conftest import price_rows
+
+class Recorder:
+    """记录每次刷新的写入函数，可指定前几次失败"""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.flushed = threading.Event()
+
+    def __call__(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise IOError('disk full')
+        self.batches.append(list(rows))
+        self.flushed.set()
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def batch(start, count):
+    return [{'id': i} for i in range(start, start + count)]
+
+def test_flush_when_size_threshold_reached():
+    recorder = Recorder()
+    buffer = WriteBuffer(recorder, max_rows=10, interval_seconds=60)
+
+    assert buffer.add(batch(0, 4)) == 4
+    assert buffer.add(batch(4, 4)) == 8
+    assert recorder.batches == []
+
+    buffer.add(batch(8, 4))
+    assert recorder.flushed.wait(5)
+    assert recorder.rows == batch(0, 12)
+    assert wait_for(lambda: buffer.get_stats()['size_triggered'] == 1)
+    assert buffer.depth() == 0
+    buffer.close()
+
+def test_flush_after_interval():
+    recorder = Recorder()
+    buffer = WriteBuffer(recorder, max_rows=1000, interval_seconds=0.2)
+
+    started = time.monotonic()
+    buffer.add(batch(0, 3))
+    assert recorder.flushed.wait(5)
+    assert time.monotonic() - started >= 0.2
+    assert recorder.rows == batch(0, 3)
+    assert wait_for(lambda: buffer.get_stats()['interval_triggered'] == 1)
+    buffer.close()
+
+def test_failed_flush_keeps_rows_in_order():
+    recorder = Recorder(failures=1)
+    buffer = WriteBuffer(recorder, max_rows=1000, interval_seconds=60)
+    buffer.add(batch(0, 5))
+
+    with pytest.raises(IOError):
+        buffer.flush()
+    assert buffer.depth() == 5
+    assert buffer.get_stats()['failed_flushes'] == 1
+
+    buffer.add(batch(5, 2))
+    assert buffer.flush()['rows'] == 7
+    assert recorder.rows == batch(0, 7)
+    assert buffer.get_stats()['last_error'] is None
+    buffer.close()
+
+def test_background_flush_retries_after_failure():
+    recorder = Recorder(failures=1)
+    buffer = WriteBuffer(recorder, max_rows=3, interval_seconds=0.1)
+    buffer.add(batch(0, 3))
+
+    assert recorder.flushed.wait(5)
+    assert recorder.rows == batch(0, 3)
+    assert buffer.get_stats()['failed_flushes'] == 1
+    buffer.close()
+
+def test_close_writes_remaining_rows_and_writes_through_afterwards():
+    recorder = Recorder()
+    buffer = WriteBuffer(recorder, max_rows=1000, interval_seconds=60)
+    buffer.add(batch(0, 5))
+
+    assert buffer.close()['rows'] == 5
+    assert recorder.rows == batch(0, 5)
+    assert not buffer.get_stats()['running']
+
+    # 关闭后提交的批次同步写入
+    assert buffer.add(batch(5, 2)) == 0
+    assert recorder.rows == batch(0, 7)
+    assert buffer.get_stats()['write_through_rows'] == 2
+
+def test_write_through_failure_keeps_pending_rows():
+    recorder = Recorder(failures=1)
+    buffer = WriteBuffer(recorder, max_rows=1000, interval_seconds=60)
+    buffer.add(batch(0, 3))
+    with pytest.raises(IOError):
+        buffer.close()
+
+    recorder.failures = 1
+    with pytest.raises(IOError):
+        buffer.add(batch(3, 2))
+    assert buffer.depth() == 3
+
+    buffer.add(batch(3, 2))
+    assert recorder.rows == batch(0, 5)
+    assert buffer.depth() == 0
+
+def test_manager_close_persists_buffered_rows(make_manager):
+    manager = make_manager('csv', write_buffer_rows=100000, write_buffer_seconds=60)
+    rows = price_rows(150, 1)
+    manager.buffer_data(rows[:80])
+    manager.buffer_data(rows[80:])
+    assert manager.get_write_buffer_stats()['depth_rows'] == 150
+    manager.close()
+
+    reloaded = make_manager('csv')
+    expected = make_manager('csv', name='direct')
+    expected.save_data(rows)
+    assert len(reloaded.storage.load()) == len(expected.storage.load())